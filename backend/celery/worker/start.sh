@@ -4,4 +4,6 @@ set -o errexit
 set -o nounset
 
 #celery -A crawler worker -l INFO --pool=solo
-celery -A crawler worker --scheduler redbeat.RedBeatScheduler -E -B -l INFO
\ No newline at end of file
+# The pool is passed on the command line, so that Celery patches the standard library for gevent before the tasks load
+celery -A crawler worker --scheduler redbeat.RedBeatScheduler -E -B -l INFO --pool="${CELERY_WORKER_POOL:-prefork}" \
+  ${CELERY_WORKER_CONCURRENCY:+--concurrency="${CELERY_WORKER_CONCURRENCY}"}
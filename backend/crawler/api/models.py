@@ -4,6 +4,7 @@ import json
 
 class WebsiteRecordManager(models.Manager):
     fields = ('url', 'label', 'interval', 'active', 'regex')
+    optional_fields = ('host_rate_limit', 'host_max_in_flight', 'max_depth', 'max_pages', 'max_bytes', 'max_duration')
 
     def valid_record_data(self, data):
         """
@@ -14,8 +15,11 @@ class WebsiteRecordManager(models.Manager):
         * If a valid key is present in the data, corresponding verification is performed.
         * Returns False at the FIRST failed check - does not continue till the end.
         * Allows 'tags' field in data as a special case
+        * Optional fields may be None - the crawler defaults are used then
         """
         for field in data:
+            if field in self.optional_fields:
+                continue
             if (field not in self.fields and field != 'tags') or data[field] is None:
                 return False
 
@@ -36,6 +40,23 @@ class WebsiteRecordManager(models.Manager):
         if 'regex' in data.keys() and len(data['regex']) == 0:
             return False
 
+        if data.get('host_rate_limit') is not None and float(data['host_rate_limit']) <= 0:
+            # invalid casting ValueError should be caught in the views.py
+            return False
+
+        if data.get('host_max_in_flight') is not None and int(data['host_max_in_flight']) < 1:
+            # invalid casting ValueError should be caught in the views.py
+            return False
+
+        if data.get('max_depth') is not None and int(data['max_depth']) < 0:
+            # invalid casting ValueError should be caught in the views.py
+            return False
+
+        if any(data.get(field) is not None and float(data[field]) <= 0
+               for field in ('max_pages', 'max_bytes', 'max_duration')):
+            # invalid casting ValueError should be caught in the views.py
+            return False
+
         return True
 
     def create_record(self, json_data):
@@ -43,8 +64,8 @@ class WebsiteRecordManager(models.Manager):
         Creates a new :class: `WebsiteRecord` instance.
         """
         dict_data = json.loads(json_data)
-        dict_data = {k: dict_data[k] for k in dict_data if k in self.fields}
-        if not self.valid_record_data(dict_data) or len(dict_data) != len(self.fields):
+        dict_data = {k: dict_data[k] for k in dict_data if k in self.fields + self.optional_fields}
+        if not self.valid_record_data(dict_data) or any(field not in dict_data for field in self.fields):
             raise ValueError
         return self.create(**dict_data)
 
@@ -59,7 +80,7 @@ class WebsiteRecordManager(models.Manager):
         if len(record) < 1:
             return False
         record = record[0]
-        dict_data = {k: dict_data[k] for k in dict_data if k in self.fields}
+        dict_data = {k: dict_data[k] for k in dict_data if k in self.fields + self.optional_fields}
         if not self.valid_record_data(dict_data):
             return False
         for key in dict_data.keys():
@@ -116,11 +137,8 @@ class EdgeManager(models.Manager):
         """
         Creates a new :class: `Edge` instance.
         """
-        print(dict_data)
         dict_data = {k: dict_data[k] for k in dict_data if k in self.fields}
         if not self.valid_edge_data(dict_data) or len(dict_data) != len(self.fields):
-            print(dict_data)
-            print(self.valid_edge_data(dict_data))
             raise ValueError
         return self.create(**dict_data)
 
@@ -147,6 +165,16 @@ class WebsiteRecord(models.Model):
     active = models.BooleanField(default=False)
     regex = models.CharField(max_length=128)
     job_id = models.CharField(max_length=128, null=True)
+    # Crawler politeness limits per host, null means the crawler defaults
+    host_rate_limit = models.FloatField(null=True)  # requests per second
+    host_max_in_flight = models.IntegerField(null=True)
+    # Crawl budgets, null means the crawler defaults
+    max_depth = models.IntegerField(null=True)  # links from the top level URL
+    max_pages = models.IntegerField(null=True)
+    max_bytes = models.BigIntegerField(null=True)
+    max_duration = models.FloatField(null=True)  # seconds
+    # Version of the persisted graph, bumped whenever a crawl changes it - the ETag of the graphs returned by the API
+    graph_version = models.IntegerField(default=0)
 
     objects = WebsiteRecordManager()
 
@@ -169,12 +197,23 @@ class Execution(models.Model):
     class Meta:
         ordering = ('title', 'url')
 
+    # Statuses of the execution, see `status_mapper` of the views
+    IN_PROGRESS = 1
+    FINISHED = 2
+    IN_QUEUE = 3
+    NEVER_EXECUTED = 4
+    UNKNOWN = 5
+
     title = models.CharField(max_length=72)
     url = models.CharField(max_length=2048)
     crawl_duration = models.IntegerField(default=0)  # 0 before first execution
     last_crawl = models.DateTimeField(null=True)  # null before first execution
     website_record = models.ForeignKey(WebsiteRecord, on_delete=models.CASCADE)
     status = models.IntegerField(default=4)
+    # Wall time of the crawl phases, counters of the crawl events and errors, see `CrawlMetrics.as_dict`
+    metrics = models.JSONField(default=dict)
+    # ID of the Celery task running the execution, so that a redelivered task continues the same execution
+    task_id = models.CharField(max_length=255, null=True, unique=True)
 
 
 class ExecutionLink(models.Model):
@@ -199,6 +238,24 @@ class Node(models.Model):
     objects = NodeManager()
 
 
+class CrawledPage(models.Model):
+    """
+    HTTP validators, content hash and outgoing links of a URL crawled for the :class: `WebsiteRecord`. Re-crawls of the
+    record request the URL conditionally and reuse the stored links if it did not change.
+    """
+
+    class Meta:
+        unique_together = ('owner', 'url')
+
+    url = models.CharField(max_length=2048)
+    owner = models.ForeignKey(WebsiteRecord, on_delete=models.CASCADE)
+    etag = models.CharField(max_length=256, null=True)
+    last_modified = models.CharField(max_length=64, null=True)
+    content_hash = models.CharField(max_length=64)
+    title = models.CharField(max_length=2048, null=True)
+    links = models.JSONField(default=list)
+
+
 class Edge(models.Model):
     """
     A single edge between two :class: `Node` objects in the website graph.
@@ -207,3 +264,27 @@ class Edge(models.Model):
     target = models.ForeignKey(Node, on_delete=models.CASCADE, related_name='target_node')
 
     objects = EdgeManager()
+
+
+class DomainNode(models.Model):
+    """
+    A single domain of the web map of the :class: `WebsiteRecord`, materialized out of its :class: `Node` objects
+    whenever the graph of the record is persisted.
+    """
+
+    class Meta:
+        unique_together = ('owner', 'domain')
+
+    domain = models.CharField(max_length=2048)
+    crawl_time = models.CharField(max_length=2048)  # the latest crawl time of the nodes of the domain
+    owner = models.ForeignKey(WebsiteRecord, on_delete=models.CASCADE)
+
+
+class DomainEdge(models.Model):
+    """
+    A single edge between two :class: `DomainNode` objects, aggregated out of the :class: `Edge` objects of their nodes.
+    """
+    source = models.ForeignKey(DomainNode, on_delete=models.CASCADE, related_name='source_domain')
+    target = models.ForeignKey(DomainNode, on_delete=models.CASCADE, related_name='target_domain')
+    owner = models.ForeignKey(WebsiteRecord, on_delete=models.CASCADE)
+    count = models.IntegerField()  # number of the edges between the nodes of the domains
@@ -42,7 +42,7 @@ class WebsiteRecordType(DjangoObjectType):
 class ExecutionType(DjangoObjectType):
     class Meta:
         model = Execution
-        fields = ('title', 'url', 'crawl_duration', 'last_crawl', 'website_record', 'status')
+        fields = ('title', 'url', 'crawl_duration', 'last_crawl', 'website_record', 'status', 'metrics')
 
 
 class ExecutionLinkType(DjangoObjectType):
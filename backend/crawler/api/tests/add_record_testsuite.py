@@ -26,6 +26,38 @@ class AddRecordTest(TestCase):
         record = WebsiteRecord.objects.filter(label='test')[0]
         assert len(Tag.objects.filter(website_record=record)) == 0
 
+    def test_add_valid_record_host_limits(self):
+        request_data = {"url": "www.google.com", "label": "test", "interval": 120, "active": False, "regex": ".+",
+                        "host_rate_limit": 2.5, "host_max_in_flight": 3}
+        response = self.client.post(request_url, data=request_data, content_type=content_type)
+        assert 'message' in response.data
+        record = WebsiteRecord.objects.filter(label='test').first()
+        assert record.host_rate_limit == 2.5
+        assert record.host_max_in_flight == 3
+
+    def test_add_invalid_record_host_limits(self):
+        request_data = {"url": "www.google.com", "label": "test", "interval": 120, "active": False, "regex": ".+",
+                        "host_rate_limit": 0}
+        response = self.client.post(request_url, data=request_data, content_type=content_type)
+        assert 'error' in response.data
+        assert len(WebsiteRecord.objects.filter(label='test')) == 0
+
+    def test_add_valid_record_budgets(self):
+        request_data = {"url": "www.google.com", "label": "test", "interval": 120, "active": False, "regex": ".+",
+                        "max_depth": 0, "max_pages": 1000, "max_bytes": 10 * 1024 ** 3, "max_duration": 600}
+        response = self.client.post(request_url, data=request_data, content_type=content_type)
+        assert 'message' in response.data
+        record = WebsiteRecord.objects.filter(label='test').first()
+        assert (record.max_depth, record.max_pages, record.max_bytes, record.max_duration) == (0, 1000,
+                                                                                               10 * 1024 ** 3, 600)
+
+    def test_add_invalid_record_budgets(self):
+        request_data = {"url": "www.google.com", "label": "test", "interval": 120, "active": False, "regex": ".+",
+                        "max_pages": 0}
+        response = self.client.post(request_url, data=request_data, content_type=content_type)
+        assert 'error' in response.data
+        assert len(WebsiteRecord.objects.filter(label='test')) == 0
+
     def test_add_invalid_record_label(self):
         request_data = {"url": "www.google.com", "label": "", "interval": 120, "active": False, "regex": ".+",
                         "tags": "a,b,1"}
@@ -9,6 +9,10 @@ class GetExecutionsTest(TestCase):
         assert 'error' not in response.data
         assert len(response.data['executions']) == 5
 
+    def test_get_executions_links(self):
+        response = self.client.get('/api/executions/1/')
+        assert all(execution['links'] == 2 for execution in response.data['executions'])
+
     def test_get_executions_invalid_page(self):
         response = self.client.get('/api/executions/55/')
         assert 'error' in response.data
@@ -1,10 +1,17 @@
+from django.core.cache import caches
 from django.test import TestCase
 from rest_framework import status
 
+from api.models import DomainNode, Node
+from tasks.graph_cache import bump_graph_version
 
 class GetRecordTest(TestCase):
     fixtures = ['nodes.json']
 
+    def setUp(self):
+        # The tests cache the graphs in the memory of their process, see CRAWLER_GRAPH_CACHE
+        caches['graphs'].clear()
+
     def test_get_graph(self):
         response = self.client.get('/api/graph/website/?record=5,6')
         assert 'error' not in response.data
@@ -18,6 +25,14 @@ class GetRecordTest(TestCase):
         assert len(response.data) == 2
         assert len(response.data['nodes']) == 3
         assert len(response.data['edges']) == 3
+        assert sorted(edge['fields']['count'] for edge in response.data['edges']) == [1, 1, 2]
+
+    def test_get_graph_domain_materialized(self):
+        # Graphs persisted before the domain graphs existed are materialized by the first request
+        self.client.get('/api/graph/domain/?record=5,6')
+        assert DomainNode.objects.filter(owner_id=5).count() == 4
+        response = self.client.get('/api/graph/domain/?record=5,6')
+        assert len(response.data['nodes']) == 3
 
     def test_get_graph_invalid_record(self):
         response = self.client.get('/api/graph/website/')
@@ -28,3 +43,46 @@ class GetRecordTest(TestCase):
         response = self.client.get('/api/graph/domain/?record=potato,tomato/')
         assert 'error' in response.data
         assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_get_graph_not_modified(self):
+        response = self.client.get('/api/graph/website/?record=5,6')
+        etag = response['ETag']
+
+        response = self.client.get('/api/graph/website/?record=6,5', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = self.client.get('/api/graph/domain/?record=5,6', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+        bump_graph_version(6)
+        response = self.client.get('/api/graph/website/?record=5,6', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_get_graph_cached(self):
+        self.client.get('/api/graph/website/?record=5,6')
+        Node.objects.filter(owner_id=6).update(title='Changed')
+
+        # The graph changes only by the crawls, they bump its version
+        response = self.client.get('/api/graph/website/?record=5,6')
+        assert 'Changed' not in {node['fields']['title'] for node in response.data['nodes']}
+
+        bump_graph_version(6)
+        response = self.client.get('/api/graph/website/?record=5,6')
+        assert 'Changed' in {node['fields']['title'] for node in response.data['nodes']}
+
+    def test_get_graph_not_modified_queries(self):
+        etag = self.client.get('/api/graph/domain/?record=5,6')['ETag']
+
+        # Unchanged graphs are answered by the versions of the records, the nodes are not queried
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/graph/domain/?record=5,6', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_get_graph_deleted_record(self):
+        etag = self.client.get('/api/graph/website/?record=5,6')['ETag']
+        self.client.delete('/api/record/', {'record_id': 6}, content_type='application/json')
+
+        response = self.client.get('/api/graph/website/?record=5,6', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['nodes']) == 5
@@ -1,4 +1,4 @@
-from django.db.models import Q
+from django.db.models import Count, Q
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
@@ -7,12 +7,14 @@ from django.db import transaction, DatabaseError, IntegrityError
 from django.core.paginator import Paginator
 
 from django.core import serializers
+from django.utils.http import parse_etags
 from .models import *
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from tasks.crawler import manage_tasks, start_periodic_task, stop_periodic_task
-from tasks.transformer import get_graph as transformer_get_graph
+from tasks.graph_cache import cached_graph, graph_etag
+from tasks.transformer import get_domain_graph, get_graph as transformer_get_graph
 
 status_mapper = {
     1: "IN PROGRESS",
@@ -28,7 +30,8 @@ SEE_ERROR = 'See the "error" key in the response body for details.'
 
 @swagger_auto_schema(
     methods=['get'],
-    operation_description='Returns an execution graph for the selected record. Not implemented yet.',
+    operation_description='Returns an execution graph for the selected record. The graphs are cached until the records '
+                          + 'are crawled again, the response carries an `ETag` of the graph version.',
     manual_parameters=[
         openapi.Parameter('mode', openapi.IN_PATH,
                           "Mode in which the graf should be displayed. i.e., website or domain ",
@@ -37,10 +40,14 @@ SEE_ERROR = 'See the "error" key in the response body for details.'
         openapi.Parameter('record', openapi.IN_QUERY,
                           "IDd of the record whose graph we want to receive, "
                           + "concatenated by a comma without a whitespace.",
-                          type=openapi.TYPE_STRING, example="5,6,7")
+                          type=openapi.TYPE_STRING, example="5,6,7"),
+        openapi.Parameter('If-None-Match', openapi.IN_HEADER,
+                          "`ETag` of a graph received before, the graph is not sent again if it did not change.",
+                          type=openapi.TYPE_STRING)
     ],
     responses={
-        200: openapi.Response('Graph data for the request.', examples={"application/json": {
+        200: openapi.Response('Graph data for the request. Edges of the domain graph carry the number of the links '
+                              + 'between their domains under the "count" key.', examples={"application/json": {
             'nodes': [
                 {
                     'model': 'api.node',
@@ -74,6 +81,7 @@ SEE_ERROR = 'See the "error" key in the response body for details.'
                 }
             ]
         }}),
+        304: openapi.Response('The graph did not change since the `If-None-Match` ETag was received.'),
         400: openapi.Response('List of queried Website Record IDs was either not present or they were not integers. '
                               + SEE_ERROR)
     },
@@ -91,16 +99,34 @@ def get_graph(request, mode):
                         status=status.HTTP_400_BAD_REQUEST)
     records = request.query_params.get('record').split(',')
     record_ids = []
-    domain_flag = mode == 'domain'
     for record in records:
         if not record.isnumeric():
             return Response({"error": f"The Website Record ID {record} is not an integer!"},
                             status=status.HTTP_400_BAD_REQUEST)
         record_ids.append(int(record))
+    mode = 'domain' if mode == 'domain' else 'website'
+    # Graphs are cached by their versions, bumped whenever a crawl persists them
+    etag = graph_etag(record_ids, mode)
+    headers = {'ETag': etag} if etag else None
+    if etag and etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    output = cached_graph(etag, lambda: _build_graph(record_ids, mode))
+    return Response(data=output, status=status.HTTP_200_OK, headers=headers)
+
+
+def _build_graph(record_ids: list, mode: str) -> dict:
+    """
+    Builds the graph of the records out of the database.
+    @param record_ids: IDs of the records whose graph is built
+    @param mode: mode of the graph - either 'domain' or 'website'
+    @return: the serialized nodes and edges of the graph
+    """
+    if mode == 'domain':
+        # Domain graphs are materialized when the graphs are persisted
+        return get_domain_graph(record_ids)
     edges = Edge.objects.select_related().filter(Q(source__owner__in=record_ids) | Q(target__owner__in=record_ids))
     nodes = Node.objects.filter(owner__in=record_ids)
-    output = transformer_get_graph(edges, nodes, domain_flag)
-    return Response(data=output, status=status.HTTP_200_OK)
+    return transformer_get_graph(edges, nodes)
 
 
 @swagger_auto_schema(
@@ -163,7 +189,31 @@ def get_graph(request, mode):
                                     example="crawler.com"),
             'tags': openapi.Schema(type=openapi.TYPE_STRING,
                                    description="A comma-separated list of the `WebsiteRecord`'s tags.",
-                                   example="awesome,crawl,quick")
+                                   example="awesome,crawl,quick"),
+            'host_rate_limit': openapi.Schema(type=openapi.TYPE_NUMBER,
+                                              description="Maximal number of requests per second sent to a single "
+                                                          + "host. Must be positive, null means the crawler default.",
+                                              example=2.5),
+            'host_max_in_flight': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                                 description="Maximal number of requests in progress for a single "
+                                                             + "host. Must be positive, null means the crawler default.",
+                                                 example=4),
+            'max_depth': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                        description="Maximal number of links from the starting URL to a crawled one. "
+                                                    + "Must be non-negative, null means the crawler default.",
+                                        example=5),
+            'max_pages': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                        description="Maximal number of pages crawled by a single execution. "
+                                                    + "Must be positive, null means the crawler default.",
+                                        example=10000),
+            'max_bytes': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                        description="Maximal number of bytes downloaded by a single execution. "
+                                                    + "Must be positive, null means the crawler default.",
+                                        example=1073741824),
+            'max_duration': openapi.Schema(type=openapi.TYPE_NUMBER,
+                                           description="Maximal number of seconds a single execution requests new "
+                                                       + "pages for. Must be positive, null means the crawler default.",
+                                           example=3600)
         }),
     responses={
         201: openapi.Response('Record was created successfully. Includes ID of the new record under key "pk".',
@@ -204,7 +254,31 @@ def get_graph(request, mode):
                                     example="crawler.com"),
             'tags': openapi.Schema(type=openapi.TYPE_STRING,
                                    description="A comma-separated list of the `WebsiteRecord`'s tags.",
-                                   example="awesome,crawl,quick")
+                                   example="awesome,crawl,quick"),
+            'host_rate_limit': openapi.Schema(type=openapi.TYPE_NUMBER,
+                                              description="Maximal number of requests per second sent to a single "
+                                                          + "host. Must be positive, null means the crawler default.",
+                                              example=2.5),
+            'host_max_in_flight': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                                 description="Maximal number of requests in progress for a single "
+                                                             + "host. Must be positive, null means the crawler default.",
+                                                 example=4),
+            'max_depth': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                        description="Maximal number of links from the starting URL to a crawled one. "
+                                                    + "Must be non-negative, null means the crawler default.",
+                                        example=5),
+            'max_pages': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                        description="Maximal number of pages crawled by a single execution. "
+                                                    + "Must be positive, null means the crawler default.",
+                                        example=10000),
+            'max_bytes': openapi.Schema(type=openapi.TYPE_INTEGER,
+                                        description="Maximal number of bytes downloaded by a single execution. "
+                                                    + "Must be positive, null means the crawler default.",
+                                        example=1073741824),
+            'max_duration': openapi.Schema(type=openapi.TYPE_NUMBER,
+                                           description="Maximal number of seconds a single execution requests new "
+                                                       + "pages for. Must be positive, null means the crawler default.",
+                                           example=3600)
         }),
     responses={
         204: openapi.Response('Record was updated successfully!'),
@@ -423,16 +497,12 @@ def get_executions(request, page):
             record_label = WebsiteRecord.objects.filter(pk=execution['fields']['website_record'])[0].label
             execution['fields']['label'] = record_label
 
-    link_counts = dict()
-    for execution in executions:
-        execution_id = execution.pk
-        link_counts[execution_id] = len(execution.executionlink_set.all())
+    # Count the links of the executions on the page by a single query, executions may have 100k links
+    execution_ids = [execution['pk'] for execution in response_data['executions']]
+    link_counts = dict(ExecutionLink.objects.filter(execution__in=execution_ids).values('execution')
+                       .annotate(links=Count('id')).values_list('execution', 'links'))
     for execution in response_data['executions']:
-        execution_id = execution['pk']
-        if execution_id in response_data:
-            execution['links'] = len(response_data[execution_id])
-        else:
-            execution['links'] = 0
+        execution['links'] = link_counts.get(execution['pk'], 0)
     return Response(response_data, status=status.HTTP_200_OK)
 
 
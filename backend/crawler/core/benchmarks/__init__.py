@@ -0,0 +1,4 @@
+"""
+Performance benchmarks of the crawler. They are not part of the test suite, every module is a standalone script meant
+to be run from the backend/crawler directory, i.e. `python -m core.benchmarks.frontier`.
+"""
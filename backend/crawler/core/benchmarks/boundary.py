@@ -0,0 +1,60 @@
+"""
+Compares the boundary matching of the crawled URLs by the `BoundaryMatcher` with the former matching, which formatted
+the pattern and called `re.match` for every URL.
+
+Usage:
+    python -m core.benchmarks.boundary [--urls 1000000]
+"""
+import argparse
+import random
+import re
+import time
+
+from core.inspector.boundary import BoundaryMatcher
+
+SCENARIOS = {
+    "literal prefix": [r"https://www\.example\.com/"],
+    "literal anywhere": [r".*example\.com/blog/.*"],
+    "regex": [r"https?://(www\.)?example\.com/(blog|shop)/.*"],
+    "3 patterns": [r"https://www\.example\.com/blog/", r".*cdn\.example\.net/.*", r"https?://example\.org/\d+/.*"],
+}
+
+
+def generate_urls(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    hosts = ["https://www.example.com", "http://example.com", "https://cdn.example.net", "https://example.org"]
+    sections = ["blog", "shop", "about", "static", "1234"]
+
+    return [f"{rng.choice(hosts)}/{rng.choice(sections)}/{rng.randrange(100000)}/" for _ in range(count)]
+
+
+def legacy_match(patterns: list) -> callable:
+    pattern = "|".join(patterns)
+    return lambda url: re.match(rf'{pattern}', url)
+
+
+def measure(match: callable, urls: list) -> (float, int):
+    start = time.perf_counter()
+    matched = sum(1 for url in urls if match(url))
+    return time.perf_counter() - start, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=1000000, help="Number of the matched URLs.")
+    args = parser.parse_args()
+
+    urls = generate_urls(args.urls)
+
+    print(f"{'scenario':<18} {'legacy [s]':>11} {'matcher [s]':>12} {'speedup':>8}")
+
+    for name, patterns in SCENARIOS.items():
+        legacy_time, legacy_matched = measure(legacy_match(patterns), urls)
+        matcher_time, matched = measure(BoundaryMatcher(patterns), urls)
+
+        assert matched == legacy_matched
+        print(f"{name:<18} {legacy_time:>11.3f} {matcher_time:>12.3f} {legacy_time / matcher_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
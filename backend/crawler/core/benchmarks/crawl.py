@@ -0,0 +1,259 @@
+"""
+Crawls synthetic sites served by a local HTTP server and measures every crawl engine end to end - crawled pages per
+second, p50/p99 latency of the page downloads, CPU time and peak RSS of the crawling process. The site has a set number
+of pages, links per page, depth and page weight, its responses may be delayed to simulate a distant server.
+
+The server runs in its own process and every crawl in a fresh one, so that the CPU time and the peak RSS belong to the
+crawl only. Results are printed and written as JSON, a previous result file may be passed as the baseline to compare
+pages per second against, i.e. between releases.
+
+Usage:
+    python -m core.benchmarks.crawl [--pages 2000] [--fanout 10] [--depth 4] [--weight 16384] [--latency 0.01]
+                                    [--engines sync async] [--concurrency 16] [--parse-processes 0]
+                                    [--output crawl-benchmark.json] [--baseline previous.json]
+"""
+import argparse
+import datetime
+import json
+import math
+import multiprocessing
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Mapping
+
+from core.inspector.inspector import Inspector
+from core.tests.site import LocalSite
+
+# Options of `Inspector.crawl_url` selecting the benchmarked engines, new engines are registered here
+ENGINES = {
+    "sync": {"engine": "sync"},
+    "async": {"engine": "async"},
+}
+
+
+class SyntheticSite(Mapping):
+    """
+    Pages of a synthetic site generated on request, so that large sites do not have to be kept in memory. Pages form a
+    tree of the given depth, every page links its children and random pages of its own or the next level, so that the
+    breadth-first crawl reaches the deepest level last. The tree is deeper than requested if `fanout` links per page
+    are too few for `depth` levels to hold all the pages, see `levels`.
+    """
+
+    def __init__(self, pages: int, fanout: int, depth: int, weight: int, seed: int = 0):
+        """
+        Constructor method.
+        Args:
+            pages: Number of the pages.
+            fanout: Number of the links on every page.
+            depth: Number of the levels of the site.
+            weight: Number of bytes of every page, the pages are padded by text to it.
+            seed: Seed of the random generator.
+        """
+        self.pages = pages
+        self.fanout = fanout
+        self.depth = depth
+        self.weight = weight
+        self.seed = seed
+
+        # Number of the children of a page, so that `depth` levels hold all the pages
+        self._branching = max(2, min(fanout, math.ceil(pages ** (1 / max(depth - 1, 1)))))
+
+        # Index of the first page of every level
+        self._levels = [0]
+        while self._levels[-1] < pages:
+            self._levels.append(self._levels[-1] * self._branching + 1)
+
+    @property
+    def levels(self) -> int:
+        """
+        Actual number of the levels of the site.
+        """
+        return len(self._levels) - 1
+
+    def _links(self, page: int) -> list:
+        rng = random.Random(self.seed * self.pages + page)
+        children = range(page * self._branching + 1, min((page + 1) * self._branching + 1, self.pages))
+        level = next(level for level, first in enumerate(self._levels) if first > page) - 1
+        end = min(self._levels[min(level + 2, len(self._levels) - 1)], self.pages)
+
+        return list(children)[:self.fanout] + [rng.randrange(end) for _ in range(self.fanout - len(children))]
+
+    def _page(self, page: int) -> str:
+        anchors = "".join(f'<li><a href="/page/{target}/">Page {target}</a></li>' for target in self._links(page))
+        html = f"<!DOCTYPE html><html><head><title>Page {page}</title></head><body><ul>{anchors}</ul>"
+        padding = max(self.weight - len(html) - len("</body></html>"), 0)
+        words = "lorem ipsum dolor sit amet " * (padding // 27 + 1)
+
+        return f"{html}<p>{words[:padding - 7]}</p></body></html>" if padding > 7 else f"{html}</body></html>"
+
+    def __getitem__(self, path: str) -> str:
+        try:
+            prefix, page, suffix = path.split('/')[1:]
+            page = int(page)
+        except ValueError:
+            raise KeyError(path)
+
+        if prefix != "page" or suffix or not 0 <= page < self.pages:
+            raise KeyError(path)
+
+        return self._page(page)
+
+    def __iter__(self):
+        return (f"/page/{page}/" for page in range(self.pages))
+
+    def __len__(self) -> int:
+        return self.pages
+
+
+def _serve(site: dict, latency: float, connection) -> None:
+    """
+    Serves the site until the benchmark sends the stop message.
+    """
+    with LocalSite(SyntheticSite(**site), etags=False, latency=latency) as server:
+        connection.send(server.url())
+        connection.recv()
+
+
+def _peak_rss() -> float:
+    """
+    Returns the peak resident set size of the current process in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _percentile(values: list, percentile: float) -> float:
+    if not values:
+        return None
+
+    values = sorted(values)
+
+    return values[min(len(values) - 1, int(math.ceil(percentile / 100 * len(values))) - 1)]
+
+
+def _crawl(url: str, options: dict, connection) -> None:
+    """
+    Crawls the site served under the URL in a fresh process and sends back the measurements.
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    class TimedInspector(Inspector):
+        def _fetch(self, url: str, headers: dict = None):
+            start = time.perf_counter()
+
+            try:
+                return super()._fetch(url, headers)
+            finally:
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+    cpu = time.process_time()
+    start = time.perf_counter()
+    nodes = TimedInspector.crawl_url(f"{url}page/0/", rf"{re.escape(url)}.*", **options)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+
+    pages = sum(1 for node in nodes if not node["boundary_record"])
+
+    connection.send({
+        "pages": pages,
+        "seconds": elapsed,
+        "pages_per_second": pages / elapsed,
+        "fetch_p50_ms": _percentile(latencies, 50) * 1000,
+        "fetch_p99_ms": _percentile(latencies, 99) * 1000,
+        "cpu_seconds": cpu,
+        "peak_rss_mb": _peak_rss(),
+    })
+
+
+def _run(context, target: callable, *args):
+    parent, child = context.Pipe()
+    process = context.Process(target=target, args=(*args, child), daemon=False)
+    process.start()
+
+    return process, parent
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": multiprocessing.cpu_count()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000, help="Number of the pages of the site.")
+    parser.add_argument("--fanout", type=int, default=10, help="Number of the links on every page.")
+    parser.add_argument("--depth", type=int, default=4, help="Number of the levels of the site.")
+    parser.add_argument("--weight", type=int, default=16384, help="Number of bytes of every page.")
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds every response is delayed by.")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES),
+                        help="Benchmarked crawl engines.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of pages fetched at once by async.")
+    parser.add_argument("--parse-processes", type=int, default=0, help="Number of the parser processes of async.")
+    parser.add_argument("--output", default="crawl-benchmark.json", help="File the results are written to.")
+    parser.add_argument("--baseline", help="Results of a previous run to compare the pages per second against.")
+    args = parser.parse_args()
+
+    site = {"pages": args.pages, "fanout": args.fanout, "depth": args.depth, "weight": args.weight}
+    baseline = {}
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = {result["engine"]: result for result in json.load(baseline_file)["results"]}
+
+    context = multiprocessing.get_context("spawn")
+    server, server_connection = _run(context, _serve, site, args.latency)
+    url = server_connection.recv()
+
+    results = []
+
+    print(f"{'engine':>8} {'pages':>7} {'pages/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'cpu s':>7} {'rss MiB':>8} "
+          f"{'vs base':>8}")
+
+    try:
+        for engine in args.engines:
+            options = dict(ENGINES[engine])
+
+            if options["engine"] == "async":
+                options.update(concurrency=args.concurrency, parse_processes=args.parse_processes)
+
+            crawl, crawl_connection = _run(context, _crawl, url, options)
+            result = {"engine": engine, "options": options, **crawl_connection.recv()}
+            crawl.join()
+            results.append(result)
+
+            previous = baseline.get(engine)
+            change = f"{result['pages_per_second'] / previous['pages_per_second'] - 1:+.1%}" if previous else "-"
+
+            print(f"{engine:>8} {result['pages']:>7} {result['pages_per_second']:>9.1f} "
+                  f"{result['fetch_p50_ms']:>8.2f} {result['fetch_p99_ms']:>8.2f} {result['cpu_seconds']:>7.2f} "
+                  f"{result['peak_rss_mb']:>8.1f} {change:>8}")
+    finally:
+        server_connection.send("stop")
+        server.join()
+
+    with open(args.output, "w") as output:
+        json.dump({"environment": _environment(),
+                   "site": {**site, "levels": SyntheticSite(**site).levels, "latency": args.latency},
+                   "results": results},
+                  output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares the link extractors on a corpus of saved websites - the number of parsed pages per second and the peak memory
+allocated by Python objects while parsing a single page (measured by tracemalloc, which does not see the allocations
+done inside libxml2).
+
+Usage:
+    python -m core.benchmarks.extractor [--corpus DIRECTORY] [--repeat 3]
+
+Without a corpus, synthetic pages of various sizes are generated. A corpus is a directory of the websites saved as
+*.html files, i.e. by `wget --recursive --accept html`.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from pathlib import Path
+
+from core.inspector.extractor import EXTRACTORS, get_extractor
+
+
+def synthetic_corpus(pages: int = 200, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    corpus = []
+
+    for page in range(pages):
+        links = rng.randrange(20, 2000)
+        paragraph = "<p>" + " ".join("lorem" for _ in range(rng.randrange(5, 50))) + "</p>"
+        body = "".join(f'<div class="item"><a href="/page/{rng.randrange(100000)}/">Link {link}</a>{paragraph}</div>'
+                       for link in range(links))
+        corpus.append(f"<html><head><title>Page {page}</title></head><body>{body}</body></html>".encode())
+
+    return corpus
+
+
+def load_corpus(directory: str) -> list:
+    return [path.read_bytes() for path in sorted(Path(directory).rglob("*.html"))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory with the saved websites (*.html files).")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of passes over the corpus.")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    size = sum(len(page) for page in corpus)
+
+    print(f"{len(corpus)} pages, {size / 2 ** 20:.1f} MiB")
+    print(f"{'extractor':<10} {'pages/s':>10} {'MiB/s':>8} {'peak MiB':>9} {'links':>9}")
+
+    for name in EXTRACTORS:
+        extractor = get_extractor(name)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            links = sum(len(extractor.extract(page)[1]) for page in corpus)
+        elapsed = time.perf_counter() - start
+
+        # Memory is measured in a separate pass, tracing slows the parsing down
+        peak = 0
+        for page in corpus:
+            tracemalloc.start()
+            extractor.extract(page)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        print(f"{name:<10} {len(corpus) * args.repeat / elapsed:>10.1f} {size * args.repeat / elapsed / 2 ** 20:>8.1f} "
+              f"{peak / 2 ** 20:>9.2f} {links:>9}")
+
+
+if __name__ == "__main__":
+    main()
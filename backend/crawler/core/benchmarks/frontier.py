@@ -0,0 +1,81 @@
+"""
+Measures how the crawl cost grows with the number of crawled pages on a synthetic link graph. Pages are served from
+memory, so the numbers reflect the crawl loop itself (parsing, link handling and frontier operations) and not the
+network.
+
+Usage:
+    python -m core.benchmarks.frontier [--pages 50000] [--fanout 10] [--steps 4]
+"""
+import argparse
+import random
+import time
+
+from core.inspector.fetcher import FetchedPage
+from core.inspector.inspector import Inspector
+
+HOST = "http://synthetic.test"
+
+
+def build_graph(pages: int, fanout: int, seed: int = 0) -> list:
+    """
+    Builds a random link graph in which every page is reachable from the first one.
+    Args:
+        pages: Number of the pages.
+        fanout: Number of the links on every page.
+        seed: Seed of the random generator.
+
+    Returns:
+        List of the link targets (page indexes) of every page.
+    """
+    rng = random.Random(seed)
+    graph = []
+
+    for page in range(pages):
+        # Links of the binary tree keep every page reachable from the root
+        links = [target for target in (2 * page + 1, 2 * page + 2) if target < pages]
+        links += [rng.randrange(pages) for _ in range(fanout - len(links))]
+        graph.append(links)
+
+    return graph
+
+
+def synthetic_inspector(graph: list) -> type:
+    """
+    Creates the Inspector that downloads the pages of the provided graph from memory.
+    """
+
+    class SyntheticInspector(Inspector):
+        def _fetch(self, url: str, headers: dict = None) -> FetchedPage:
+            page = int(url.rstrip('/').rsplit('/', 1)[1])
+            anchors = "".join(f'<a href="/page/{target}/">Page {target}</a>' for target in graph[page])
+
+            html = f"<html><head><title>Page {page}</title></head><body>{anchors}</body></html>"
+
+            return FetchedPage(200, {"Content-Type": "text/html; charset=utf-8"}, html.encode(), "utf-8")
+
+    return SyntheticInspector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50000, help="Number of pages of the largest graph.")
+    parser.add_argument("--fanout", type=int, default=10, help="Number of links on every page.")
+    parser.add_argument("--steps", type=int, default=4, help="Number of graph sizes, each twice the previous one.")
+    args = parser.parse_args()
+
+    print(f"{'pages':>8} {'seconds':>10} {'us/page':>10}")
+
+    for step in reversed(range(args.steps)):
+        pages = args.pages >> step
+        inspector = synthetic_inspector(build_graph(pages, args.fanout))
+
+        start = time.perf_counter()
+        nodes = inspector.crawl_url(f"{HOST}/page/0/", rf"{HOST}/.*")
+        elapsed = time.perf_counter() - start
+
+        assert len(nodes) == pages
+        print(f"{pages:>8} {elapsed:>10.2f} {elapsed / pages * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
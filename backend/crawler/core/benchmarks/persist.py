@@ -0,0 +1,85 @@
+"""
+Measures the persistence of a large crawled graph - by `persist_graph` and by the streaming `GraphWriter` used by the
+crawler task. The graph is written into a fresh test database of the configured backend, so it runs on SQLite by
+default and on PostgreSQL when the SQL_* environment variables point to one (see crawler/settings.py), i.e.:
+
+    SQL_ENGINE=django.db.backends.postgresql SQL_DATABASE=crawler SQL_USER=postgres SQL_PASSWORD=postgres \\
+        python -m core.benchmarks.persist
+
+Usage:
+    python -m core.benchmarks.persist [--nodes 100000] [--fanout 10] [--batch-size 500]
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+import django
+
+
+def raw_nodes(count: int, fanout: int, seed: int = 0) -> iter:
+    rng = random.Random(seed)
+    crawl_time = datetime.datetime.now()
+
+    for page in range(count):
+        yield {"url": f"http://synthetic.test/page/{page}/", "domain": "synthetic.test", "title": f"Page {page}",
+               "crawl_time": crawl_time, "boundary_record": False,
+               "execution_targets": [f"http://synthetic.test/page/{rng.randrange(count)}/" for _ in range(fanout)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=100000, help="Number of the nodes of the graph.")
+    parser.add_argument("--fanout", type=int, default=10, help="Number of the edges of every node.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Number of the rows persisted at once.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "crawler.settings")
+    django.setup()
+
+    from django.db import connection
+    from api.models import Edge, Node, WebsiteRecord
+    from tasks.transformer import GraphWriter, persist_graph, transform_graph
+
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == "sqlite":
+            # On-disk database, the default in-memory test database would not be representative
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(directory, "benchmark.sqlite3")
+
+        test_database = connection.creation.create_test_db(verbosity=0)
+
+        try:
+            print(f"{connection.vendor}, {args.nodes} nodes, {args.nodes * args.fanout} edges")
+            print(f"{'method':<14} {'seconds':>9} {'nodes/s':>10} {'edges/s':>10}")
+
+            def report(method: str, start: float):
+                elapsed = time.perf_counter() - start
+                assert Node.objects.count() == args.nodes
+                print(f"{method:<14} {elapsed:>9.2f} {args.nodes / elapsed:>10.0f} "
+                      f"{Edge.objects.count() / elapsed:>10.0f}")
+
+            record = WebsiteRecord.objects.create(url="http://synthetic.test/", label="benchmark", interval=0,
+                                                  active=False, regex=".*")
+
+            start = time.perf_counter()
+            persist_graph(*transform_graph(list(raw_nodes(args.nodes, args.fanout)), record.id), args.batch_size)
+            report("persist_graph", start)
+
+            record.delete()
+            record = WebsiteRecord.objects.create(url="http://synthetic.test/", label="benchmark", interval=0,
+                                                  active=False, regex=".*")
+
+            start = time.perf_counter()
+            writer = GraphWriter(record.id, args.batch_size)
+            for node in raw_nodes(args.nodes, args.fanout):
+                writer.write(node)
+            writer.close()
+            report("GraphWriter", start)
+        finally:
+            connection.creation.destroy_test_db(test_database, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Runs several crawls at once the way the Celery worker pools do and compares the throughput per memory of the pools -
+crawled pages per second, the total peak RSS of the crawling processes and the pages per second per GiB of it.
+
+    prefork - every crawl runs in its own worker process, the processes share nothing
+    threads - the crawls run in the threads of a single process
+    gevent  - the crawls run in the greenlets of a single process with the standard library patched by gevent
+
+All the crawls crawl the same synthetic site served by a local HTTP server, its responses are delayed to simulate a
+distant server, so that the crawls wait for the network as the production ones do.
+
+Usage:
+    python -m core.benchmarks.pools [--pools prefork threads gevent] [--workers 16] [--crawls-per-worker 2]
+                                    [--pages 200] [--fanout 10] [--depth 3] [--weight 16384] [--latency 0.05]
+                                    [--engine sync] [--output pool-benchmark.json]
+"""
+import argparse
+import json
+import multiprocessing
+import re
+import time
+
+# Worker pools of Celery the benchmark runs the crawls like, new pools are registered in `_run_pool`
+POOLS = ("prefork", "threads", "gevent")
+
+
+def _crawl(url: str, engine: str) -> int:
+    """
+    Crawls the whole site by a new Inspector, returns the number of the crawled pages.
+    """
+    from core.inspector.inspector import Inspector
+
+    nodes = Inspector.crawl_url(f"{url}page/0/", rf"{re.escape(url)}.*", engine=engine)
+
+    return sum(1 for node in nodes if not node["boundary_record"])
+
+
+def _run_process(url: str, engine: str, crawls: int, connection) -> None:
+    """
+    Runs the crawls one after another in a worker process of the "prefork" pool.
+    """
+    from core.benchmarks.crawl import _peak_rss
+
+    pages = sum(_crawl(url, engine) for _ in range(crawls))
+
+    connection.send({"pages": pages, "peak_rss_mb": _peak_rss()})
+
+
+def _run_pool(pool: str, url: str, engine: str, workers: int, crawls: int, connection) -> None:
+    """
+    Runs the crawls by the threads or greenlets of a single process.
+    """
+    if pool == "gevent":
+        # The standard library is patched before the crawling modules import it, as the Celery worker does
+        from gevent import monkey
+        monkey.patch_all()
+
+        from gevent.pool import Pool
+        executor = Pool(workers)
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    from core.benchmarks.crawl import _peak_rss
+    from core.inspector import session
+    from core.inspector.inspector import DEFAULT_CONCURRENCY
+
+    # The crawls share the connections of the process, the pool keeps one for every download in progress
+    session.configure(pool_maxsize=workers * (DEFAULT_CONCURRENCY if engine == "async" else 1))
+
+    start = time.perf_counter()
+    pages = sum(executor.map(lambda _: _crawl(url, engine), range(workers * crawls)))
+    elapsed = time.perf_counter() - start
+
+    connection.send({"pages": pages, "seconds": elapsed, "peak_rss_mb": _peak_rss()})
+
+
+def _benchmark(context, pool: str, url: str, engine: str, workers: int, crawls: int) -> dict:
+    """
+    Runs `crawls` crawls by every one of the `workers` of the pool and sends back the measurements.
+    """
+    from core.benchmarks.crawl import _run
+
+    if pool != "prefork":
+        process, connection = _run(context, _run_pool, pool, url, engine, workers, crawls)
+        result = connection.recv()
+        process.join()
+
+        return result
+
+    start = time.perf_counter()
+    processes = [_run(context, _run_process, url, engine, crawls) for _ in range(workers)]
+    results = [connection.recv() for _, connection in processes]
+    elapsed = time.perf_counter() - start
+
+    for process, _ in processes:
+        process.join()
+
+    # The processes are spawned before the crawls start, their start up is included like a restart of the pool
+    return {"pages": sum(result["pages"] for result in results), "seconds": elapsed,
+            "peak_rss_mb": sum(result["peak_rss_mb"] for result in results)}
+
+
+def main():
+    from core.benchmarks.crawl import SyntheticSite, _environment, _run, _serve
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pools", nargs="+", default=list(POOLS), choices=POOLS, help="Benchmarked worker pools.")
+    parser.add_argument("--workers", type=int, default=16, help="Number of the crawls running at once.")
+    parser.add_argument("--crawls-per-worker", type=int, default=2, help="Number of the crawls run by every worker.")
+    parser.add_argument("--pages", type=int, default=200, help="Number of the pages of the site.")
+    parser.add_argument("--fanout", type=int, default=10, help="Number of the links on every page.")
+    parser.add_argument("--depth", type=int, default=3, help="Number of the levels of the site.")
+    parser.add_argument("--weight", type=int, default=16384, help="Number of bytes of every page.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds every response is delayed by.")
+    parser.add_argument("--engine", default="sync", choices=("sync", "async"),
+                        help="Crawl engine of the crawls, the gevent pool crawls by the sync one.")
+    parser.add_argument("--output", default="pool-benchmark.json", help="File the results are written to.")
+    args = parser.parse_args()
+
+    site = {"pages": args.pages, "fanout": args.fanout, "depth": args.depth, "weight": args.weight}
+
+    context = multiprocessing.get_context("spawn")
+    server, server_connection = _run(context, _serve, site, args.latency)
+    url = server_connection.recv()
+
+    results = []
+
+    print(f"{'pool':>8} {'pages':>7} {'seconds':>8} {'pages/s':>9} {'rss MiB':>8} {'pages/s/GiB':>12}")
+
+    try:
+        for pool in args.pools:
+            measured = _benchmark(context, pool, url, args.engine, args.workers, args.crawls_per_worker)
+            result = {"pool": pool, **measured, "pages_per_second": measured["pages"] / measured["seconds"]}
+            result["pages_per_second_per_gib"] = result["pages_per_second"] / (result["peak_rss_mb"] / 1024)
+            results.append(result)
+
+            print(f"{pool:>8} {result['pages']:>7} {result['seconds']:>8.2f} {result['pages_per_second']:>9.1f} "
+                  f"{result['peak_rss_mb']:>8.1f} {result['pages_per_second_per_gib']:>12.1f}")
+    finally:
+        server_connection.send("stop")
+        server.join()
+
+    with open(args.output, "w") as output:
+        json.dump({"environment": _environment(),
+                   "site": {**site, "levels": SyntheticSite(**site).levels, "latency": args.latency},
+                   "workers": args.workers, "crawls_per_worker": args.crawls_per_worker, "engine": args.engine,
+                   "results": results},
+                  output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
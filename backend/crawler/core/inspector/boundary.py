@@ -0,0 +1,135 @@
+import functools
+import re
+
+# Characters with a special meaning in the regular expressions
+_METACHARACTERS = frozenset(".^$*+?{}[]|()")
+
+# References to the groups of a regular expression - numbered and named back-references and conditional groups
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+
+def _literal(pattern: str) -> (str, bool):
+    """
+    Recognizes the boundary patterns that can be matched by a plain string check instead of the regex engine - a literal
+    prefix (i.e. `https://example\\.com/`) or a literal anywhere in the URL (i.e. `.*example\\.com/blog/.*`).
+    Args:
+        pattern: Regular expression matched from the start of the URL.
+
+    Returns:
+        The literal and a flag whether it may appear anywhere in the URL, or None if the pattern is not literal.
+    """
+    tokens = []
+    escaped = False
+
+    for char in pattern:
+        if escaped:
+            # Escaped letters and digits are character classes or back-references, i.e. \d or \1
+            if char.isalnum():
+                return None
+            tokens.append((False, char))
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        else:
+            tokens.append((char in _METACHARACTERS, char))
+
+    if escaped:
+        return None
+
+    # Leading "^" is implied, the pattern is always matched from the start of the URL
+    if tokens[:1] == [(True, '^')]:
+        tokens = tokens[1:]
+
+    anywhere = tokens[:2] == [(True, '.'), (True, '*')]
+    if anywhere:
+        tokens = tokens[2:]
+
+    if tokens[-2:] == [(True, '.'), (True, '*')]:
+        tokens = tokens[:-2]
+
+    if any(meta for meta, _ in tokens):
+        return None
+
+    return "".join(char for _, char in tokens), anywhere
+
+
+@functools.lru_cache(maxsize=256)
+def compile_patterns(patterns: tuple) -> callable:
+    """
+    Compiles the regular expressions into a single matcher. Compiled matchers are cached, so that crawls of the same
+    record do not compile its boundary again.
+    Args:
+        patterns: Regular expressions matched from the start of the URL.
+
+    Returns:
+        Function returning a truthy value if the URL matches any of the patterns.
+    """
+    if len(patterns) == 1:
+        return re.compile(patterns[0]).match
+
+    # Joined patterns renumber their groups, the references would point to the groups of the preceding patterns
+    if not any(_GROUP_REFERENCE.search(pattern) for pattern in patterns):
+        try:
+            return re.compile("|".join(f"(?:{pattern})" for pattern in patterns)).match
+        except re.error:
+            # Patterns using global flags or reusing the group names can't be joined into a single expression
+            pass
+
+    matchers = [re.compile(pattern).match for pattern in patterns]
+    return lambda url: any(match(url) for match in matchers)
+
+
+class BoundaryMatcher(object):
+    """
+    Decides whether a URL lies within the crawl boundary given by one or more regular expressions. The patterns are
+    compiled once and matched together in a single pass; literal patterns are matched without the regex engine.
+    """
+
+    def __init__(self, patterns=None):
+        """
+        Constructor method.
+        Args:
+            patterns: Regular expression or an iterable of them, each matched from the start of the URL. If no pattern
+                      is provided, every URL lies within the boundary.
+        """
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        patterns = [pattern for pattern in patterns or () if pattern]
+
+        prefixes = []
+        infixes = []
+        expressions = []
+
+        for pattern in patterns:
+            literal = _literal(pattern)
+
+            if literal is None:
+                expressions.append(pattern)
+            elif literal[1]:
+                infixes.append(literal[0])
+            else:
+                prefixes.append(literal[0])
+
+        self._match_all = not patterns
+        self._prefixes = tuple(prefixes)
+        self._infixes = tuple(infixes)
+        self._match = compile_patterns(tuple(expressions)) if expressions else None
+
+    def __call__(self, url: str) -> bool:
+        """
+        Verifies whether the URL lies within the boundary.
+        Args:
+            url: URL/domain about to be crawled.
+
+        Returns:
+            True if the URL matches any of the patterns or if no pattern was set. Else False.
+        """
+        if self._match_all or (self._prefixes and url.startswith(self._prefixes)):
+            return True
+
+        for infix in self._infixes:
+            if infix in url:
+                return True
+
+        return self._match is not None and bool(self._match(url))
@@ -0,0 +1,81 @@
+import time
+
+
+class CrawlBudget(object):
+    """
+    Limits of a single crawl - the depth of the visited URLs/domains (the number of the links from the top level URL),
+    the number of the crawled pages, the downloaded bytes and the wall time, so that a boundary letting in a crawler
+    trap (i.e. a calendar or a faceted search) does not crawl forever.
+
+    URLs/domains found deeper than `max_depth` only are not visited. Once any other limit is reached, no new URL/domain
+    is requested, the downloads in progress finish and the URLs/domains left in the frontier become leaf nodes, so that
+    the partial graph keeps the links to them. The crawl takes at most `max_seconds` plus the deadline of a download
+    then.
+    """
+
+    def __init__(self, max_depth: int = None, max_pages: int = None, max_bytes: int = None, max_seconds: float = None,
+                 clock: callable = time.monotonic):
+        """
+        Constructor method.
+        Args:
+            max_depth: Maximal depth of the visited URLs/domains, the top level URL is at the depth 0. None means
+                       unlimited, as for the other limits.
+            max_pages: Maximal number of the crawled pages.
+            max_bytes: Maximal number of the downloaded bytes.
+            max_seconds: Maximal number of seconds the crawl requests new URLs/domains for.
+            clock: Monotonic clock returning the current time in seconds.
+        """
+        if any(limit is not None and limit < 0 for limit in (max_depth, max_pages, max_bytes, max_seconds)):
+            raise ValueError("Crawl budgets must not be negative")
+
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self._clock = clock
+
+        self.pages = 0
+        self.bytes = 0
+        self._started = None
+
+    def start(self) -> None:
+        """
+        Starts measuring the wall time of the crawl.
+        """
+        self._started = self._clock()
+
+    def allows_depth(self, depth: int) -> bool:
+        """
+        Verifies whether the URL/domain at the depth may be visited.
+        """
+        return self.max_depth is None or depth <= self.max_depth
+
+    def allows_request(self, in_flight: int = 0) -> bool:
+        """
+        Verifies whether another page may be requested while the given number of the pages is being downloaded, so
+        that the concurrent downloads do not overshoot `max_pages`.
+        """
+        return self.max_pages is None or self.pages + in_flight < self.max_pages
+
+    def spend(self, pages: int = 1, size: int = 0) -> None:
+        """
+        Counts the crawled pages and their downloaded bytes.
+        """
+        self.pages += pages
+        self.bytes += size
+
+    def exhausted(self) -> str:
+        """
+        Returns the name of the exhausted budget ("pages", "bytes" or "seconds"), None if the crawl may go on.
+        """
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            return "pages"
+
+        if self.max_bytes is not None and self.bytes >= self.max_bytes:
+            return "bytes"
+
+        if self.max_seconds is not None and self._started is not None and \
+                self._clock() - self._started >= self.max_seconds:
+            return "seconds"
+
+        return None
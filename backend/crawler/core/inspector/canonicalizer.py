@@ -0,0 +1,198 @@
+import functools
+import re
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+# Default number of the resolved links remembered by the canonicalizer
+DEFAULT_CACHE_SIZE = 65536
+
+# Query parameters used for tracking only, names ending by "*" are prefixes
+DEFAULT_DROP_PARAMETERS = ("utm_*", "gclid", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_hsenc",
+                           "_hsmi")
+
+# Schemes of the URLs that can be crawled and their default ports
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_SCHEME_PATTERN = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+_PERCENT_PATTERN = re.compile(r'%[0-9a-fA-F]{2}')
+
+
+def _remove_dot_segments(path: str) -> str:
+    """
+    Removes the "." and ".." segments of the path as described by RFC 3986, section 5.2.4.
+    """
+    segments = []
+
+    for segment in path.split('/'):
+        if segment == '..':
+            if len(segments) > 1:
+                segments.pop()
+        elif segment != '.':
+            segments.append(segment)
+
+    # Path ending by a dot segment denotes a directory
+    if path.endswith(('/.', '/..')):
+        segments.append('')
+
+    return '/'.join(segments)
+
+
+class UrlCanonicalizer(object):
+    """
+    Resolves the links of the crawled websites to their canonical absolute URLs, so that a single website is crawled
+    and stored only once no matter how it is spelled. Links are resolved by RFC 3986 with the scheme and the host
+    lower-cased, the default port and the dot segments removed, and then rewritten by the configured rules.
+
+    Resolved links are kept in a bounded LRU cache, since the same links repeat on every website of a site. The
+    canonicalizer also counts the distinct spellings of the links and the distinct URLs they resolved to, see `stats`.
+    """
+
+    def __init__(self, strip_fragment: bool = True, sort_query: bool = True,
+                 drop_parameters: iter = DEFAULT_DROP_PARAMETERS, strip_trailing_slash: bool = False,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Constructor method.
+        Args:
+            strip_fragment: Whether the fragment (i.e. "#section") is removed.
+            sort_query: Whether the query parameters are sorted.
+            drop_parameters: Names of the query parameters to be removed, names ending by "*" are prefixes.
+            strip_trailing_slash: Whether the trailing slash of a non-empty path is removed, i.e. "/about/" becomes
+                                  "/about".
+            cache_size: Maximal number of the resolved links kept in the cache.
+        """
+        self.strip_fragment = strip_fragment
+        self.sort_query = sort_query
+        self.strip_trailing_slash = strip_trailing_slash
+
+        drop_parameters = tuple(drop_parameters or ())
+        self._drop_names = frozenset(name for name in drop_parameters if not name.endswith('*'))
+        self._drop_prefixes = tuple(name[:-1] for name in drop_parameters if name.endswith('*'))
+
+        self._resolve = functools.lru_cache(maxsize=cache_size)(self._canonicalize)
+
+        # Hashes of the distinct spellings of the resolved links and of the distinct URLs they resolved to
+        self._links = 0
+        self._spellings = set()
+        self._urls = set()
+
+    def _keep_parameter(self, parameter: str) -> bool:
+        name = parameter.split('=', 1)[0]
+
+        return name not in self._drop_names and not name.startswith(self._drop_prefixes)
+
+    def _canonicalize(self, href: str, base: str) -> str:
+        url = urljoin(base, href) if base else href
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+
+        if scheme not in _DEFAULT_PORTS:
+            return None
+
+        try:
+            host = parts.hostname
+            port = parts.port
+        except ValueError:
+            # Invalid port or IPv6 address
+            return None
+
+        if not host:
+            return None
+
+        netloc = host.rstrip('.')
+        if ':' in netloc:
+            netloc = f"[{netloc}]"
+        if port is not None and port != _DEFAULT_PORTS[scheme]:
+            netloc = f"{netloc}:{port}"
+        if parts.username is not None:
+            netloc = f"{parts.netloc.rpartition('@')[0]}@{netloc}"
+
+        path = parts.path or '/'
+        if '.' in path:
+            path = _remove_dot_segments(path)
+        if '%' in path:
+            path = _PERCENT_PATTERN.sub(lambda match: match.group(0).upper(), path)
+        if self.strip_trailing_slash and len(path) > 1:
+            path = path.rstrip('/') or '/'
+
+        query = parts.query
+        if query:
+            parameters = [parameter for parameter in query.split('&') if parameter and self._keep_parameter(parameter)]
+            if self.sort_query:
+                parameters.sort()
+            query = '&'.join(parameters)
+
+        fragment = '' if self.strip_fragment else parts.fragment
+
+        return urlunsplit((scheme, netloc, path, query, fragment))
+
+    def canonicalize(self, href: str, base: str = None) -> str:
+        """
+        Resolves a single link to its canonical absolute URL.
+        Args:
+            href: Link target, i.e. the `href` attribute of an anchor.
+            base: URL of the website containing the link or None if the link is absolute.
+
+        Returns:
+            The canonical URL or None if the link does not target an HTTP(S) URL (i.e. "mailto:").
+        """
+        return next(iter(self.resolve([href], base)), None) if base else self._resolve(href.strip(), None)
+
+    def resolve(self, hrefs: iter, base: str) -> set:
+        """
+        Resolves the links of a crawled website to their canonical absolute URLs.
+        Args:
+            hrefs: Link targets, i.e. the `href` attributes of the anchors of the website.
+            base: URL of the website.
+
+        Returns:
+            Set of the canonical URLs of the links that target an HTTP(S) URL.
+        """
+        parts = urlsplit(base)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        document = f"{origin}{parts.path}"
+        directory = f"{origin}{parts.path[:parts.path.rfind('/') + 1] or '/'}"
+
+        urls = set()
+
+        for href in hrefs:
+            href = href.strip()
+
+            # Links are cached by the part of the base URL they depend on, so that they are shared across websites
+            if _SCHEME_PATTERN.match(href):
+                context = None
+            elif href.startswith('//'):
+                context = f"{parts.scheme}:"
+            elif href.startswith('/'):
+                context = origin
+            elif href.startswith('?'):
+                context = document
+            elif not href or href.startswith('#'):
+                context = base
+            else:
+                context = directory
+
+            url = self._resolve(href, context)
+            self._links += 1
+
+            if url is not None:
+                urls.add(url)
+                self._spellings.add(hash((href, context)))
+                self._urls.add(hash(url))
+
+        return urls
+
+    @property
+    def dedupe_rate(self) -> float:
+        """
+        Share of the distinct spellings of the links that resolved to an URL already spelled differently.
+        """
+        return 1 - len(self._urls) / len(self._spellings) if self._spellings else 0.0
+
+    def stats(self) -> dict:
+        """
+        Returns the number of the resolved links, of their distinct spellings and of the distinct URLs they resolved
+        to, the dedupe rate and the number of the cache hits and misses.
+        """
+        cache = self._resolve.cache_info()
+
+        return {"links": self._links, "spellings": len(self._spellings), "urls": len(self._urls),
+                "dedupe_rate": self.dedupe_rate, "cache_hits": cache.hits, "cache_misses": cache.misses}
@@ -0,0 +1,207 @@
+import datetime
+import json
+import threading
+import time
+import uuid
+
+from . import LOGGER
+
+# Default number of the crawled nodes appended to the checkpoint at once
+DEFAULT_EVERY = 100
+
+# Default number of seconds the checkpoint is kept after its last change
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+# Default number of seconds the lease of a crawl lasts unless its process renews it
+DEFAULT_LEASE_TTL = 5 * 60
+
+# Value of the lease of a finished crawl
+FINISHED = "finished"
+
+# Extends the lease if it is held by the given owner.
+# KEYS: lease; ARGV: owner, TTL
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Marks the lease held by the given owner as finished, or removes it if no TTL of the finished lease is given.
+# KEYS: lease; ARGV: owner, finished value, TTL of the finished lease
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    if ARGV[3] == '' then
+        return redis.call('DEL', KEYS[1])
+    end
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(raw_node: bytes) -> dict:
+    node = json.loads(raw_node)
+
+    if node.get("crawl_time"):
+        node["crawl_time"] = datetime.datetime.fromisoformat(node["crawl_time"])
+
+    return node
+
+
+class CrawlCheckpoint(object):
+    """
+    Append-only log of the nodes yielded by a crawl kept in a Redis list, so that a crawl interrupted by a restart of
+    its process can be resumed instead of started over (see the `resume` argument of the `Inspector`). The
+    frontier is not stored, it is rebuilt out of the links of the logged nodes.
+
+    The nodes are appended in batches of `every` nodes, at most the last batch is crawled again after a restart.
+    """
+
+    def __init__(self, redis, key: str, every: int = DEFAULT_EVERY, ttl: int = DEFAULT_TTL):
+        """
+        Constructor method.
+        Args:
+            redis: Redis client.
+            key: Redis key of the log, i.e. derived from the ID of the task running the crawl.
+            every: Number of the nodes appended at once.
+            ttl: Number of seconds the log is kept after its last change, so that logs of abandoned crawls expire.
+        """
+        if every < 1:
+            raise ValueError("Checkpoint interval must be a positive number")
+
+        self.redis = redis
+        self.key = key
+        self.every = every
+        self.ttl = ttl
+
+        # Encoded nodes not appended yet
+        self._batch = []
+
+    def load(self) -> list:
+        """
+        Returns the nodes logged by the previous runs of the crawl in the order they were crawled, empty list if the
+        crawl was not started before.
+        """
+        return [_decode(raw_node) for raw_node in self.redis.lrange(self.key, 0, -1)]
+
+    def append(self, node: dict) -> None:
+        """
+        Adds the crawled node to the log, the nodes are written once `every` of them are collected.
+        """
+        self._batch.append(json.dumps(node, default=_encode))
+
+        if len(self._batch) >= self.every:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the collected nodes to the log.
+        """
+        if not self._batch:
+            return
+
+        pipeline = self.redis.pipeline()
+        pipeline.rpush(self.key, *self._batch)
+        pipeline.expire(self.key, self.ttl)
+        pipeline.execute()
+
+        self._batch = []
+
+    def clear(self) -> None:
+        """
+        Removes the log once the crawl finished.
+        """
+        self._batch = []
+        self.redis.delete(self.key)
+
+
+class CrawlLease(object):
+    """
+    Lease of a crawl kept in Redis while a process runs it. Tasks acknowledged late are redelivered once the visibility
+    timeout of the broker passes, even if their process still runs them. The redelivered task waits while the running
+    one renews the lease, resumes the crawl (see `CrawlCheckpoint`) once the lease expired, i.e. its process died, and
+    skips the crawl once it finished.
+    """
+
+    def __init__(self, redis, key: str, ttl: int = DEFAULT_LEASE_TTL, finished_ttl: int = DEFAULT_TTL,
+                 poll_interval: float = None):
+        """
+        Constructor method.
+        Args:
+            redis: Redis client.
+            key: Redis key of the lease, i.e. derived from the ID of the task running the crawl.
+            ttl: Number of seconds the lease lasts unless renewed, it is renewed three times as often.
+            finished_ttl: Number of seconds the finished lease is kept, it has to exceed the visibility timeout.
+            poll_interval: Number of seconds between the attempts to take the lease held by another process, a third
+                           of the TTL by default.
+        """
+        self.redis = redis
+        self.key = key
+        self.ttl = ttl
+        self.finished_ttl = finished_ttl
+        self.poll_interval = poll_interval or ttl / 3
+
+        # Unique value of the lease taken by this process
+        self.owner = uuid.uuid4().hex
+
+        self._renew = redis.register_script(_RENEW_SCRIPT)
+        self._release = redis.register_script(_RELEASE_SCRIPT)
+        self._stopped = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        """
+        Waits until no other process holds the lease and takes it, the lease is renewed in the background until it is
+        released. The crawl runs without the lease if Redis is not available.
+
+        Returns:
+            True if the crawl should run, False if it has already finished.
+        """
+        try:
+            while not self.redis.set(self.key, self.owner, nx=True, ex=self.ttl):
+                if self.redis.get(self.key) == FINISHED.encode():
+                    return False
+
+                time.sleep(self.poll_interval)
+        except Exception as error:
+            LOGGER.warning("Failed to take the lease %s, crawling without it: %s", self.key, error)
+            return True
+
+        self._heartbeat = threading.Thread(target=self._keep_alive, daemon=True)
+        self._heartbeat.start()
+
+        return True
+
+    def _keep_alive(self) -> None:
+        while not self._stopped.wait(self.ttl / 3):
+            try:
+                if not self._renew(keys=[self.key], args=[self.owner, self.ttl]):
+                    LOGGER.warning("Lease %s expired, a redelivered task may run the crawl as well", self.key)
+            except Exception as error:
+                LOGGER.warning("Failed to renew the lease %s: %s", self.key, error)
+
+    def release(self, finished: bool = True) -> None:
+        """
+        Stops renewing the lease. The lease of the finished crawl is kept for `finished_ttl` seconds, so that its
+        redelivered task skips it, the lease of a failed crawl is removed.
+        """
+        if self._heartbeat is None:
+            return
+
+        self._stopped.set()
+        self._heartbeat.join()
+        self._heartbeat = None
+
+        try:
+            self._release(keys=[self.key], args=[self.owner, FINISHED, self.finished_ttl if finished else ""])
+        except Exception as error:
+            LOGGER.warning("Failed to release the lease %s: %s", self.key, error)
@@ -0,0 +1,150 @@
+import codecs
+import re
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+_CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def charset_label(label: str) -> str:
+    """
+    Validates the charset label declared by a website. The label is kept as declared, the parsers know the charsets by
+    their IANA labels (i.e. "iso-2022-jp"), not by the names of the Python codecs (i.e. "iso2022_jp").
+    Args:
+        label: Declared charset label.
+
+    Returns:
+        The lower-cased label or None if it is not a known charset.
+    """
+    label = label.strip().lower()
+
+    try:
+        codecs.lookup(label)
+    except LookupError:
+        return None
+
+    return label
+
+
+def declared_charset(content_type: str) -> str:
+    """
+    Extracts the charset declared by the Content-Type header.
+    Args:
+        content_type: Value of the Content-Type header, i.e. "text/html; charset=utf-8".
+
+    Returns:
+        Label of the declared charset (see `charset_label`) or None if no known charset was declared.
+    """
+    match = _CHARSET_PATTERN.search(content_type or '')
+
+    if not match:
+        return None
+
+    return charset_label(match.group(1))
+
+
+class LinkExtractor(object):
+    """
+    Extracts the title and the link targets out of the raw content of a website.
+    """
+
+    def extract(self, content: bytes, encoding: str = None) -> (str, list):
+        """
+        Args:
+            content: Raw content of the website.
+            encoding: Encoding of the content or None if the parser should detect it.
+
+        Returns:
+            Title of the website (None if it has none) and the list of the `href` attributes of its anchors.
+        """
+        raise NotImplementedError
+
+
+class _TitleAndLinksTarget(object):
+    """
+    Target of the lxml parser collecting only the first title and the anchors' `href` attributes, so that no element
+    tree is built.
+    """
+
+    def __init__(self):
+        self.title = None
+        self.hrefs = []
+        self._title_parts = None
+
+    def start(self, tag: str, attrib: dict) -> None:
+        if tag == 'a':
+            href = attrib.get('href')
+            if href is not None:
+                self.hrefs.append(href)
+        elif tag == 'title' and self.title is None:
+            self._title_parts = []
+
+    def end(self, tag: str) -> None:
+        if tag == 'title' and self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+
+    def data(self, data: str) -> None:
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+
+    def close(self) -> (str, list):
+        if self._title_parts is not None:
+            # Unterminated title
+            self.title = "".join(self._title_parts)
+
+        return self.title, self.hrefs
+
+
+class LxmlExtractor(LinkExtractor):
+    """
+    Fast extractor driven by the events of the lxml HTML parser. It works on raw bytes and keeps no parsed tree.
+    """
+
+    def extract(self, content: bytes, encoding: str = None) -> (str, list):
+        if not content:
+            return None, []
+
+        try:
+            parser = etree.HTMLParser(target=_TitleAndLinksTarget(), encoding=encoding)
+        except LookupError:
+            # libxml2 does not know every charset Python does, it detects the encoding itself then
+            parser = etree.HTMLParser(target=_TitleAndLinksTarget())
+
+        parser.feed(content)
+
+        return parser.close()
+
+
+class SoupExtractor(LinkExtractor):
+    """
+    Compatibility extractor building the full BeautifulSoup tree of the website.
+    """
+
+    def extract(self, content: bytes, encoding: str = None) -> (str, list):
+        soup = BeautifulSoup(content, "lxml", from_encoding=encoding)
+        website_title = soup.find('title')
+
+        return website_title.text if website_title else None, [link['href'] for link in soup.find_all('a', href=True)]
+
+
+EXTRACTORS = {
+    "lxml": LxmlExtractor,
+    "soup": SoupExtractor,
+}
+
+
+def get_extractor(name: str) -> LinkExtractor:
+    """
+    Creates the extractor registered under the provided name.
+    Args:
+        name: Name of the extractor, one of the `EXTRACTORS` keys.
+
+    Returns:
+        The link extractor.
+    """
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown link extractor: {name}")
+
+    return EXTRACTORS[name]()
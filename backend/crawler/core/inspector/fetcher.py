@@ -0,0 +1,182 @@
+import codecs
+import re
+import time
+
+import requests
+
+from .extractor import charset_label, declared_charset
+
+# Default maximal number of bytes downloaded per website
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+# Number of the leading bytes the charset of a website without a declared one is sniffed from
+SNIFF_BYTES = 1024
+
+# Number of bytes read from the network at once
+CHUNK_SIZE = 64 * 1024
+
+# Number of bytes read from the network at once by the downloads with a deadline, it is checked between the reads
+DEADLINE_CHUNK_SIZE = 1024
+
+# Media types of the websites that are parsed
+HTML_MEDIA_TYPES = frozenset(("text/html", "application/xhtml+xml"))
+
+_BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be"))
+_META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+
+class FetchedPage(object):
+    """
+    Downloaded website - its status code, headers and at most `max_bytes` of its content.
+    """
+
+    __slots__ = ("status_code", "headers", "content", "encoding", "truncated", "skipped")
+
+    def __init__(self, status_code: int, headers: dict, content: bytes = b'', encoding: str = None,
+                 truncated: bool = False, skipped: bool = False):
+        """
+        Constructor method.
+        Args:
+            status_code: Status code of the response.
+            headers: Headers of the response.
+            content: Raw content of the website.
+            encoding: Declared or sniffed charset of the content, None if unknown.
+            truncated: Whether the content was cut at the byte cap.
+            skipped: Whether the content was not downloaded since the website is not an HTML document.
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.truncated = truncated
+        self.skipped = skipped
+
+
+def is_html(content_type: str) -> bool:
+    """
+    Verifies whether the Content-Type header denotes an HTML document. Missing header is assumed to be HTML.
+    """
+    if not content_type:
+        return True
+
+    return content_type.split(';', 1)[0].strip().lower() in HTML_MEDIA_TYPES
+
+
+def sniff_charset(head: bytes) -> str:
+    """
+    Detects the charset of an HTML document out of its byte order mark or its `<meta>` charset declaration.
+    Args:
+        head: Leading bytes of the document.
+
+    Returns:
+        Label of the charset (see `charset_label`) or None if the document does not declare a known one.
+    """
+    for bom, charset in _BOMS:
+        if head.startswith(bom):
+            return charset
+
+    match = _META_CHARSET_PATTERN.search(head)
+
+    if not match:
+        return None
+
+    return charset_label(match.group(1).decode('ascii'))
+
+
+def fetch(session: requests.Session, url: str, headers: dict = None, max_bytes: int = DEFAULT_MAX_BYTES,
+          timeout=None, deadline: float = None) -> FetchedPage:
+    """
+    Downloads the website by streaming. The download stops as soon as the headers show it is not an HTML document or
+    when `max_bytes` of it were read, so that media and huge files are not transferred.
+    Args:
+        session: HTTP session sending the request.
+        url: URL/domain about to be crawled.
+        headers: Additional headers of the request.
+        max_bytes: Maximal number of bytes of the content to be read.
+        timeout: Timeout of the request as accepted by requests, it bounds every read of the response only.
+        deadline: Number of seconds the whole download may take, None means unlimited. No read of the response waits
+                  longer than the rest of the deadline, the deadline is checked between the reads of
+                  `DEADLINE_CHUNK_SIZE` bytes of the content.
+
+    Returns:
+        The downloaded website. Its charset is the declared one or the one sniffed from its first `SNIFF_BYTES`.
+    """
+    expires = time.monotonic() + deadline if deadline is not None else None
+
+    try:
+        with session.get(url, headers=headers, stream=True, timeout=_bounded(timeout, deadline)) as response:
+            return _read(response, max_bytes, _read_timeout(timeout), expires)
+    except requests.exceptions.RequestException as error:
+        if expires is not None and time.monotonic() >= expires:
+            raise requests.exceptions.ReadTimeout(f"Download of {url} exceeded {deadline} seconds") from error
+        raise
+
+
+def _read_timeout(timeout) -> float:
+    """
+    Returns the read timeout out of the timeout of the request as accepted by requests.
+    """
+    return timeout[1] if isinstance(timeout, tuple) else timeout
+
+
+def _bounded(timeout, deadline: float):
+    """
+    Bounds the connect and read timeouts of the request by the deadline of the download.
+    """
+    if deadline is None:
+        return timeout
+
+    timeouts = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+
+    return tuple(deadline if value is None else min(value, deadline) for value in timeouts)
+
+
+def _read(response: requests.Response, max_bytes: int, read_timeout: float = None,
+          expires: float = None) -> FetchedPage:
+    """
+    Reads the content of the streamed response, at most `max_bytes` of it and until the deadline expires. The timeout
+    of the socket is shortened to the rest of the deadline before every read.
+    """
+    content_type = response.headers.get('Content-Type')
+
+    if not is_html(content_type):
+        return FetchedPage(response.status_code, response.headers, skipped=True)
+
+    chunks = []
+    size = 0
+    truncated = False
+
+    if expires is None:
+        reads = response.iter_content(CHUNK_SIZE)
+        sock = None
+    else:
+        reads = response.iter_content(DEADLINE_CHUNK_SIZE)
+        sock = getattr(getattr(response.raw, "_connection", None), "sock", None)
+
+    while True:
+        if expires is not None:
+            remaining = expires - time.monotonic()
+
+            if remaining <= 0:
+                raise requests.exceptions.ReadTimeout("Deadline of the download expired")
+
+            if sock is not None:
+                sock.settimeout(remaining if read_timeout is None else min(read_timeout, remaining))
+
+        chunk = next(reads, None)
+
+        if chunk is None:
+            break
+
+        if size + len(chunk) > max_bytes:
+            chunks.append(chunk[:max_bytes - size])
+            truncated = True
+            break
+
+        chunks.append(chunk)
+        size += len(chunk)
+
+    content = b''.join(chunks)
+    encoding = declared_charset(content_type) or sniff_charset(content[:SNIFF_BYTES])
+
+    return FetchedPage(response.status_code, response.headers, content, encoding, truncated)
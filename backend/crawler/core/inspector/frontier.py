@@ -0,0 +1,174 @@
+import heapq
+import itertools
+from urllib.parse import urlsplit
+
+# Weights of the shape of the URL's path added to its depth by the "shape" scorer - of every path segment, every query
+# parameter and every path segment that is a number (i.e. a date or a page number of a calendar or a listing)
+PATH_SEGMENT_WEIGHT = 0.1
+QUERY_PARAMETER_WEIGHT = 0.5
+NUMERIC_SEGMENT_WEIGHT = 0.5
+
+
+def score_fifo(url: str, depth: int) -> float:
+    """
+    Scores every URL/domain the same, so that they are crawled in the order they were found.
+    """
+    return 0.0
+
+
+def score_depth(url: str, depth: int) -> float:
+    """
+    Scores the URL/domain by its depth (the number of the links from the top level URL), so that the shallow pages are
+    crawled first.
+    """
+    return float(depth)
+
+
+def score_shape(url: str, depth: int) -> float:
+    """
+    Scores the URL/domain by its depth and the shape of its path. Long paths, query strings and numeric path segments
+    typical of the calendars and faceted searches wait behind the shallow pages of the same depth and a few levels
+    deeper.
+    """
+    parts = urlsplit(url)
+    segments = [segment for segment in parts.path.split('/') if segment]
+    numeric = sum(1 for segment in segments if segment.replace('-', '').isdigit())
+    parameters = len([parameter for parameter in parts.query.split('&') if parameter])
+
+    return depth + PATH_SEGMENT_WEIGHT * len(segments) + QUERY_PARAMETER_WEIGHT * parameters + \
+        NUMERIC_SEGMENT_WEIGHT * numeric
+
+
+SCORERS = {
+    "fifo": score_fifo,
+    "depth": score_depth,
+    "shape": score_shape,
+}
+
+
+def get_scorer(scorer) -> callable:
+    """
+    Returns the scoring function of the URLs/domains.
+    Args:
+        scorer: Name of the scorer, one of the `SCORERS` keys, or a function of the URL/domain and its depth returning
+                its score. URLs/domains with lower scores are crawled first.
+
+    Returns:
+        The scoring function.
+    """
+    if callable(scorer):
+        return scorer
+
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown URL scorer: {scorer}")
+
+    return SCORERS[scorer]
+
+
+class CrawlFrontier(object):
+    """
+    Priority queue of the URLs/domains waiting to be crawled, the URLs/domains with the lowest score (see `SCORERS`)
+    are crawled first and the ones of the same score in the order they were found. The queue is backed by a hash index
+    of every URL/domain it has ever accepted, so that deduplication and "seen" checks take constant time.
+
+    The frontier keeps the minimal depth of every enqueued URL/domain until its page is processed, see `pop_depth`.
+    """
+
+    def __init__(self, urls: iter = (), scorer=score_fifo):
+        """
+        Constructor method.
+        Args:
+            urls: URLs/domains the crawl starts from.
+            scorer: Name of the scorer of the URLs/domains or the scoring function, see `get_scorer`.
+        """
+        self.scorer = get_scorer(scorer)
+
+        self._queue = []
+        self._seen = set()
+        self._depths = {}
+
+        # Order of the enqueued URLs/domains breaking the ties of their scores
+        self._sequence = itertools.count()
+
+        for url in urls:
+            self.add(url)
+
+    def _entry(self, url: str, depth: int) -> tuple:
+        self._depths[url] = depth
+
+        return self.scorer(url, depth), next(self._sequence), url
+
+    def add(self, url: str, depth: int = 0) -> bool:
+        """
+        Enqueues the URL/domain unless it was seen before.
+        Args:
+            url: URL/domain to be crawled.
+            depth: Number of the links from the top level URL to the URL/domain.
+
+        Returns:
+            True if the URL/domain was enqueued, False if it was already seen.
+        """
+        if url in self._seen:
+            # A waiting URL/domain found again closer to the top level URL takes the shorter depth
+            if depth < self._depths.get(url, depth):
+                self._depths[url] = depth
+
+            return False
+
+        self._seen.add(url)
+        heapq.heappush(self._queue, self._entry(url, depth))
+
+        return True
+
+    def mark_seen(self, url: str) -> None:
+        """
+        Marks the URL/domain as seen without enqueueing it, i.e. when it was crawled before the crawl was resumed.
+        """
+        self._seen.add(url)
+
+    def pop(self) -> str:
+        """
+        Removes and returns the URL/domain with the lowest score.
+        """
+        return heapq.heappop(self._queue)[2]
+
+    def pop_depth(self, url: str) -> int:
+        """
+        Returns the depth of the popped URL/domain and forgets it, once the page of the URL/domain is processed.
+        Unknown URLs/domains (i.e. the top level URL of a resumed crawl) are at the depth 0.
+        """
+        return self._depths.pop(url, 0)
+
+    def drain(self) -> list:
+        """
+        Removes all the waiting URLs/domains, i.e. when the crawl runs out of its budget.
+
+        Returns:
+            The removed URLs/domains in the order of their scores.
+        """
+        urls = [url for _, _, url in sorted(self._queue)]
+        self._queue = []
+
+        for url in urls:
+            self._depths.pop(url, None)
+
+        return urls
+
+    def unseen(self, urls: iter) -> list:
+        """
+        Returns the URLs/domains the frontier has never accepted, in the given order.
+        """
+        return [url for url in urls if url not in self._seen]
+
+    @property
+    def seen_count(self) -> int:
+        """
+        Number of the URLs/domains ever accepted by the frontier.
+        """
+        return len(self._seen)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._seen
+
+    def __len__(self) -> int:
+        return len(self._queue)
@@ -1,187 +1,827 @@
+import asyncio
 import datetime
 import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-from bs4 import BeautifulSoup
 import requests
 import requests.exceptions
 from urllib.parse import urlsplit
-from collections import deque
-import re
 from operator import itemgetter
 from . import LOGGER
+from .boundary import BoundaryMatcher
+from .budget import CrawlBudget
+from .canonicalizer import UrlCanonicalizer
+from .extractor import get_extractor
+from .fetcher import DEFAULT_MAX_BYTES, FetchedPage, fetch
+from .metrics import CrawlMetrics
+from .parser_pool import get_parser_pool
+from .retry import FetchPolicy
+from .revalidation import conditional_headers, content_hash
+from .robots import RobotsCache, RobotsRules
+from .scheduler import HostScheduler
+from .session import get_session_pool
+
+# Default number of pages fetched at once by the asynchronous engine
+DEFAULT_CONCURRENCY = 16
+
+# Default extractor of the website titles and links
+DEFAULT_EXTRACTOR = "lxml"
+
+# Default scorer of the URLs/domains, the ones with the lowest score are crawled first
+DEFAULT_SCORER = "shape"
+
+
+def _gevent_patched() -> bool:
+    """
+    Verifies whether gevent patched the standard library, i.e. the crawl runs in a greenlet of the "gevent" worker pool.
+    """
+    monkey = sys.modules.get("gevent.monkey")
+
+    return monkey is not None and monkey.is_module_patched("threading")
 
 
 class Inspector(object):
     """
     The following class is responsible for web crawling of the particular website and constructing the JSON structure
     that reflects the Oriented Graph of crawled domains.
-    """
 
-    # Regex boundary for the crawled urls
-    _boundary_regex = None
+    Every crawl is run by its own instance keeping the state of the crawl - its boundary, frontier, leaf nodes, metrics
+    and HTTP cookies. Crawls running at once in the threads or greenlets of a process (i.e. Celery workers with the
+    "threads" or "gevent" pool) share only the thread-safe caches of the process - the connection pool, the robots.txt
+    cache and the parser processes.
+    """
 
-    def __init__(self):
+    def __init__(self, top_level_url: str, boundary_regex=None, engine: str = "sync",
+                 concurrency: int = DEFAULT_CONCURRENCY, rate_limit: float = None, max_in_flight: int = None,
+                 extractor: str = DEFAULT_EXTRACTOR, validators: dict = None, canonicalizer: UrlCanonicalizer = None,
+                 robots: RobotsCache = None, max_page_bytes: int = DEFAULT_MAX_BYTES, frontier: HostScheduler = None,
+                 parse_processes: int = 0, resume: list = None, metrics: CrawlMetrics = None,
+                 fetch_policy: FetchPolicy = None, adaptive_concurrency: bool = False, scorer=DEFAULT_SCORER,
+                 budget: CrawlBudget = None):
         """
         Constructor method.
+        Args:
+            top_level_url: URL to be crawled
+            boundary_regex: Regular expression (or a list of them) denoting the boundaries of the crawled URLs/domains.
+            engine: Crawl engine - "sync" fetches one page at a time, "async" fetches up to `concurrency` pages at once.
+            concurrency: Maximal number of pages fetched at once by the "async" engine.
+            rate_limit: Maximal number of requests per second sent to a single host. None means unlimited.
+            max_in_flight: Maximal number of requests in progress for a single host. None means unlimited.
+            extractor: Name of the extractor of the website titles and links, i.e. "lxml" or "soup".
+            validators: Map of the URLs/domains crawled before to their stored title, links and validators (see
+                        `_process_response`). Their websites are requested conditionally and parsed only if changed.
+            canonicalizer: Canonicalizer of the crawled URLs/domains, its statistics describe the crawl. A new one with
+                           the default rules is used if None.
+            robots: Cache of the robots.txt rules the crawl obeys. None means robots.txt is not read. Disallowed
+                    URLs/domains are not visited and become leaf nodes.
+            max_page_bytes: Maximal number of bytes downloaded per website, the rest of a larger website is ignored.
+            frontier: Per-host queues of the URLs/domains to be visited, i.e. the ones shared with other processes. The
+                      top_level_url is expected to be enqueued already. New queues limited by `rate_limit` and
+                      `max_in_flight` are used if None.
+            parse_processes: Number of the processes parsing the websites downloaded by the "async" engine, so that
+                             parsing runs on several cores alongside the downloads. Websites are parsed by the crawling
+                             process if 0.
+            resume: Nodes yielded by the previous, interrupted run of the crawl (i.e. loaded from a `CrawlCheckpoint`).
+                    The crawl continues with the links of these nodes not visited yet and does not yield them again.
+            metrics: Metrics the crawl adds the wall time of its phases, its counters and errors to. None means the
+                     crawl is not measured.
+            fetch_policy: Timeouts and retries of the downloads and the circuit breaking of the failing hosts. The
+                          default policy is used if None.
+            adaptive_concurrency: Whether the number of the requests in progress adapts to the latency and the
+                                  failures of every host (see `AdaptiveLimit`), up to `max_in_flight`. The current
+                                  limits are the "concurrency_limit" gauges of the metrics.
+            scorer: Name of the scorer of the URLs/domains or the scoring function (see `get_scorer`), the URLs/domains
+                    of every host are crawled best first. A shared frontier has its own scorer.
+            budget: Limits of the depth, the number of the pages, the downloaded bytes and the wall time of the crawl
+                    (see `CrawlBudget`). The crawl is unlimited if None.
         """
-        super().__init__()
+        if engine not in ("sync", "async"):
+            raise ValueError(f"Unknown crawl engine: {engine}")
+        if concurrency < 1:
+            raise ValueError("Concurrency must be a positive number")
+        if frontier is not None and resume:
+            raise ValueError("Only the crawls with their own frontier can be resumed")
+
+        self.top_level_url = top_level_url
+        self.engine = engine
+        self.concurrency = concurrency
+        self.max_page_bytes = max_page_bytes
+        self.parse_processes = parse_processes
+        self.boundary = BoundaryMatcher(boundary_regex)
+        self.extractor = get_extractor(extractor)
+        self.validators = validators or {}
+        self.canonicalizer = canonicalizer or UrlCanonicalizer()
+        self.robots = robots
+        self.metrics = metrics or CrawlMetrics()
+        self.policy = fetch_policy or FetchPolicy()
+        self.budget = budget or CrawlBudget()
+
+        # Name of the budget the crawl ran out of, see `_out_of_budget`
+        self.exhausted_budget = None
+
+        # Initialize the per-host queues of domains/urls to be visited, unless they are shared with other processes
+        self._own_frontier = frontier is None
+        self.frontier = frontier or HostScheduler((), rate_limit, max_in_flight,
+                                                  failure_threshold=self.policy.failure_threshold,
+                                                  cooldown=self.policy.cooldown, max_trips=self.policy.max_trips,
+                                                  adaptive=adaptive_concurrency, scorer=scorer)
+        self._resumed = resume or ()
+
+        # Set of urls that won't be visited - Leafs
+        self.filtered_urls = set()
+
+        # URLs within the boundary found deeper than the budget allows only, they become leafs once the crawl ends
+        # unless they are found closer to the top level URL meanwhile
+        self.deep_urls = set()
+
+        # Cookies of the crawl, the connections are shared with the other crawls of the process
+        self.session = get_session_pool().crawl_session()
+
+        self._started = False
 
     @classmethod
-    def _matches_regex_boundary(cls, url: str) -> bool:
+    def crawl_url(cls, top_level_url: str, boundary_regex=None, **options) -> list:
         """
-        Verifies whether the URL about to be crawled matches the given boundary regex - if provided. If no boundary was
-        set, then True is implicitly returned.
+        Crawls the provided top_level_url for all the links that is contains considering the provided boundary_regex
+        expression by a new instance.
+
         Args:
-            url: URL/domain about to be crawled.
+            top_level_url: URL to be crawled
+            boundary_regex: Regular expression (or a list of them) denoting the boundaries of the crawled URLs/domains.
+            options: Options of the crawl, see the constructor.
 
         Returns:
-            True if provided URL matches boundary regular expression or if the expression was not set. Else False.
+            List of objects (dictionaries) representing the information about the nodes (crawled domains/URLs) and
+            relations among them.
         """
-        return re.match(rf'{cls._boundary_regex}', url) if cls._boundary_regex else True
+        return cls(top_level_url, boundary_regex, **options).crawl()
 
     @classmethod
-    def _handle_urls(cls, urls: set, new_urls: deque, processed_urls: set, cur_node: dict, filtered_urls: set,
-                     base_url: str) -> None:
+    def iter_crawl(cls, top_level_url: str, boundary_regex=None, **options) -> iter:
+        """
+        Crawls the provided top_level_url by a new instance the same way as `crawl_url` does, but yields the nodes as
+        soon as they are crawled, see `iter_nodes`.
+        """
+        return cls(top_level_url, boundary_regex, **options).iter_nodes()
+
+    @classmethod
+    async def crawl_url_async(cls, top_level_url: str, boundary_regex=None, **options) -> list:
+        """
+        Crawls the provided top_level_url by a new instance the same way as `crawl_url` does, but fetches up to
+        `concurrency` pages at once, see `crawl_async`.
+        """
+        return await cls(top_level_url, boundary_regex, **options).crawl_async()
+
+    @classmethod
+    def iter_crawl_async(cls, top_level_url: str, boundary_regex=None, **options):
+        """
+        Asynchronous generator yielding the nodes crawled by `crawl_url_async` as soon as they are crawled.
+        """
+        return cls(top_level_url, boundary_regex, **options).iter_nodes_async()
+
+    def crawl(self) -> list:
+        """
+        Crawls the top_level_url for all the links that is contains considering the boundary_regex expression.
+
+        Returns:
+            List of objects (dictionaries) representing the information about the nodes (crawled domains/URLs) and
+            relations among them.
+        """
+        return sorted(self.iter_nodes(), key=itemgetter("url"))
+
+    def iter_nodes(self) -> iter:
+        """
+        Crawls the top_level_url the same way as `crawl` does, but yields the nodes as soon as they are crawled instead
+        of collecting them, so that they can be processed while the crawl is still running.
+
+        Returns:
+            Generator of objects (dictionaries) representing the information about the nodes (crawled domains/URLs)
+            and relations among them - in the order they were crawled.
+        """
+        if self.engine == "async":
+            if not _gevent_patched():
+                return self._iter_async(self.iter_nodes_async())
+
+            # Event loops of the greenlets would share a thread, the greenlets download concurrently anyway
+            LOGGER.log(logging.WARNING, "Crawling %s by the sync engine, the async one can't run in greenlets"
+                       % self.top_level_url)
+
+        return self._iter_sync()
+
+    async def crawl_async(self) -> list:
+        """
+        Crawls the top_level_url the same way as `crawl` does, but fetches up to `concurrency` pages at once. Blocking
+        downloads run in a thread pool, so that the event loop keeps dispatching while they wait for the network.
+
+        Returns:
+            List of objects (dictionaries) representing the information about the nodes (crawled domains/URLs) and
+            relations among them.
+        """
+        nodes = [node async for node in self.iter_nodes_async()]
+
+        return sorted(nodes, key=itemgetter("url"))
+
+    def _start(self) -> list:
+        """
+        Marks the crawl as started and enqueues the top_level_url, an instance runs a single crawl.
+
+        Returns:
+            Nodes of the leaf URLs/domains referenced by the resumed nodes that were not yielded yet.
+        """
+        if self._started:
+            raise RuntimeError("The crawl has already started, every crawl needs its own Inspector")
+
+        self._started = True
+        self.budget.start()
+
+        if not self._own_frontier:
+            return []
+
+        nodes = self._leaf_nodes(self._resume(self._resumed))
+        self.frontier.add(self.canonicalizer.canonicalize(self.top_level_url) or self.top_level_url)
+
+        return nodes
+
+    def _handle_urls(self, urls: set, cur_node: dict, base_url: str, depth: int) -> list:
         """
         Divides the provided urls into to groups - those to be processed and those that represents the leaf nodes
         and won't be visited.
 
         Args:
             urls: URLs to be categorized
-            new_urls: Dequeue of the URLs to be visited.
-            processed_urls: Set of URLs that were already processed.
             cur_node: Current URL/domain node.
-            filtered_urls: Set of URLs/domains that represents leaf nodes and won't be visited at all.
             base_url: Base URL for the deduplication from the target set (each URL/domain node would have referenced
                       itself)
+            depth: Depth of the URLs, URLs deeper than the budget allows are kept aside, see `_deep_leaf_nodes`.
+
+        Returns:
+            List of the newly observed URLs/domains that represents leaf nodes.
         """
+        new_filtered_urls = []
+
         for url in urls:
-            if url not in new_urls and url not in processed_urls and cls._matches_regex_boundary(url):
-                new_urls.append(url)
-            elif not cls._matches_regex_boundary(url) and base_url != url:
-                filtered_urls.add(url)
+            if url in self.filtered_urls:
+                pass
+            elif self.boundary(url):
+                if self.budget.allows_depth(depth):
+                    self.deep_urls.discard(url)
+                    self.frontier.add(url, depth)
+                elif url not in self.frontier:
+                    self.deep_urls.add(url)
+            elif base_url != url and url not in self.frontier:
+                self.filtered_urls.add(url)
+                new_filtered_urls.append(url)
 
             if url != cur_node["url"]:
                 cur_node["execution_targets"].append(url)
 
-    @classmethod
-    def _inspect_url(cls, links: list, base_url: str, strip_base: str, path: str) -> set:
+        return new_filtered_urls
+
+    def _inspect_url(self, links: list, url: str) -> set:
         """
         Handles the provided list of links, normalizes them and adds them for further processing.
         Args:
-            links: List of links observed in the current iteration (crawled URL/domain)
-            base_url: Full domain URL, i.e. https://example.com or https://www.example.com
-            strip_base: Domain name, i.e. example.com
-            path:  Base URL with ending slash '/'
+            links: List of link targets (anchor hrefs) observed in the current iteration (crawled URL/domain)
+            url: URL/domain of the crawled website the relative links are resolved against.
 
         Returns:
             Set of the URLs/domains that will be subject to further filtering and processing if not processed yet.
         """
-        urls_to_be_processed = set()
+        return self.canonicalizer.resolve(links, url)
 
-        for link in links:
-            # extract link url from the anchor
-            anchor = link.attrs["href"] if "href" in link.attrs else ''
+    def _fetch(self, url: str, headers: dict = None) -> FetchedPage:
+        """
+        Downloads the provided URL by a single attempt.
+        Args:
+            url: URL/domain about to be crawled.
+            headers: Additional headers of the request, i.e. the validators of a conditional request.
 
-            if anchor.startswith('#') or 'mailto' in anchor:
-                continue
-            elif anchor.startswith('/'):
-                local_link = base_url + anchor
-                urls_to_be_processed.add(local_link)
-            elif strip_base in anchor:
-                urls_to_be_processed.add(anchor)
-            elif not anchor.startswith('http'):
-                local_link = path + anchor
-                urls_to_be_processed.add(local_link)
-            else:
-                urls_to_be_processed.add(anchor)
-
-        return urls_to_be_processed
+        Returns:
+            The downloaded website, its content is empty if it is not an HTML document.
+        """
+        return fetch(self.session, url, headers, self.max_page_bytes, self.policy.timeout, self.policy.deadline)
 
-    @classmethod
-    def crawl_url(cls, top_level_url: str, boundary_regex: str = None) -> list:
+    def _fetch_retrying(self, url: str, headers: dict) -> FetchedPage:
         """
-        Crawls the provided top_level_url for all the links that is contains considering the provided boundary_regex
-        expression.
+        Downloads the provided URL, the download failing transiently is repeated as the policy allows (see `_fetch`).
+        The "async" engine repeats the downloads by its own coroutine, so that the backoff does not block a thread.
+
+        Returns:
+            The downloaded website, the last response if every attempt failed by a transient response. The last error
+            is raised if every attempt failed by an error.
+        """
+        attempt = 0
+
+        while True:
+            try:
+                response, error = self._fetch(url, headers), None
+            except requests.exceptions.RequestException as exception:
+                response, error = None, exception
+
+            delay = self.policy.retry_delay(attempt, error, response)
+
+            if delay is None:
+                break
+
+            self.metrics.increment("retries")
+            time.sleep(delay)
+            attempt += 1
+
+        if error is not None:
+            raise error
 
+        return response
+
+    def _record_outcome(self, url: str, error: Exception = None, response: FetchedPage = None,
+                        latency: float = None) -> None:
+        """
+        Records the outcome of the download in the circuit and the concurrency limit of its host.
+        """
+        if FetchPolicy.is_host_failure(error, response):
+            self.metrics.increment("host_failures")
+            dropped = self.frontier.record_failure(url)
+
+            if dropped:
+                self.metrics.increment("dropped", dropped)
+        else:
+            self.frontier.record_success(url, latency)
+
+        limit = self.frontier.concurrency_limit(url)
+
+        if limit is not None:
+            self.metrics.gauge("concurrency_limit", urlsplit(url).netloc, round(limit, 2))
+
+    def _parse_page(self, url: str, content: bytes, encoding: str, extracted: tuple = None) -> (dict, set, str):
+        """
+        Parses the downloaded website and builds the node representing it.
         Args:
-            top_level_url: URL to be crawled
-            boundary_regex: Regular expression denoting the boundaries of the crawled URLs/domains.
+            url: URL/domain of the crawled website.
+            content: Raw content of the crawled website.
+            encoding: Encoding of the content or None if it should be detected by the parser.
+            extracted: Title and links already extracted out of the content (i.e. by a parser process) or None if the
+                       content should be parsed here.
 
         Returns:
-            List of objects (dictionaries) representing the information about the nodes (crawled domains/URLs) and
-            relations among them.
+            Node of the crawled URL/domain (without execution targets), set of the URLs/domains referenced by it and
+            the base URL of the website.
         """
+        parts = urlsplit(url)
+        base = f"{parts.netloc}"
+        base_url = f"{parts.scheme}://{parts.netloc}/"
 
-        # Initialize the boundary
-        cls._boundary_regex = boundary_regex
+        # Initialize current node
+        cur_node = {"url": url, "domain": base, "execution_targets": [], "crawl_time": datetime.datetime.now(),
+                    "boundary_record": False}
 
-        # Output array of nodes (crawled websites)
-        out_dump = []
+        start = time.perf_counter()
 
-        # Initialize the queue
-        new_urls = deque([top_level_url])
+        if extracted is None:
+            try:
+                extracted = self.extractor.extract(content, encoding)
+            except Exception as error:
+                # The website is a node without a title and links then, the crawl goes on
+                LOGGER.log(logging.ERROR, "Failed to parse % s: %s" % (url, error))
+                self.metrics.error(error)
+                extracted = None, []
 
-        # Visited domains/urls
-        processed_urls = set()
+            self.metrics.observe("parse", time.perf_counter() - start)
+            start = time.perf_counter()
 
-        # Set of domains inside the target website
-        urls_to_be_processed = set()
+        cur_node['title'], links = extracted
 
-        # Set of urls that won't be visited - Leafs
-        filtered_urls = set()
+        urls = self._inspect_url(links, url)
+        self.metrics.observe("extract", time.perf_counter() - start)
 
-        while len(new_urls):
-            url = new_urls.popleft()
-            processed_urls.add(url)
+        return cur_node, urls, base_url
 
-            LOGGER.log(logging.DEBUG, "Processing % s" % url)
+    def _resume(self, nodes: list) -> list:
+        """
+        Restores the state of an interrupted crawl out of the nodes it yielded - marks their URLs/domains as seen,
+        enqueues the links of the crawled ones that were not visited yet and counts the crawled pages to the budget.
+        Args:
+            nodes: Nodes yielded by the interrupted crawl.
 
-            try:
-                # Get the website
-                response = requests.get(url)
+        Returns:
+            List of the URLs/domains that represents leaf nodes and whose nodes were not yielded yet.
+        """
+        for node in nodes:
+            self.frontier.mark_seen(node["url"])
 
-                # Extract base url to resolve relative links
-                parts = urlsplit(url)
-                base = f"{parts.netloc}"
-                strip_base = base.replace("www.", "")
-                base_url = f"{parts.scheme}://{parts.netloc}"
-                path = url[:url.rfind('/') + 1] if '/' in parts.path else url
+            if node["boundary_record"]:
+                self.filtered_urls.add(node["url"])
 
-                # Initialize current node
-                cur_node = {"url": url, "domain": base, "execution_targets": [], "crawl_time": datetime.datetime.now(),
-                            "boundary_record": False}
+        new_filtered_urls = []
 
-                soup = BeautifulSoup(response.text, "lxml")
+        for node in nodes:
+            if not node["boundary_record"]:
+                parts = urlsplit(node["url"])
+                new_filtered_urls += self._handle_urls(node["execution_targets"],
+                                                       {"url": node["url"], "execution_targets": []},
+                                                       f"{parts.scheme}://{parts.netloc}/", node.get("depth", 0) + 1)
+                self.budget.spend()
 
-                # Merge to be processed URLs with the current set of newly observed domains
-                urls_to_be_processed = urls_to_be_processed.union(
-                    cls._inspect_url(soup.find_all('a'), base_url, strip_base, path))
+        return new_filtered_urls
 
-                website_title = soup.find('title')
+    def _obeys_robots(self, rules: RobotsRules, url: str) -> bool:
+        """
+        Applies the robots.txt rules of the URL's host - lowers the host's rate limit to its Crawl-delay and verifies
+        whether the URL may be crawled.
+        Args:
+            rules: Rules of the robots.txt of the URL's host.
+            url: URL/domain about to be crawled.
 
-                cur_node['title'] = website_title.text if website_title else None
+        Returns:
+            True if the URL may be crawled. Else False.
+        """
+        if rules.crawl_delay:
+            self.frontier.limit_host(urlsplit(url).netloc, 1 / rules.crawl_delay)
 
-                cls._handle_urls(urls_to_be_processed, new_urls, processed_urls, cur_node, filtered_urls, base_url)
+        if not rules.allowed(url):
+            LOGGER.log(logging.INFO, "Disallowed by robots.txt % s" % url)
+            return False
 
-                cur_node["execution_targets"] = sorted(cur_node["execution_targets"])
+        return True
 
-                # Add to result set
-                out_dump.append(cur_node)
+    @staticmethod
+    def _reuse_page(url: str, page: dict) -> (dict, set, str):
+        """
+        Builds the node of an unchanged website out of the title and the links stored by its previous crawl, so that
+        the website is not parsed again.
+        Args:
+            url: URL/domain of the crawled website.
+            page: Title, links and validators stored by the previous crawl of the website.
 
-            except(
-                    requests.exceptions.MissingSchema, requests.exceptions.ConnectionError,
-                    requests.exceptions.InvalidURL,
-                    requests.exceptions.InvalidSchema):
+        Returns:
+            Node of the crawled URL/domain (without execution targets), set of the URLs/domains referenced by it and
+            the base URL of the website.
+        """
+        parts = urlsplit(url)
 
-                LOGGER.log(logging.ERROR, "Failed to process % s" % url)
+        cur_node = {"url": url, "domain": f"{parts.netloc}", "execution_targets": [],
+                    "crawl_time": datetime.datetime.now(), "boundary_record": False, "title": page.get("title")}
+
+        return cur_node, set(page.get("links") or ()), f"{parts.scheme}://{parts.netloc}/"
+
+    @staticmethod
+    def _needs_parsing(response: FetchedPage, page: dict) -> bool:
+        """
+        Verifies whether the downloaded website has to be parsed, i.e. it has some content that changed since its
+        previous crawl.
+        """
+        if not response.content:
+            return False
+
+        return page is None or response.status_code != 304 and content_hash(response.content) != page.get(
+            "content_hash")
 
-        # Add leaf nodes
-        out_dump = out_dump + [
+    @staticmethod
+    def _leaf_nodes(filtered_urls: iter) -> list:
+        """
+        Builds the nodes of the URLs/domains that won't be visited.
+        Args:
+            filtered_urls: URLs/domains that represents leaf nodes.
+
+        Returns:
+            List of the leaf nodes.
+        """
+        return [
             {"url": x, "domain": f"{urlsplit(x).netloc}", "execution_targets": [],
              "crawl_time": datetime.datetime.now(),
              "title": f"{urlsplit(x).netloc}", "boundary_record": True}
             for x in
             filtered_urls]
 
-        return sorted(out_dump, key=itemgetter("url"))
+    def _process_response(self, url: str, response: FetchedPage, depth: int = 0, page: dict = None,
+                          extracted: tuple = None) -> list:
+        """
+        Builds the node of the crawled URL/domain and passes the links it contains to the frontier. The website is not
+        parsed if it did not change since its previous crawl, its stored links are used instead.
+        Args:
+            url: URL/domain of the crawled website.
+            response: Downloaded website.
+            depth: Depth of the URL/domain, see `CrawlBudget`.
+            page: Title, links and validators stored by the previous crawl of the website or None.
+            extracted: Title and links already extracted out of the content or None if it should be parsed here.
+
+        Returns:
+            Node of the crawled URL/domain followed by the nodes of the newly observed leaf URLs/domains. The node of
+            the crawled URL/domain carries its validators and links to be stored for the next crawl.
+        """
+        metrics = self.metrics
+        metrics.increment("pages")
+        metrics.increment("bytes", len(response.content))
+        self.budget.spend(size=len(response.content))
+
+        if response.skipped:
+            LOGGER.log(logging.DEBUG, "Skipped non-HTML content of % s" % url)
+            metrics.increment("skipped")
+        elif response.truncated:
+            LOGGER.log(logging.WARNING, "Truncated content of % s" % url)
+            metrics.increment("truncated")
+
+        not_modified = page is not None and response.status_code == 304
+        digest = page.get("content_hash") if not_modified else content_hash(response.content)
+        unchanged = page is not None and digest == page.get("content_hash")
+
+        if unchanged:
+            cur_node, urls, base_url = self._reuse_page(url, page)
+            metrics.increment("unchanged")
+        else:
+            cur_node, urls, base_url = self._parse_page(url, response.content, response.encoding, extracted)
+
+        # Servers may omit the validators from the 304 response, the stored ones remain valid then
+        cur_node.update({
+            "etag": response.headers.get('ETag') or (page.get("etag") if not_modified else None),
+            "last_modified": response.headers.get('Last-Modified') or (page.get("last_modified") if not_modified
+                                                                        else None),
+            "content_hash": digest,
+            "links": sorted(urls),
+            "unchanged": unchanged,
+            "depth": depth,
+        })
+
+        start = time.perf_counter()
+        new_filtered_urls = self._handle_urls(urls, cur_node, base_url, depth + 1)
+        metrics.observe("frontier", time.perf_counter() - start, len(urls))
+        metrics.increment("leaves", len(new_filtered_urls))
+
+        cur_node["execution_targets"] = sorted(cur_node["execution_targets"])
+
+        return [cur_node] + self._leaf_nodes(new_filtered_urls)
+
+    def _out_of_budget(self) -> bool:
+        """
+        Verifies whether the crawl ran out of its budget, so that it requests no new URL/domain.
+        """
+        if self.exhausted_budget is None:
+            self.exhausted_budget = self.budget.exhausted()
+
+            if self.exhausted_budget is not None:
+                LOGGER.log(logging.WARNING, "Crawl of %s ran out of its %s budget" % (self.top_level_url,
+                                                                                    self.exhausted_budget))
+                self.metrics.increment(f"budget_{self.exhausted_budget}")
+
+        return self.exhausted_budget is not None
+
+    def _drain(self) -> list:
+        """
+        Removes the URLs/domains left in the frontier of a crawl that ran out of its budget.
+
+        Returns:
+            List of the leaf nodes of the removed URLs/domains, so that the partial graph keeps the links to them.
+        """
+        urls = [url for url in self.frontier.drain() if url not in self.filtered_urls]
+        self.filtered_urls.update(urls)
+        self.deep_urls.difference_update(urls)
+        self.metrics.increment("unvisited", len(urls))
+
+        return self._leaf_nodes(urls)
+
+    def _deep_leaf_nodes(self) -> list:
+        """
+        Builds the leaf nodes of the URLs/domains found deeper than the budget allows only, once the crawl ended.
+        """
+        urls = self.frontier.unseen(sorted(self.deep_urls - self.filtered_urls))
+        self.filtered_urls.update(urls)
+        self.deep_urls.clear()
+        self.metrics.increment("leaves", len(urls))
+
+        return self._leaf_nodes(urls)
+
+    def _iter_sync(self) -> iter:
+        """
+        Crawl loop of the "sync" engine, see `iter_nodes`.
+        """
+        yield from self._start()
+
+        frontier = self.frontier
+        metrics = self.metrics
+
+        while frontier and not self._out_of_budget():
+            start = time.perf_counter()
+            url = frontier.pop()
+            metrics.observe("frontier", time.perf_counter() - start)
+
+            if url is None:
+                # Every host with pending urls has exhausted its rate limit
+                time.sleep(frontier.delay())
+                continue
+
+            LOGGER.log(logging.DEBUG, "Processing % s" % url)
+
+            page = self.validators.get(url)
+            depth = frontier.pop_depth(url)
+
+            try:
+                allowed = True
+
+                if self.robots is not None:
+                    start = time.perf_counter()
+                    allowed = self._obeys_robots(self.robots.rules(url), url)
+                    metrics.observe("robots", time.perf_counter() - start)
+
+                # Get the website, unless it did not change since the previous crawl
+                if allowed:
+                    start = time.perf_counter()
+                    response = self._fetch_retrying(url, conditional_headers(page))
+                    latency = time.perf_counter() - start
+                    metrics.observe("fetch", latency)
+                    self._record_outcome(url, response=response, latency=latency)
+
+            except requests.exceptions.RequestException as error:
+                LOGGER.log(logging.ERROR, "Failed to process % s" % url)
+                metrics.error(error)
+                self._record_outcome(url, error=error)
+                continue
+
+            finally:
+                frontier.release(url)
+
+            if not allowed:
+                metrics.increment("disallowed")
+                yield from self._leaf_nodes([url])
+                continue
+
+            yield from self._process_response(url, response, depth, page)
+
+        if self.exhausted_budget is not None:
+            yield from self._drain()
+
+        yield from self._deep_leaf_nodes()
+
+    @staticmethod
+    def _iter_async(nodes) -> iter:
+        """
+        Iterates the asynchronous generator of nodes in a new event loop.
+        """
+        loop = asyncio.new_event_loop()
+
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(nodes.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(nodes.aclose())
+            loop.close()
+
+    async def iter_nodes_async(self):
+        """
+        Asynchronous generator yielding the nodes crawled by `crawl_async` as soon as they are crawled.
+        """
+        for node in self._start():
+            yield node
+
+        frontier = self.frontier
+        metrics = self.metrics
+        validators = self.validators
+        concurrency = self.concurrency
+
+        loop = asyncio.get_running_loop()
+
+        # Processes parsing the downloaded websites
+        parsers = get_parser_pool(self.parse_processes) if self.parse_processes else None
+
+        async def parse_page(url: str, response: FetchedPage, page: dict) -> tuple:
+            """
+            Extracts the title and links of the changed website in a parser process, None if it is parsed here.
+            """
+            if parsers is None or not self._needs_parsing(response, page):
+                return None
+
+            start = time.perf_counter()
+
+            try:
+                extracted = await asyncio.wrap_future(parsers.submit(self.extractor, response.content,
+                                                                     response.encoding))
+                metrics.observe("parse", time.perf_counter() - start)
+
+                return extracted
+            except BrokenProcessPool as error:
+                metrics.error(error)
+                LOGGER.log(logging.ERROR, "Parser process died, parsing in the crawling process")
+                parsers.broken = True
+                return None
+            except Exception as error:
+                # The website is a node without a title and links then, see `_parse_page`
+                metrics.error(error)
+                LOGGER.log(logging.ERROR, "Failed to parse % s: %s" % (url, error))
+                return None, []
+
+        async def fetch_retrying(executor: ThreadPoolExecutor, url: str) -> FetchedPage:
+            """
+            Downloads the website as `_fetch_retrying` does, but waits for the repeated attempts without a thread.
+            """
+            headers = conditional_headers(validators.get(url))
+            attempt = 0
+
+            while True:
+                try:
+                    response, error = await loop.run_in_executor(executor, self._fetch, url, headers), None
+                except requests.exceptions.RequestException as exception:
+                    response, error = None, exception
+
+                delay = self.policy.retry_delay(attempt, error, response)
+
+                if delay is None:
+                    break
+
+                metrics.increment("retries")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+            if error is not None:
+                raise error
+
+            return response
+
+        async def fetch_page(executor: ThreadPoolExecutor, url: str) -> (str, bool, FetchedPage, tuple):
+            LOGGER.log(logging.DEBUG, "Processing % s" % url)
+
+            try:
+                if self.robots is not None:
+                    start = time.perf_counter()
+                    rules = await loop.run_in_executor(executor, self.robots.rules, url)
+                    metrics.observe("robots", time.perf_counter() - start)
+
+                    if not self._obeys_robots(rules, url):
+                        return url, False, None, None
+
+                start = time.perf_counter()
+                response = await fetch_retrying(executor, url)
+                latency = time.perf_counter() - start
+                metrics.observe("fetch", latency)
+                self._record_outcome(url, response=response, latency=latency)
+
+                # The URL is released once parsed, so that a shared frontier does not count it as done before its
+                # links are added
+                return url, True, response, await parse_page(url, response, validators.get(url))
+
+            except requests.exceptions.RequestException as error:
+                LOGGER.log(logging.ERROR, "Failed to process % s" % url)
+                metrics.error(error)
+                self._record_outcome(url, error=error)
+
+                return url, True, None, None
+
+            finally:
+                frontier.release(url)
+
+        # Downloads in progress and the depths of their URLs/domains
+        in_flight = set()
+        depths = {}
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            try:
+                # Downloads in progress finish once the crawl ran out of its budget
+                while frontier and not self._out_of_budget() or in_flight:
+                    # Downloads in progress count to the page budget, so that they do not overshoot it
+                    while len(in_flight) < concurrency and not self._out_of_budget() and \
+                            self.budget.allows_request(len(in_flight)):
+                        start = time.perf_counter()
+                        url = frontier.pop()
+                        metrics.observe("frontier", time.perf_counter() - start)
+
+                        if url is None:
+                            break
+
+                        depths[url] = frontier.pop_depth(url)
+                        in_flight.add(asyncio.create_task(fetch_page(executor, url)))
+
+                    # Wake up when a download finishes or when a rate limited host may be requested again
+                    timeout = frontier.delay() if frontier and self.exhausted_budget is None else None
+
+                    if not in_flight:
+                        await asyncio.sleep(timeout)
+                        continue
+
+                    done, in_flight = await asyncio.wait(in_flight, timeout=timeout,
+                                                         return_when=asyncio.FIRST_COMPLETED)
+
+                    for task in done:
+                        url, allowed, response, extracted = task.result()
+                        depth = depths.pop(url)
+
+                        if not allowed:
+                            metrics.increment("disallowed")
+
+                            for node in self._leaf_nodes([url]):
+                                yield node
+                        elif response is not None:
+                            for node in self._process_response(url, response, depth, validators.get(url),
+                                                               extracted):
+                                yield node
+            finally:
+                for task in in_flight:
+                    task.cancel()
+
+        if self.exhausted_budget is not None:
+            for node in self._drain():
+                yield node
+
+        for node in self._deep_leaf_nodes():
+            yield node
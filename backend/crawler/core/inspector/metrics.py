@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+# Phases of a crawl whose wall time is measured
+PHASES = ("frontier", "robots", "fetch", "parse", "extract", "transform", "persist")
+
+
+class CrawlMetrics(object):
+    """
+    Wall time and number of the operations of every phase of a crawl, counters of its events (i.e. crawled pages and
+    downloaded bytes), the number of its errors by their type and the latest values of its gauges (i.e. the
+    concurrency limits of the crawled hosts). Phases are timed by the caller, so that measuring
+    costs a clock read and a dictionary update only.
+
+    Phases running in parallel (i.e. the downloads of the "async" engine) add up their time, so the sum of the phases
+    may exceed the duration of the crawl. The metrics are updated by the crawl loop only, they are not thread-safe.
+    """
+
+    def __init__(self):
+        """
+        Constructor method.
+        """
+        self._seconds = defaultdict(float)
+        self._operations = defaultdict(int)
+        self._counters = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._gauges = defaultdict(dict)
+
+    def observe(self, phase: str, seconds: float, operations: int = 1) -> None:
+        """
+        Adds the wall time of the operations of the phase.
+        Args:
+            phase: Name of the phase, one of the `PHASES`.
+            seconds: Wall time of the operations in seconds.
+            operations: Number of the measured operations.
+        """
+        self._seconds[phase] += seconds
+        self._operations[phase] += operations
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        """
+        Increases the counter of the events, i.e. "pages" or "bytes".
+        """
+        self._counters[counter] += value
+
+    def error(self, error: Exception) -> None:
+        """
+        Counts the error by the name of its type.
+        """
+        self._errors[type(error).__name__] += 1
+
+    def gauge(self, gauge: str, key: str, value: float) -> None:
+        """
+        Sets the latest value of the gauge for the key, i.e. the "concurrency_limit" of a host.
+        """
+        self._gauges[gauge][key] = value
+
+    def merge(self, metrics: dict) -> None:
+        """
+        Adds the metrics of another crawl (i.e. of another worker of the same crawl), see `as_dict`.
+        """
+        for phase, values in metrics.get("phases", {}).items():
+            self.observe(phase, values["seconds"], values["operations"])
+        for counter, value in metrics.get("counters", {}).items():
+            self.increment(counter, value)
+        for error, count in metrics.get("errors", {}).items():
+            self._errors[error] += count
+        for gauge, values in metrics.get("gauges", {}).items():
+            self._gauges[gauge].update(values)
+
+    def as_dict(self) -> dict:
+        """
+        Returns the metrics as a JSON serializable dictionary of the phases (their seconds and operations), the
+        counters, the errors and the gauges.
+        """
+        return {
+            "phases": {phase: {"seconds": self._seconds[phase], "operations": self._operations[phase]}
+                       for phase in list(self._seconds)},
+            "counters": dict(self._counters),
+            "errors": dict(self._errors),
+            "gauges": {gauge: dict(values) for gauge, values in self._gauges.items()},
+        }
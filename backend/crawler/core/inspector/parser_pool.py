@@ -0,0 +1,89 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import LOGGER
+from .extractor import LinkExtractor
+
+
+def _extract(extractor: LinkExtractor, content: bytes, encoding: str) -> (str, list):
+    """
+    Runs in a parser process, so that only the raw content is sent there and only the title and the links come back.
+    """
+    return extractor.extract(content, encoding)
+
+
+class ParserPool(object):
+    """
+    Pool of the processes extracting the titles and links of the downloaded websites. Parsing holds the GIL, so the
+    extraction of a crawl running in the pool uses all the cores while the crawl keeps downloading other websites.
+
+    The processes are spawned rather than forked, since the crawling processes run threads.
+    """
+
+    def __init__(self, processes: int):
+        """
+        Constructor method.
+        Args:
+            processes: Number of the parser processes.
+        """
+        if processes < 1:
+            raise ValueError("Number of the parser processes must be a positive number")
+
+        self.processes = processes
+        self.broken = False
+        self._executor = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, extractor: LinkExtractor, content: bytes, encoding: str = None) -> Future:
+        """
+        Schedules the extraction of the website's title and links in a parser process.
+        Args:
+            extractor: Extractor of the website title and links, it is sent to the process with the content.
+            content: Raw content of the website.
+            encoding: Encoding of the content or None if the parser should detect it.
+
+        Returns:
+            Future of the title of the website (None if it has none) and the list of the `href` attributes of its
+            anchors.
+        """
+        try:
+            return self._executor.submit(_extract, extractor, content, encoding)
+        except BrokenProcessPool:
+            self.broken = True
+            raise
+
+    def shutdown(self) -> None:
+        """
+        Stops the parser processes once the scheduled extractions finish.
+        """
+        self._executor.shutdown()
+
+
+# Parser pools of the current process by their number of the processes
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_parser_pool(processes: int) -> ParserPool:
+    """
+    Returns the parser pool of the current process with the number of the processes, so that the processes are
+    spawned once and shared by the crawls. Crawls asking for a different number of the processes get a pool of their
+    own, since the pools may still be used by the running crawls. Only a pool whose parser process died is replaced.
+    Args:
+        processes: Number of the parser processes.
+
+    Returns:
+        The parser pool.
+    """
+    with _pools_lock:
+        pool = _pools.get(processes)
+
+        if pool is None or pool.broken:
+            if pool is not None:
+                LOGGER.info("Replacing the broken parser pool of %d processes", processes)
+                pool.shutdown()
+
+            pool = _pools[processes] = ParserPool(processes)
+
+        return pool
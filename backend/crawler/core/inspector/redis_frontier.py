@@ -0,0 +1,328 @@
+import time
+
+from . import LOGGER
+from .budget import CrawlBudget
+from .frontier import score_fifo
+from .scheduler import DEFAULT_COOLDOWN, DEFAULT_MAX_TRIPS, HostScheduler
+
+# Default number of the URLs taken from the shared queue at once
+DEFAULT_BATCH_SIZE = 32
+
+# Default number of seconds the keys of a crawl are kept in Redis after its last change
+DEFAULT_TTL = 24 * 60 * 60
+
+# Default number of seconds to wait before asking the shared queue for more URLs again
+DEFAULT_POLL_INTERVAL = 0.2
+
+# Default number of seconds a process waits for new URLs, while other processes seem to crawl, before it gives up
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+
+# Maximal number of seconds the found URLs are kept in the process before they are pushed to the shared queue
+SYNC_INTERVAL = 1.0
+
+# Enqueues the URLs not seen before, unless the crawl was stopped, and marks the given number of the popped URLs as
+# done. The queue is sorted by the scores of the URLs, its members are the depths and the URLs separated by a space.
+# KEYS: seen set, queue, pending counter, stop flag; ARGV: number of the done URLs, TTL, triples of URL, depth and score
+_PUSH_SCRIPT = """
+local stopped = redis.call('EXISTS', KEYS[4]) == 1
+for i = 3, #ARGV, 3 do
+    if redis.call('SADD', KEYS[1], ARGV[i]) == 1 and not stopped then
+        redis.call('ZADD', KEYS[2], ARGV[i + 2], ARGV[i + 1] .. ' ' .. ARGV[i])
+    end
+end
+local pending = redis.call('DECRBY', KEYS[3], ARGV[1])
+for _, key in ipairs(KEYS) do
+    redis.call('EXPIRE', key, ARGV[2])
+end
+return {redis.call('ZCARD', KEYS[2]), pending}
+"""
+
+# Pops up to the given number of the URLs with the lowest scores and counts them as pending until they are marked as
+# done.
+# KEYS: queue, pending counter; ARGV: number of the URLs
+_POP_SCRIPT = """
+local popped = redis.call('ZPOPMIN', KEYS[1], ARGV[1])
+local members = {}
+for i = 1, #popped, 2 do
+    members[#members + 1] = popped[i]
+end
+if #members > 0 then
+    redis.call('INCRBY', KEYS[2], #members)
+end
+return members
+"""
+
+
+def crawl_keys(crawl_id: str) -> dict:
+    """
+    Returns the Redis keys of the shared state of the crawl. The keys share a hash tag, so that they are kept by the
+    same node of a Redis cluster.
+    """
+    return {name: f"crawl:{{{crawl_id}}}:{name}" for name in ("seen", "queue", "pending", "stop", "budget", "nodes")}
+
+
+class RedisFrontier(HostScheduler):
+    """
+    Frontier of a single crawl shared by several processes through Redis. The URLs to be visited are kept in a Redis
+    sorted set by their scores and deduplicated by a Redis set, every process takes the best ones in batches into its
+    own per-host queues, so that its politeness limits still apply, and pushes the URLs it finds back with their depths.
+
+    Redis also counts the URLs taken by the processes and not processed yet. The crawl is finished once the shared
+    queue is empty and no URL is being processed anywhere. A URL counts as processed when the process consults the
+    frontier again after it was released, the crawl engines pass the links of the released URL to the frontier before
+    that.
+    """
+
+    def __init__(self, redis, crawl_id: str, batch_size: int = DEFAULT_BATCH_SIZE, rate_limit: float = None,
+                 max_in_flight: int = None, ttl: int = DEFAULT_TTL, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, clock: callable = time.monotonic,
+                 failure_threshold: int = None, cooldown: float = DEFAULT_COOLDOWN, max_trips: int = DEFAULT_MAX_TRIPS,
+                 adaptive: bool = False, scorer=score_fifo):
+        """
+        Constructor method.
+        Args:
+            redis: Redis client.
+            crawl_id: Identifier of the crawl shared by the processes.
+            batch_size: Number of the URLs taken from the shared queue at once.
+            rate_limit: Maximal number of requests per second sent to a single host by this process.
+            max_in_flight: Maximal number of requests in progress for a single host in this process.
+            ttl: Number of seconds the keys of the crawl are kept in Redis after its last change.
+            poll_interval: Number of seconds to wait before asking the shared queue for more URLs again.
+            idle_timeout: Number of seconds to wait for new URLs, while other processes seem to crawl, before the
+                          crawl is given up, i.e. when a process died while processing its URLs.
+            clock: Monotonic clock returning the current time in seconds.
+            failure_threshold: Number of the consecutive failures of a host opening its circuit in this process. None
+                               means the hosts are requested regardless of their failures.
+            cooldown: Number of seconds a host with an open circuit is not requested for by this process.
+            max_trips: Number of the times the circuit of a host opens before this process gives the host up.
+            adaptive: Whether the number of the requests in progress of this process adapts to every host.
+            scorer: Name of the scorer of the URLs/domains or the scoring function, the same in every process.
+        """
+        self.redis = redis
+        self.crawl_id = crawl_id
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.keys = crawl_keys(crawl_id)
+
+        self._push = redis.register_script(_PUSH_SCRIPT)
+        self._pop = redis.register_script(_POP_SCRIPT)
+
+        # URLs found or taken by this process, so that they are not pushed to Redis again
+        self._known = set()
+
+        # URLs found since the last synchronization with their depths and the number of the URLs processed since then
+        self._outgoing = []
+        self._done = 0
+
+        # Number of the popped URLs not released yet
+        self._in_flight = 0
+
+        # Length of the shared queue and the number of the pending URLs at the last synchronization
+        self._remote = (0, 0)
+        self._synced = clock()
+        self._idle_since = None
+
+        super().__init__((), rate_limit, max_in_flight, clock, failure_threshold, cooldown, max_trips, adaptive, scorer)
+
+    @classmethod
+    def start(cls, redis, crawl_id: str, urls: iter, ttl: int = DEFAULT_TTL) -> None:
+        """
+        Initializes the shared state of a new crawl.
+        Args:
+            redis: Redis client.
+            crawl_id: Identifier of the new crawl.
+            urls: URLs/domains the crawl starts from.
+            ttl: Number of seconds the keys of the crawl are kept in Redis after its last change.
+        """
+        keys = crawl_keys(crawl_id)
+        redis.delete(*keys.values())
+        redis.register_script(_PUSH_SCRIPT)(keys=[keys["seen"], keys["queue"], keys["pending"], keys["stop"]],
+                                            args=[0, ttl, *(value for url in urls for value in (url, 0, 0))])
+
+    def add(self, url: str, depth: int = 0) -> bool:
+        """
+        Passes the URL/domain to the shared queue unless this process has seen it before. The URLs are pushed in
+        batches, Redis drops the ones seen by the other processes.
+        """
+        if url in self._known:
+            return False
+
+        self._known.add(url)
+        self._outgoing.append((url, depth))
+
+        return True
+
+    def _sync(self) -> None:
+        args = [value for url, depth in self._outgoing for value in (url, depth, self.scorer(url, depth))]
+        queue, pending = self._push(keys=[self.keys["seen"], self.keys["queue"], self.keys["pending"],
+                                          self.keys["stop"]],
+                                    args=[self._done, self.ttl, *args])
+
+        self._outgoing = []
+        self._done = 0
+        self._remote = (int(queue), int(pending))
+        self._synced = self._clock()
+
+    def _take(self) -> list:
+        """
+        Pops a batch of the URLs/domains with their depths from the shared queue.
+        """
+        members = self._pop(keys=[self.keys["queue"], self.keys["pending"]], args=[self.batch_size])
+        members = [member.decode() if isinstance(member, bytes) else member for member in members]
+
+        return [(url, int(depth)) for depth, url in (member.split(' ', 1) for member in members)]
+
+    def _pull(self) -> None:
+        for url, depth in self._take():
+            self._known.add(url)
+
+            # URLs of the hosts given up by this process count as processed
+            if not super().add(url, depth):
+                self._done += 1
+
+    def pop(self) -> str:
+        """
+        Removes and returns the next URL/domain that may be requested right now, more URLs are taken from the shared
+        queue when the local ones run out.
+
+        Returns:
+            URL/domain to be crawled or None if there is none right now.
+        """
+        if not self._pending:
+            if self._outgoing or self._done:
+                self._sync()
+
+            self._pull()
+
+        url = super().pop()
+
+        if url is not None:
+            self._in_flight += 1
+
+        return url
+
+    def release(self, url: str) -> None:
+        super().release(url)
+        self._in_flight -= 1
+        self._done += 1
+
+    def drain(self) -> list:
+        """
+        Removes the pending URLs/domains of this process and of the shared queue and stops the crawl, i.e. when it runs
+        out of its budget. The other processes finish the URLs they have taken, the URLs found after the stop are
+        dropped.
+
+        Returns:
+            The removed URLs/domains.
+        """
+        # The URLs found by this process are drained as well
+        self._sync()
+        self.redis.set(self.keys["stop"], 1, ex=self.ttl)
+
+        # The drained URLs taken from the shared queue count as processed
+        urls = super().drain()
+        self._done += len(urls)
+
+        while True:
+            batch = [url for url, _ in self._take()]
+
+            if not batch:
+                break
+
+            urls += batch
+            self._done += len(batch)
+
+        self._sync()
+
+        return urls
+
+    def unseen(self, urls: iter) -> list:
+        """
+        Returns the URLs/domains no process has ever enqueued, in the given order.
+        """
+        urls = list(urls)
+        self._sync()
+
+        pipeline = self.redis.pipeline()
+
+        for url in urls:
+            pipeline.sismember(self.keys["seen"], url)
+
+        return [url for url, seen in zip(urls, pipeline.execute()) if not seen]
+
+    def record_failure(self, url: str) -> int:
+        dropped = super().record_failure(url)
+        self._done += dropped
+
+        return dropped
+
+    def delay(self) -> float:
+        """
+        Returns the number of seconds until a URL/domain may be requested, the poll interval if there is none locally.
+        """
+        return super().delay() if self._pending else self.poll_interval
+
+    def __len__(self) -> int:
+        """
+        Returns the number of the local and shared URLs/domains waiting to be visited or being visited anywhere. Zero
+        means the crawl is finished.
+        """
+        # Found URLs are pushed as soon as they may keep the other processes busy or decide the end of the crawl
+        if not self._pending or len(self._outgoing) >= self.batch_size or \
+                self._clock() - self._synced >= SYNC_INTERVAL:
+            self._sync()
+
+        queue, pending = self._remote
+
+        if self._pending or queue or self._in_flight:
+            self._idle_since = None
+        elif pending:
+            # Only the other processes are crawling, they may still find new URLs
+            self._idle_since = self._idle_since or self._clock()
+
+            if self._clock() - self._idle_since >= self.idle_timeout:
+                LOGGER.warning("Crawl %s gave up waiting for %d pending URLs", self.crawl_id, pending)
+                return 0
+
+        return self._pending + queue + pending
+
+
+class SharedCrawlBudget(CrawlBudget):
+    """
+    Budget of a single crawl shared by several processes through Redis. The pages and bytes are counted by all the
+    processes together, the depth and the wall time are limited by every process. A process that finds the budget
+    exhausted stops the whole crawl, see `RedisFrontier.drain`.
+    """
+
+    def __init__(self, redis, crawl_id: str, max_depth: int = None, max_pages: int = None, max_bytes: int = None,
+                 max_seconds: float = None, ttl: int = DEFAULT_TTL, clock: callable = time.monotonic):
+        """
+        Constructor method.
+        Args:
+            redis: Redis client.
+            crawl_id: Identifier of the crawl, the same in every process.
+            max_depth: Maximal depth of the visited URLs/domains, see `CrawlBudget`.
+            max_pages: Maximal number of the pages crawled by all the processes.
+            max_bytes: Maximal number of the bytes downloaded by all the processes.
+            max_seconds: Maximal number of seconds every process requests new URLs/domains for.
+            ttl: Number of seconds the counters are kept in Redis after their last change.
+            clock: Monotonic clock returning the current time in seconds.
+        """
+        super().__init__(max_depth, max_pages, max_bytes, max_seconds, clock)
+
+        self.redis = redis
+        self.key = crawl_keys(crawl_id)["budget"]
+        self.ttl = ttl
+
+    def spend(self, pages: int = 1, size: int = 0) -> None:
+        """
+        Counts the crawled pages and their downloaded bytes to the shared counters, the budget takes their totals.
+        """
+        pipeline = self.redis.pipeline()
+        pipeline.hincrby(self.key, "pages", pages)
+        pipeline.hincrby(self.key, "bytes", size)
+        pipeline.expire(self.key, self.ttl)
+
+        self.pages, self.bytes, _ = pipeline.execute()
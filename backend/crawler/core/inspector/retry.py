@@ -0,0 +1,133 @@
+import random
+
+import requests.exceptions
+
+from .fetcher import FetchedPage
+from .scheduler import DEFAULT_COOLDOWN, DEFAULT_MAX_TRIPS
+
+# Default number of seconds to wait for a connection and for every read of the response
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+# Default number of seconds a single download may take in total
+DEFAULT_DEADLINE = 120.0
+
+# Default number of the repeated attempts of a download failing transiently
+DEFAULT_RETRIES = 2
+
+# Default base and maximal number of seconds waited before a repeated attempt
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 10.0
+
+# Default number of the consecutive failures of a host opening its circuit
+DEFAULT_FAILURE_THRESHOLD = 5
+
+# Status codes of the responses the download is repeated for, the server is expected to recover
+TRANSIENT_STATUS_CODES = frozenset((429, 502, 503, 504))
+
+# Errors of the downloads that may succeed when repeated
+TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError)
+
+
+class FetchPolicy(object):
+    """
+    Timeouts and retries of the website downloads. Every download is bounded by the connect and read timeouts and by
+    a deadline of the whole download, so that a host that never responds, or responds a byte at a time, cannot block
+    the crawl. Downloads failing transiently (connection errors, timeouts, 429 and 5xx gateway responses) are repeated
+    after an exponential backoff with full jitter, so that the retries of many crawls do not hit the host at once.
+
+    Hosts whose downloads keep failing after the retries are not requested for a while and given up eventually, see
+    the `CircuitBreaker` of the `HostScheduler`.
+    """
+
+    def __init__(self, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 deadline: float = DEFAULT_DEADLINE, retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown: float = DEFAULT_COOLDOWN, max_trips: int = DEFAULT_MAX_TRIPS, rng: random.Random = None):
+        """
+        Constructor method.
+        Args:
+            connect_timeout: Number of seconds to wait for the connection to the host.
+            read_timeout: Number of seconds to wait for every read of the response.
+            deadline: Number of seconds the whole download may take, None means unlimited.
+            retries: Number of the repeated attempts of a download failing transiently.
+            backoff: Number of seconds the first repeated attempt is delayed by at most, it doubles with every attempt.
+            max_backoff: Maximal number of seconds an attempt is delayed by, including the Retry-After of the host.
+            failure_threshold: Number of the consecutive failures of a host opening its circuit, None means the hosts
+                               are requested regardless of their failures.
+            cooldown: Number of seconds a host with an open circuit is not requested for.
+            max_trips: Number of the times the circuit of a host opens before the host is given up, None means never.
+            rng: Random generator of the jitter.
+        """
+        if connect_timeout <= 0 or read_timeout <= 0 or (deadline is not None and deadline <= 0):
+            raise ValueError("Timeouts must be positive numbers")
+        if retries < 0:
+            raise ValueError("Number of the retries must not be negative")
+
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self._rng = rng or random.Random()
+
+    @property
+    def timeout(self) -> (float, float):
+        """
+        Connect and read timeouts as accepted by requests.
+        """
+        return self.connect_timeout, self.read_timeout
+
+    @staticmethod
+    def _retry_after(response: FetchedPage) -> float:
+        try:
+            return max(0.0, float(response.headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            # Missing or an HTTP date, the backoff applies
+            return None
+
+    def retry_delay(self, attempt: int, error: Exception = None, response: FetchedPage = None) -> float:
+        """
+        Decides whether the failed download is repeated.
+        Args:
+            attempt: Number of the attempts repeated so far.
+            error: Error the attempt failed with or None.
+            response: Response of the attempt or None.
+
+        Returns:
+            Number of seconds to wait before the next attempt or None if the download is not repeated.
+        """
+        if attempt >= self.retries:
+            return None
+
+        if error is not None:
+            if not isinstance(error, TRANSIENT_ERRORS):
+                return None
+        elif response is None or response.status_code not in TRANSIENT_STATUS_CODES:
+            return None
+
+        delay = self._rng.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+        if response is not None:
+            retry_after = self._retry_after(response)
+
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+
+        return min(delay, self.max_backoff)
+
+    @staticmethod
+    def is_host_failure(error: Exception = None, response: FetchedPage = None) -> bool:
+        """
+        Verifies whether the final outcome of a download shows the host is failing, i.e. it does not respond or it
+        responds by server errors. Invalid URLs and client errors (i.e. 404) are not failures of the host.
+        """
+        if error is not None:
+            return isinstance(error, TRANSIENT_ERRORS)
+
+        return response is not None and (response.status_code >= 500 or response.status_code == 429)
@@ -0,0 +1,32 @@
+import hashlib
+
+
+def content_hash(content: bytes) -> str:
+    """
+    Returns the digest identifying the raw content of a website, so that an unchanged website is recognized even if
+    its server sends no validators.
+    """
+    return hashlib.sha256(content).hexdigest()
+
+
+def conditional_headers(page: dict) -> dict:
+    """
+    Builds the headers of a conditional request from the validators stored by the previous crawl of the website.
+    Args:
+        page: Validators of the previously crawled website, i.e. {"etag": ..., "last_modified": ...}. None if the
+              website was not crawled before.
+
+    Returns:
+        Headers making the server respond by 304 Not Modified if the website did not change.
+    """
+    headers = {}
+
+    if page is None:
+        return headers
+
+    if page.get("etag"):
+        headers["If-None-Match"] = page["etag"]
+    if page.get("last_modified"):
+        headers["If-Modified-Since"] = page["last_modified"]
+
+    return headers
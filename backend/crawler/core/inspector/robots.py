@@ -0,0 +1,329 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+import requests.exceptions
+
+from . import LOGGER
+from .session import get_session_pool
+
+# Default number of seconds the robots.txt of a host is cached for
+DEFAULT_TTL = 24 * 60 * 60
+
+# Number of seconds the unreachable robots.txt is cached for, so that the host is retried soon
+UNREACHABLE_TTL = 5 * 60
+
+# Default number of the hosts whose robots.txt is cached in the process
+DEFAULT_MAX_HOSTS = 4096
+
+# Number of seconds to wait for the robots.txt
+ROBOTS_TIMEOUT = 10
+
+
+class RobotsRules(object):
+    """
+    Rules of the robots.txt group applying to the crawler. The most specific (longest) matching rule decides whether a
+    path may be crawled, Allow wins over Disallow of the same length, see RFC 9309.
+    """
+
+    def __init__(self, rules: list = (), crawl_delay: float = None):
+        """
+        Constructor method.
+        Args:
+            rules: Pairs of a flag whether the rule allows crawling and the path pattern of the rule. Patterns may use
+                   the "*" wildcard and the "$" end anchor.
+            crawl_delay: Number of seconds between two requests to the host or None if the host does not ask for one.
+        """
+        self.crawl_delay = crawl_delay
+        self._rules = [(allow, self._matcher(pattern))
+                       for allow, pattern in sorted(rules, key=lambda rule: (-len(rule[1]), not rule[0]))]
+
+    @staticmethod
+    def _matcher(pattern: str) -> callable:
+        if '*' not in pattern and not pattern.endswith('$'):
+            return lambda path: path.startswith(pattern)
+
+        expression = ".*".join(re.escape(part) for part in pattern.rstrip('$').split('*'))
+
+        return re.compile(expression + ('$' if pattern.endswith('$') else '')).match
+
+    def allowed(self, url: str) -> bool:
+        """
+        Verifies whether the URL may be crawled.
+        Args:
+            url: URL/domain about to be crawled.
+
+        Returns:
+            True if no rule disallows crawling of the URL. Else False.
+        """
+        parts = urlsplit(url)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+
+        for allow, match in self._rules:
+            if match(path):
+                return allow
+
+        return True
+
+
+ALLOW_ALL = RobotsRules()
+DISALLOW_ALL = RobotsRules([(False, '/')])
+
+
+def parse_robots(text: str, user_agent: str = '*') -> RobotsRules:
+    """
+    Parses the robots.txt and selects the rules applying to the user agent.
+    Args:
+        text: Content of the robots.txt.
+        user_agent: Product token of the crawler, i.e. "examplebot". Groups of the most specific matching token apply,
+                    the "*" group applies if no token matches.
+
+    Returns:
+        The rules of the groups applying to the user agent.
+    """
+    user_agent = user_agent.lower()
+
+    # Groups of the robots.txt - user agent tokens, rules and the crawl delay
+    groups = []
+    group = None
+
+    for line in text.splitlines():
+        field, _, value = line.split('#', 1)[0].partition(':')
+        field = field.strip().lower()
+        value = value.strip()
+
+        if field == 'user-agent':
+            # User agent following the rules of the previous group starts a new group
+            if group is None or group[1] or group[2] is not None:
+                group = [[], [], None]
+                groups.append(group)
+            group[0].append(value.lower())
+        elif group is None:
+            continue
+        elif field in ('allow', 'disallow') and value:
+            group[1].append((field == 'allow', value))
+        elif field == 'crawl-delay':
+            try:
+                group[2] = float(value)
+            except ValueError:
+                pass
+
+    matching = [(max((len(token) for token in tokens if token != '*' and token in user_agent), default=-1), rules,
+                 delay) for tokens, rules, delay in groups]
+    specificity = max((match for match, _, _ in matching), default=-1)
+
+    if specificity < 0:
+        matching = [(0, rules, delay) for tokens, rules, delay in groups if '*' in tokens]
+        specificity = 0
+
+    rules = [rule for match, group_rules, _ in matching if match == specificity for rule in group_rules]
+    delays = [delay for match, _, delay in matching if match == specificity and delay is not None]
+
+    return RobotsRules(rules, max(delays) if delays else None)
+
+
+class RobotsCache(object):
+    """
+    Fetches the robots.txt of every crawled host once and keeps its rules in the process for `ttl` seconds. If a Redis
+    client is provided, the robots.txt is shared through it with the other processes, so that a host's robots.txt is
+    downloaded once for all the workers and crawls.
+
+    Missing robots.txt (4xx) allows everything, unreachable one (5xx or a network error) disallows everything for
+    `UNREACHABLE_TTL` seconds.
+    """
+
+    def __init__(self, user_agent: str = '*', ttl: int = DEFAULT_TTL, redis=None, max_hosts: int = DEFAULT_MAX_HOSTS,
+                 key_prefix: str = "robots:", clock: callable = time.monotonic):
+        """
+        Constructor method.
+        Args:
+            user_agent: Product token of the crawler matched against the user agents of the robots.txt groups.
+            ttl: Number of seconds the robots.txt is cached for.
+            redis: Redis client shared by the processes or None if the robots.txt is cached in the process only.
+            max_hosts: Maximal number of the hosts whose rules are kept in the process.
+            key_prefix: Prefix of the Redis keys.
+            clock: Monotonic clock returning the current time in seconds.
+        """
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.redis = redis
+        self.max_hosts = max_hosts
+        self.key_prefix = key_prefix
+        self._clock = clock
+
+        self._lock = threading.Lock()
+
+        # Map of the origins (i.e. https://example.com) to the expiration time and the rules of their robots.txt
+        self._entries = OrderedDict()
+
+        # Locks of the origins whose robots.txt is being loaded, so that it is loaded only once
+        self._loading = {}
+
+        self._stats = {"memory_hits": 0, "shared_hits": 0, "fetches": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _fetch(self, origin: str) -> (int, str):
+        """
+        Downloads the robots.txt of the origin.
+
+        Returns:
+            Status code of the response (None if the host is unreachable) and the content of the robots.txt.
+        """
+        try:
+            response = get_session_pool().session.get(f"{origin}/robots.txt", timeout=ROBOTS_TIMEOUT)
+        except requests.exceptions.RequestException:
+            return None, ''
+
+        return response.status_code, response.text if response.ok else ''
+
+    def _load(self, origin: str) -> (int, str, float):
+        """
+        Loads the robots.txt of the origin from Redis or downloads it.
+
+        Returns:
+            Status code, content of the robots.txt and the number of seconds it may be cached for.
+        """
+        key = f"{self.key_prefix}{origin}"
+
+        if self.redis is not None:
+            try:
+                value, ttl = self.redis.get(key), self.redis.ttl(key)
+            except Exception as error:
+                # Redis is a shared cache only, the robots.txt can still be downloaded
+                LOGGER.warning("Failed to load robots.txt of %s from Redis: %s", origin, error)
+                value, ttl = None, None
+
+            if value is not None:
+                try:
+                    status, text = json.loads(value)
+                except (ValueError, TypeError) as error:
+                    # Undecodable values are replaced by the downloaded robots.txt
+                    LOGGER.warning("Failed to decode robots.txt of %s from Redis: %s", origin, error)
+                else:
+                    self._count("shared_hits")
+                    return status, text, ttl if ttl and ttl > 0 else self.ttl
+
+        status, text = self._fetch(origin)
+        self._count("fetches")
+        ttl = UNREACHABLE_TTL if status is None or status >= 500 else self.ttl
+
+        if self.redis is not None:
+            try:
+                self.redis.setex(key, ttl, json.dumps([status, text]))
+            except Exception as error:
+                LOGGER.warning("Failed to store robots.txt of %s in Redis: %s", origin, error)
+
+        return status, text, ttl
+
+    def _cached(self, origin: str) -> RobotsRules:
+        entry = self._entries.get(origin)
+
+        if entry is None or entry[0] <= self._clock():
+            return None
+
+        self._entries.move_to_end(origin)
+
+        return entry[1]
+
+    def rules(self, url: str) -> RobotsRules:
+        """
+        Returns the robots.txt rules of the URL's host applying to the crawler. The robots.txt is loaded on the first
+        use, concurrent calls for the same host wait for it.
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+
+        with self._lock:
+            rules = self._cached(origin)
+
+            if rules is not None:
+                self._stats["memory_hits"] += 1
+                return rules
+
+            loading = self._loading.setdefault(origin, threading.Lock())
+
+        with loading:
+            try:
+                with self._lock:
+                    rules = self._cached(origin)
+
+                if rules is not None:
+                    return rules
+
+                status, text, ttl = self._load(origin)
+
+                if status is None or status >= 500:
+                    rules = DISALLOW_ALL
+                elif status >= 400:
+                    rules = ALLOW_ALL
+                else:
+                    rules = parse_robots(text, self.user_agent)
+
+                with self._lock:
+                    self._entries[origin] = (self._clock() + ttl, rules)
+                    self._entries.move_to_end(origin)
+
+                    while len(self._entries) > self.max_hosts:
+                        self._entries.popitem(last=False)
+            finally:
+                # Failed loads do not leave their lock behind
+                with self._lock:
+                    self._loading.pop(origin, None)
+
+        return rules
+
+    def allowed(self, url: str) -> bool:
+        """
+        Verifies whether the robots.txt of the URL's host allows crawling it.
+        """
+        return self.rules(url).allowed(url)
+
+    def stats(self) -> dict:
+        """
+        Returns the number of the rules found in the process, found in Redis and downloaded.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def configure(**kwargs) -> RobotsCache:
+    """
+    Replaces the robots.txt cache of the current process by a new one, i.e. when a worker process starts.
+    Args:
+        kwargs: Arguments of the `RobotsCache`.
+
+    Returns:
+        The new robots.txt cache.
+    """
+    global _cache
+
+    with _cache_lock:
+        _cache = RobotsCache(**kwargs)
+
+        return _cache
+
+
+def get_robots_cache() -> RobotsCache:
+    """
+    Returns the robots.txt cache of the current process. A cache kept in the process only is created on the first use,
+    if the process did not configure one.
+    """
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RobotsCache()
+
+    return _cache
@@ -0,0 +1,574 @@
+import heapq
+import logging
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from . import LOGGER
+from .frontier import CrawlFrontier, score_fifo
+
+# Default number of seconds a host with an open circuit is not requested for
+DEFAULT_COOLDOWN = 30.0
+
+# Default number of the times the circuit of a host opens before the host is given up
+DEFAULT_MAX_TRIPS = 3
+
+# Default initial and maximal number of the requests in progress for a host with an adaptive limit
+DEFAULT_INITIAL_LIMIT = 2
+DEFAULT_MAX_LIMIT = 32
+
+# Weight of the latest latency in the smoothed latency of a host and the rate the lowest latency drifts towards it
+LATENCY_SMOOTHING = 0.3
+BASELINE_DRIFT = 0.01
+
+# Number of seconds the smoothed latency must exceed the tolerated one by, so that the jitter of fast hosts is ignored
+SLOWDOWN_MARGIN = 0.05
+
+
+class TokenBucket(object):
+    """
+    Token bucket limiting the rate of the requests sent to a single host.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock: callable = time.monotonic):
+        """
+        Constructor method.
+        Args:
+            rate: Number of tokens (requests) added to the bucket per second.
+            capacity: Maximal number of tokens the bucket holds, i.e. the largest allowed burst of requests.
+            clock: Monotonic clock returning the current time in seconds.
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be a positive number")
+
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self) -> bool:
+        """
+        Takes a single token from the bucket, if there is any.
+
+        Returns:
+            True if the token was taken, i.e. the request may be sent right away. Else False.
+        """
+        self._refill()
+
+        if self._tokens < 1:
+            return False
+
+        self._tokens -= 1
+
+        return True
+
+    def delay(self) -> float:
+        """
+        Returns the number of seconds until the next token is available.
+        """
+        self._refill()
+
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker of a single host. The circuit opens after `threshold` consecutive failures of the host and the
+    host is not requested for `cooldown` seconds then. A single probe request is let through afterwards - its success
+    closes the circuit, its failure opens it again. The host is given up once its circuit opened `max_trips` times.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, threshold: int, cooldown: float = DEFAULT_COOLDOWN, max_trips: int = DEFAULT_MAX_TRIPS,
+                 clock: callable = time.monotonic):
+        """
+        Constructor method.
+        Args:
+            threshold: Number of the consecutive failures opening the circuit.
+            cooldown: Number of seconds the host is not requested for while the circuit is open.
+            max_trips: Number of the times the circuit opens before the host is given up, None means never.
+            clock: Monotonic clock returning the current time in seconds.
+        """
+        if threshold < 1:
+            raise ValueError("Failure threshold must be a positive number")
+
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._clock = clock
+        self._opened = None
+        self._probing = False
+
+    @property
+    def exhausted(self) -> bool:
+        """
+        Whether the host is given up.
+        """
+        return self.max_trips is not None and self.trips >= self.max_trips
+
+    def _cool_down(self) -> None:
+        if self.state == self.OPEN and self._clock() - self._opened >= self.cooldown:
+            self.state = self.HALF_OPEN
+            self._probing = False
+
+    def available(self) -> bool:
+        """
+        Whether the host may be requested right now.
+        """
+        self._cool_down()
+
+        return self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self._probing)
+
+    def dispatch(self) -> None:
+        """
+        Marks the request of the host as sent, the only one while the circuit is half-open.
+        """
+        self._cool_down()
+
+        if self.state == self.HALF_OPEN:
+            self._probing = True
+
+    def withdraw(self) -> None:
+        """
+        Lets another probe request through, if the one sent while the circuit is half-open did not record its outcome.
+        """
+        self._probing = False
+
+    def delay(self) -> float:
+        """
+        Returns the number of seconds until the host may be requested, None if it waits for the probe request.
+        """
+        self._cool_down()
+
+        if self.state == self.OPEN:
+            return max(0.0, self._opened + self.cooldown - self._clock())
+
+        return None if self.state == self.HALF_OPEN and self._probing else 0.0
+
+    def succeed(self) -> None:
+        """
+        Records a successful request of the host.
+        """
+        if self.state == self.OPEN:
+            # Sent before the circuit opened
+            return
+
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def fail(self) -> bool:
+        """
+        Records a failed request of the host.
+
+        Returns:
+            True if the failure opened the circuit.
+        """
+        if self.state == self.OPEN:
+            return False
+
+        self.failures += 1
+
+        if self.state == self.CLOSED and self.failures < self.threshold:
+            return False
+
+        self.state = self.OPEN
+        self.trips += 1
+        self._opened = self._clock()
+
+        return True
+
+
+class AdaptiveLimit(object):
+    """
+    Limit of the requests in progress for a single host adjusted by additive increase and multiplicative decrease
+    (AIMD). Every successful request of a host using its whole limit raises the limit by 1/limit, i.e. by one per round
+    of requests, while the latency of the host stays close to the lowest one observed. A failure (i.e. a timeout, 429
+    or 5xx response) or a latency `tolerance` times the lowest one cuts the limit by `backoff`, at most once per round
+    trip, since the other requests sent under the old limit report the same congestion.
+    """
+
+    def __init__(self, initial: int = DEFAULT_INITIAL_LIMIT, minimum: int = 1, maximum: int = DEFAULT_MAX_LIMIT,
+                 backoff: float = 0.5, tolerance: float = 2.0, clock: callable = time.monotonic):
+        """
+        Constructor method.
+        Args:
+            initial: Number of the requests in progress allowed at first.
+            minimum: Lowest number of the requests in progress allowed.
+            maximum: Highest number of the requests in progress allowed.
+            backoff: Factor the limit is multiplied by on a failure or a slowdown.
+            tolerance: Multiple of the lowest latency of the host considered a slowdown.
+            clock: Monotonic clock returning the current time in seconds.
+        """
+        if minimum < 1 or maximum < minimum:
+            raise ValueError("Limits must be positive numbers, the maximal one at least the minimal one")
+        if not 0 < backoff < 1:
+            raise ValueError("Backoff must be a number between 0 and 1")
+
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.limit = float(min(max(initial, minimum), maximum))
+        self._clock = clock
+
+        # Smoothed and lowest latency of the host, the lowest one drifts towards the smoothed one
+        self._latency = None
+        self._baseline = None
+
+        # Time of the last decrease of the limit
+        self._decreased = None
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of the requests of the host allowed to be in progress right now.
+        """
+        return max(self.minimum, int(self.limit))
+
+    def _observe(self, latency: float) -> None:
+        if self._latency is None:
+            self._latency = self._baseline = latency
+            return
+
+        self._latency += LATENCY_SMOOTHING * (latency - self._latency)
+
+        if latency < self._baseline:
+            self._baseline = latency
+        else:
+            self._baseline += BASELINE_DRIFT * (self._latency - self._baseline)
+
+    def _decrease(self) -> None:
+        now = self._clock()
+
+        if self._decreased is not None and now - self._decreased < (self._latency or 0.0):
+            return
+
+        self.limit = max(float(self.minimum), self.limit * self.backoff)
+        self._decreased = now
+
+    def succeed(self, latency: float = None, saturated: bool = True) -> None:
+        """
+        Records a successful request of the host.
+        Args:
+            latency: Number of seconds the request took or None if unknown.
+            saturated: Whether the host used its whole limit, the limit of a host not using it is not raised.
+        """
+        if latency is not None:
+            self._observe(latency)
+
+            if self._latency > self._baseline * self.tolerance + SLOWDOWN_MARGIN:
+                self._decrease()
+                return
+
+        if saturated:
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+
+    def fail(self) -> None:
+        """
+        Records a failed request of the host.
+        """
+        self._decrease()
+
+
+class _HostQueue(object):
+    """
+    Priority queue of the URLs waiting for a single host together with the host's politeness state.
+    """
+
+    def __init__(self, bucket: TokenBucket = None, breaker: CircuitBreaker = None, limit: AdaptiveLimit = None):
+        # Heap of the scores, sequence numbers and URLs, see `CrawlFrontier`
+        self.urls = []
+        self.bucket = bucket
+        self.breaker = breaker
+        self.limit = limit
+        self.in_flight = 0
+        self.scheduled = False
+
+
+class HostScheduler(CrawlFrontier):
+    """
+    Frontier that keeps a separate queue for every host and dispatches the URLs round-robin across the hosts, the URLs
+    of every host in the order of their scores (see `CrawlFrontier`). No host receives more than `rate_limit` requests
+    per second and has more than `max_in_flight` requests in progress, so the overall throughput grows with the number
+    of distinct hosts instead of hammering a single one.
+
+    Hosts that keep failing are not requested for a while (see `CircuitBreaker`), their URLs are dropped once the host
+    is given up, so that error-heavy hosts do not eat the crawl time. The number of the requests in progress may adapt
+    to every host separately (see `AdaptiveLimit`), `max_in_flight` is the highest allowed one then.
+    """
+
+    def __init__(self, urls: iter = (), rate_limit: float = None, max_in_flight: int = None,
+                 clock: callable = time.monotonic, failure_threshold: int = None, cooldown: float = DEFAULT_COOLDOWN,
+                 max_trips: int = DEFAULT_MAX_TRIPS, adaptive: bool = False, scorer=score_fifo):
+        """
+        Constructor method.
+        Args:
+            urls: URLs/domains the crawl starts from.
+            rate_limit: Maximal number of requests per second sent to a single host. None means unlimited.
+            max_in_flight: Maximal number of requests in progress for a single host. None means unlimited.
+            clock: Monotonic clock returning the current time in seconds.
+            failure_threshold: Number of the consecutive failures of a host opening its circuit. None means the hosts
+                               are requested regardless of their failures.
+            cooldown: Number of seconds a host with an open circuit is not requested for.
+            max_trips: Number of the times the circuit of a host opens before the host is given up, None means never.
+            adaptive: Whether the number of the requests in progress adapts to the latency and the failures of every
+                      host, up to `max_in_flight` (or `DEFAULT_MAX_LIMIT` if None).
+            scorer: Name of the scorer of the URLs/domains or the scoring function, see `get_scorer`.
+        """
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("Rate limit must be a positive number")
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("Maximal number of requests in flight must be a positive number")
+        if failure_threshold is not None and failure_threshold < 1:
+            raise ValueError("Failure threshold must be a positive number")
+
+        self.rate_limit = rate_limit
+        self.max_in_flight = max_in_flight
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.adaptive = adaptive
+        self._clock = clock
+
+        # Queues of the particular hosts
+        self._hosts = {}
+
+        # Round-robin order of the hosts with pending URLs
+        self._ready = deque()
+
+        # Number of pending URLs across all the hosts
+        self._pending = 0
+
+        super().__init__(urls, scorer)
+
+    def _host_queue(self, host: str) -> _HostQueue:
+        queue = self._hosts.get(host)
+
+        if queue is None:
+            bucket = TokenBucket(self.rate_limit, clock=self._clock) if self.rate_limit else None
+            breaker = CircuitBreaker(self.failure_threshold, self.cooldown, self.max_trips, self._clock) \
+                if self.failure_threshold else None
+            limit = AdaptiveLimit(maximum=self.max_in_flight or DEFAULT_MAX_LIMIT, clock=self._clock) \
+                if self.adaptive else None
+            queue = self._hosts[host] = _HostQueue(bucket, breaker, limit)
+
+        return queue
+
+    def _is_saturated(self, queue: _HostQueue) -> bool:
+        limit = queue.limit.in_flight if queue.limit else self.max_in_flight
+
+        return limit is not None and queue.in_flight >= limit
+
+    def add(self, url: str, depth: int = 0) -> bool:
+        """
+        Enqueues the URL/domain to the queue of its host unless it was seen before.
+        Args:
+            url: URL/domain to be crawled.
+            depth: Number of the links from the top level URL to the URL/domain.
+
+        Returns:
+            True if the URL/domain was enqueued, False if it was already seen or its host was given up.
+        """
+        if url in self._seen:
+            # A waiting URL/domain found again closer to the top level URL takes the shorter depth
+            if depth < self._depths.get(url, depth):
+                self._depths[url] = depth
+
+            return False
+
+        self._seen.add(url)
+
+        host = urlsplit(url).netloc
+        queue = self._host_queue(host)
+
+        if queue.breaker and queue.breaker.exhausted:
+            return False
+        heapq.heappush(queue.urls, self._entry(url, depth))
+        self._pending += 1
+
+        if not queue.scheduled:
+            queue.scheduled = True
+            self._ready.append(host)
+
+        return True
+
+    def pop(self) -> str:
+        """
+        Removes and returns the next URL/domain of the first host (in round-robin order) that may be requested right
+        now. The URL/domain counts as in flight until it is passed to `release`.
+
+        Returns:
+            URL/domain to be crawled or None if no host may be requested right now.
+        """
+        for _ in range(len(self._ready)):
+            host = self._ready.popleft()
+            queue = self._hosts[host]
+
+            if self._is_saturated(queue) or (queue.breaker and not queue.breaker.available()) or \
+                    (queue.bucket and not queue.bucket.consume()):
+                self._ready.append(host)
+                continue
+
+            url = heapq.heappop(queue.urls)[2]
+            queue.in_flight += 1
+            self._pending -= 1
+
+            if queue.breaker:
+                queue.breaker.dispatch()
+
+            if queue.urls:
+                self._ready.append(host)
+            else:
+                queue.scheduled = False
+
+            return url
+
+        return None
+
+    def limit_host(self, host: str, rate: float) -> None:
+        """
+        Lowers the rate limit of a single host, i.e. to respect the Crawl-delay of its robots.txt. The request of the
+        host that is already in flight counts against the new limit.
+        Args:
+            host: Host name with the port, as in the URLs (i.e. example.com:8080).
+            rate: Maximal number of requests per second sent to the host. The global rate limit applies if lower.
+        """
+        if self.rate_limit is not None:
+            rate = min(rate, self.rate_limit)
+
+        queue = self._host_queue(host)
+
+        if queue.bucket is None or queue.bucket.rate != rate:
+            queue.bucket = TokenBucket(rate, clock=self._clock)
+            queue.bucket.consume()
+
+    def release(self, url: str) -> None:
+        """
+        Marks the request of the URL/domain returned by `pop` as finished. Its outcome is recorded before, see
+        `record_success` and `record_failure`.
+        """
+        queue = self._hosts[urlsplit(url).netloc]
+        queue.in_flight -= 1
+
+        if queue.breaker:
+            # The probe of a half-open circuit without a recorded outcome, i.e. disallowed by robots.txt
+            queue.breaker.withdraw()
+
+    def record_success(self, url: str, latency: float = None) -> None:
+        """
+        Records the successful request of the URL/domain returned by `pop`, it closes the circuit of its host.
+        Args:
+            url: URL/domain of the request.
+            latency: Number of seconds the request took, the limit of the host adapts to it.
+        """
+        queue = self._hosts[urlsplit(url).netloc]
+
+        if queue.breaker:
+            queue.breaker.succeed()
+
+        if queue.limit:
+            queue.limit.succeed(latency, saturated=self._is_saturated(queue))
+
+    def record_failure(self, url: str) -> int:
+        """
+        Records the failed request of the URL/domain returned by `pop`, i.e. a timeout or a server error. The circuit of
+        its host opens after too many consecutive failures and the pending URLs of the host are dropped once the host
+        is given up.
+
+        Returns:
+            Number of the dropped URLs/domains.
+        """
+        host = urlsplit(url).netloc
+        queue = self._hosts[host]
+
+        if queue.limit:
+            queue.limit.fail()
+
+        if not queue.breaker or not queue.breaker.fail():
+            return 0
+
+        if not queue.breaker.exhausted:
+            LOGGER.log(logging.WARNING, "Host %s failed %d times, not requested for %.0f seconds" %
+                       (host, queue.breaker.failures, queue.breaker.cooldown))
+            return 0
+
+        dropped = len(self._clear(host))
+        LOGGER.log(logging.WARNING, "Host %s keeps failing, dropped its %d pending URLs" % (host, dropped))
+
+        return dropped
+
+    def _clear(self, host: str) -> list:
+        """
+        Removes the pending URLs/domains of the host and returns them in the order of their scores.
+        """
+        queue = self._hosts[host]
+        urls = [url for _, _, url in sorted(queue.urls)]
+
+        self._pending -= len(urls)
+        queue.urls = []
+
+        for url in urls:
+            self._depths.pop(url, None)
+
+        if queue.scheduled:
+            queue.scheduled = False
+            self._ready.remove(host)
+
+        return urls
+
+    def drain(self) -> list:
+        """
+        Removes the pending URLs/domains of every host, i.e. when the crawl runs out of its budget. The requests in
+        flight are released as usual.
+
+        Returns:
+            The removed URLs/domains.
+        """
+        return [url for host in list(self._ready) for url in self._clear(host)]
+
+    def concurrency_limit(self, url: str) -> float:
+        """
+        Returns the current adaptive limit of the requests in progress for the host of the URL/domain, None if the
+        limits do not adapt.
+        """
+        queue = self._hosts.get(urlsplit(url).netloc)
+
+        return queue.limit.limit if queue and queue.limit else None
+
+    def _host_delay(self, queue: _HostQueue) -> float:
+        if self._is_saturated(queue):
+            return None
+
+        delay = queue.bucket.delay() if queue.bucket else 0.0
+
+        if queue.breaker:
+            breaker_delay = queue.breaker.delay()
+            delay = None if breaker_delay is None else max(delay, breaker_delay)
+
+        return delay
+
+    def delay(self) -> float:
+        """
+        Returns the number of seconds until a host with pending URLs may be requested again.
+
+        Returns:
+            Number of seconds or None if every such host waits for its requests in flight to be released.
+        """
+        delays = [delay for delay in (self._host_delay(self._hosts[host]) for host in self._ready) if delay is not None]
+
+        return min(delays) if delays else None
+
+    def __len__(self) -> int:
+        return self._pending
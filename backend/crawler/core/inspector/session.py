@@ -0,0 +1,164 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Default number of the hosts whose connections are kept and of the kept connections per host
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 16
+
+
+class ConnectionStats(object):
+    """
+    Thread-safe counters of the requests sent through the pool and the connections it opened for them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _count(self, host: str, index: int) -> None:
+        with self._lock:
+            counters = self._hosts.setdefault(host, [0, 0])
+            counters[index] += 1
+
+    def request_sent(self, host: str) -> None:
+        self._count(host, 0)
+
+    def connection_opened(self, host: str) -> None:
+        self._count(host, 1)
+
+    def as_dict(self) -> dict:
+        """
+        Returns the total and per-host numbers of the sent requests, opened connections and requests that reused an
+        already opened connection.
+        """
+        with self._lock:
+            hosts = {host: {"requests": requests_sent, "connections": connections,
+                            "reused": max(0, requests_sent - connections)}
+                     for host, (requests_sent, connections) in self._hosts.items()}
+
+        total_requests = sum(host["requests"] for host in hosts.values())
+        total_reused = sum(host["reused"] for host in hosts.values())
+
+        return {"requests": total_requests,
+                "connections": sum(host["connections"] for host in hosts.values()),
+                "reused": total_reused,
+                "reuse_rate": total_reused / total_requests if total_requests else 0.0,
+                "hosts": hosts}
+
+
+class _CountingAdapter(HTTPAdapter):
+    """
+    HTTP adapter reporting the sent requests and the newly opened connections to the `ConnectionStats`.
+    """
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        stats = self._stats
+
+        def counting(pool_class: type) -> type:
+            class CountingConnectionPool(pool_class):
+                def _new_conn(self):
+                    stats.connection_opened(self.host)
+                    return super()._new_conn()
+
+            return CountingConnectionPool
+
+        self.poolmanager.pool_classes_by_scheme = {"http": counting(HTTPConnectionPool),
+                                                   "https": counting(HTTPSConnectionPool)}
+
+    def send(self, request, *args, **kwargs):
+        self._stats.request_sent(urlsplit(request.url).hostname)
+        return super().send(request, *args, **kwargs)
+
+
+class SessionPool(object):
+    """
+    Long-lived HTTP session, that keeps the connections to the crawled hosts open between the requests and the crawls,
+    so that the TCP and TLS handshakes are not repeated for every page.
+    """
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 host_pool_sizes: dict = None):
+        """
+        Constructor method.
+        Args:
+            pool_connections: Number of the hosts whose connections are kept open.
+            pool_maxsize: Number of the connections kept open per host.
+            host_pool_sizes: Mapping of the host names (i.e. example.com) to their own number of kept connections.
+        """
+        self.stats = ConnectionStats()
+        self.session = requests.Session()
+
+        adapter = _CountingAdapter(self.stats, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        for host, size in (host_pool_sizes or {}).items():
+            host_adapter = _CountingAdapter(self.stats, pool_connections=1, pool_maxsize=size)
+
+            # Adapters are matched by the prefixes of the URLs, the host ends with the path or the port
+            for scheme in ("http", "https"):
+                for end in ("/", ":"):
+                    self.session.mount(f"{scheme}://{host}{end}", host_adapter)
+
+    def crawl_session(self) -> requests.Session:
+        """
+        Creates the session of a single crawl. It sends the requests through the connections kept by the pool, but has
+        its own cookies, so that the crawls running at once in the threads or greenlets of a process do not share them.
+        The session must not be closed, it would close the connections of the pool.
+        """
+        session = requests.Session()
+        session.adapters = self.session.adapters
+
+        return session
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure(**kwargs) -> SessionPool:
+    """
+    Replaces the session pool of the current process by a new one, i.e. when a worker process starts.
+    Args:
+        kwargs: Arguments of the `SessionPool`.
+
+    Returns:
+        The new session pool.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+
+        _pool = SessionPool(**kwargs)
+
+        return _pool
+
+
+def get_session_pool() -> SessionPool:
+    """
+    Returns the session pool of the current process. A pool with the default sizes is created on the first use, if the
+    process did not configure one.
+    """
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SessionPool()
+
+    return _pool
@@ -0,0 +1,59 @@
+import re
+
+from django.test import SimpleTestCase
+
+from core.inspector.boundary import BoundaryMatcher, _literal
+
+URLS = [
+    "https://example.com/",
+    "https://example.com/blog/post/",
+    "https://www.example.com/blog/",
+    "https://exampleXcom/blog/",
+    "http://example.org/shop/?item=1",
+    "https://cdn.example.net/img.png",
+]
+
+PATTERNS = [
+    r"https://example\.com/",
+    r"^https://example\.com/blog/.*",
+    r".*example\.org/shop.*",
+    r".*example.com/blog.*",
+    r"https?://(www\.)?example\.com/.*",
+    r".*\.png$",
+    r".*",
+]
+
+
+class BoundaryMatcherTestCase(SimpleTestCase):
+    def test_literal_patterns(self):
+        self.assertEqual(("https://example.com/", False), _literal(r"https://example\.com/"))
+        self.assertEqual(("https://example.com/blog/", False), _literal(r"^https://example\.com/blog/.*"))
+        self.assertEqual(("example.org/shop", True), _literal(r".*example\.org/shop.*"))
+        self.assertIsNone(_literal(r".*example.com/blog.*"))
+        self.assertIsNone(_literal(r".*\.png$"))
+        self.assertIsNone(_literal(r"https://example\.com/\d+"))
+
+    def test_matches_like_regex(self):
+        for pattern in PATTERNS:
+            matcher = BoundaryMatcher(pattern)
+            for url in URLS:
+                self.assertEqual(bool(re.match(pattern, url)), matcher(url), (pattern, url))
+
+    def test_multiple_patterns(self):
+        for patterns in (PATTERNS[:3], PATTERNS[3:6], [r"(a)\1", r"https://(www\.)?example\.com/blog/"]):
+            matcher = BoundaryMatcher(patterns)
+            for url in URLS:
+                self.assertEqual(any(re.match(pattern, url) for pattern in patterns), matcher(url), (patterns, url))
+
+    def test_group_references(self):
+        # Joined patterns would renumber the groups the second pattern refers to
+        for patterns in ([r'(a)\1', r'(x)'], [r'(x)', r'(a)\1'], [r'(x)', r'(?P<a>a)(?P=a)'],
+                         [r'(x)', r'(a)?(?(1)a|b)']):
+            matcher = BoundaryMatcher(patterns)
+
+            self.assertTrue(matcher("aa"), patterns)
+            self.assertFalse(matcher("ab"), patterns)
+
+    def test_no_boundary(self):
+        self.assertTrue(BoundaryMatcher()(URLS[0]))
+        self.assertTrue(BoundaryMatcher("")(URLS[0]))
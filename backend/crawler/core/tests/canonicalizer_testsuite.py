@@ -0,0 +1,53 @@
+from django.test import SimpleTestCase
+
+from core.inspector.canonicalizer import UrlCanonicalizer, _remove_dot_segments
+
+BASE = "http://Example.com:80/docs/guide/page.html?b=2&a=1#intro"
+
+
+class UrlCanonicalizerTestCase(SimpleTestCase):
+    def test_remove_dot_segments(self):
+        self.assertEqual("/a/g", _remove_dot_segments("/a/b/c/./../../g"))
+        self.assertEqual("/", _remove_dot_segments("/.."))
+        self.assertEqual("/a/", _remove_dot_segments("/a/b/.."))
+
+    def test_resolution(self):
+        canonicalizer = UrlCanonicalizer()
+
+        self.assertEqual({
+            "http://example.com/docs/guide/other.html",
+            "http://example.com/docs/index.html",
+            "http://example.com/about/",
+            "http://cdn.example.com/lib.js",
+            "http://example.com/docs/guide/page.html?a=1&b=2",
+            "http://example.com/docs/guide/page.html?q=1",
+        }, canonicalizer.resolve(["other.html", "./other.html", "../index.html", "/about/", "/x/../about/",
+                                  "//cdn.example.com/lib.js", "#top", "", "?q=1", "mailto:someone@example.com",
+                                  "javascript:void(0)"], BASE))
+
+    def test_rules(self):
+        canonicalizer = UrlCanonicalizer()
+
+        self.assertEqual("https://example.com/", canonicalizer.canonicalize("HTTPS://EXAMPLE.com:443"))
+        self.assertEqual("http://example.com:8080/a%2F", canonicalizer.canonicalize("http://example.com:8080/a%2f"))
+        self.assertEqual("http://example.com/?a=1&id=2",
+                         canonicalizer.canonicalize("http://example.com/?utm_source=x&id=2&gclid=y&a=1#top"))
+
+        keeping = UrlCanonicalizer(strip_fragment=False, sort_query=False, drop_parameters=(),
+                                   strip_trailing_slash=True)
+        self.assertEqual("http://example.com/a?utm_source=x&id=2#top",
+                         keeping.canonicalize("http://example.com/a/?utm_source=x&id=2#top"))
+        self.assertIsNone(keeping.canonicalize("ftp://example.com/"))
+
+    def test_stats(self):
+        canonicalizer = UrlCanonicalizer()
+
+        canonicalizer.resolve(["/a/", "http://example.com/a/", "/a/#x", "/b/"], "http://example.com/")
+        canonicalizer.resolve(["/a/", "/b/"], "http://example.com/a/")
+
+        stats = canonicalizer.stats()
+
+        self.assertEqual((6, 4, 2), (stats["links"], stats["spellings"], stats["urls"]))
+        self.assertEqual(0.5, stats["dedupe_rate"])
+        # Root relative links are shared by all the websites of the site
+        self.assertEqual((2, 4), (stats["cache_hits"], stats["cache_misses"]))
@@ -0,0 +1,132 @@
+import datetime
+import itertools
+import os
+import re
+import threading
+import time
+
+import redis
+from django.test import SimpleTestCase
+
+from core.inspector.checkpoint import CrawlCheckpoint, CrawlLease
+from core.inspector.inspector import Inspector
+from core.tests.fake_redis import FakeRedis
+from core.tests.site import LocalSite
+
+# Redis database used by the lease tests, it is flushed of the test leases only
+TEST_REDIS = os.environ.get("CRAWLER_TEST_REDIS", "redis://127.0.0.1:6379/15")
+
+
+def chained_site(pages: int) -> dict:
+    return {
+        f"/{page}/": f'<html><head><title>{page}</title></head><body><a href="/{(page + 1) % pages}/">Next</a>'
+                     f'<a href="/{(page * 3) % pages}/">Third</a><a href="http://external.example/{page % 4}">X</a>'
+                     f'</body></html>'
+        for page in range(pages)
+    }
+
+
+class CrawlCheckpointTestCase(SimpleTestCase):
+    def test_append(self):
+        redis = FakeRedis()
+        checkpoint = CrawlCheckpoint(redis, "checkpoint:test", every=2, ttl=60)
+        crawl_time = datetime.datetime(2022, 5, 1, 12, 30)
+
+        checkpoint.append({"url": "https://example.com/", "crawl_time": crawl_time})
+        self.assertEqual([], checkpoint.load())
+
+        checkpoint.append({"url": "https://example.com/a", "crawl_time": crawl_time})
+        self.assertEqual([{"url": "https://example.com/", "crawl_time": crawl_time},
+                          {"url": "https://example.com/a", "crawl_time": crawl_time}], checkpoint.load())
+        self.assertEqual(60, redis.expires["checkpoint:test"])
+
+        checkpoint.clear()
+        self.assertEqual([], checkpoint.load())
+
+    def test_invalid_interval(self):
+        with self.assertRaises(ValueError):
+            CrawlCheckpoint(FakeRedis(), "checkpoint:test", every=0)
+
+
+class ResumedCrawlTestCase(SimpleTestCase):
+    @staticmethod
+    def _graph(nodes: list) -> dict:
+        return {node["url"]: (node["title"], node["boundary_record"], sorted(node["execution_targets"]))
+                for node in nodes}
+
+    def _interrupt_and_resume(self, engine: str) -> None:
+        with LocalSite(chained_site(30)) as site:
+            url = site.url('/0/')
+            boundary = rf"{re.escape(site.url())}.*"
+            rs = Inspector.crawl_url(url, boundary, engine=engine)
+
+            checkpoint = CrawlCheckpoint(FakeRedis(), "checkpoint:test", every=4)
+
+            # Interrupt the crawl, the nodes not appended to the checkpoint yet are lost
+            for node in itertools.islice(Inspector.iter_crawl(url, boundary, engine=engine), 14):
+                checkpoint.append(node)
+
+            resumed = checkpoint.load()
+            site.requests.clear()
+            resumed_rs = list(Inspector.iter_crawl(url, boundary, engine=engine, resume=resumed))
+
+            # Websites of the checkpointed nodes are not downloaded again
+            self.assertFalse({site.url(path) for path, _ in site.requests} & {node["url"] for node in resumed})
+
+        self.assertEqual(12, len(resumed))
+        self.assertEqual(len(rs), len(resumed) + len(resumed_rs))
+        self.assertEqual(self._graph(rs), self._graph(resumed + resumed_rs))
+
+    def test_resume_sync(self):
+        self._interrupt_and_resume("sync")
+
+    def test_resume_async(self):
+        self._interrupt_and_resume("async")
+
+    def test_resume_shared_frontier(self):
+        with self.assertRaises(ValueError):
+            Inspector.iter_crawl("https://example.com/", frontier=object(), resume=[{"url": "https://example.com/"}])
+
+    def test_lease_without_redis(self):
+        # The crawl runs without the lease
+        self.assertTrue(CrawlLease(redis.Redis.from_url("redis://127.0.0.1:1/0"), "lease:test").acquire())
+
+
+class CrawlLeaseTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = redis.Redis.from_url(TEST_REDIS)
+
+        try:
+            self.redis.ping()
+        except redis.exceptions.ConnectionError:
+            self.skipTest(f"Redis is not available at {TEST_REDIS}")
+
+        self.key = f"lease:test:{time.monotonic_ns()}"
+
+    def tearDown(self):
+        self.redis.delete(self.key)
+
+    def test_redelivered_task_waits(self):
+        lease = CrawlLease(self.redis, self.key, ttl=1)
+        self.assertTrue(lease.acquire())
+
+        # The lease is renewed while the crawl runs, the redelivered task waits and skips the finished crawl
+        redelivered = []
+        waiting = threading.Thread(target=lambda: redelivered.append(CrawlLease(self.redis, self.key, ttl=1,
+                                                                                poll_interval=0.05).acquire()))
+        waiting.start()
+        time.sleep(1.5)
+        self.assertEqual([], redelivered)
+
+        lease.release()
+        waiting.join()
+        self.assertEqual([False], redelivered)
+
+    def test_expired_lease(self):
+        # The process that took the lease died without releasing it
+        self.redis.set(self.key, "dead", ex=1)
+        lease = CrawlLease(self.redis, self.key, ttl=1, poll_interval=0.05)
+
+        self.assertTrue(lease.acquire())
+        lease.release(finished=False)
+        self.assertFalse(self.redis.exists(self.key))
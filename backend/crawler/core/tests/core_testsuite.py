@@ -1,11 +1,19 @@
-from unittest import skip
+import sys
+from types import SimpleNamespace
+from unittest import mock, skip
 
 from django.test import TestCase
 
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlsplit
 
+from core.inspector.budget import CrawlBudget
 from core.inspector.inspector import Inspector
+from core.inspector.metrics import CrawlMetrics
+from core.tests.site import LocalSite
 
 
 class CrawlerWorksCorrectlyTestCase(TestCase):
@@ -16,3 +24,250 @@ class CrawlerWorksCorrectlyTestCase(TestCase):
         with open(Path(__file__).parent.joinpath('test.json'), mode="rt") as vp:
             vps = json.load(vp)
             self.assertEqual(vps, rs)
+
+
+PAGES = {
+    '/': '<html><head><title>Home</title></head><body><a href="/a/">A</a><a href="/b/">B</a>'
+         '<a href="http://external.example/x">X</a><a href="#top">Top</a></body></html>',
+    '/a/': '<html><head><title>A</title></head><body><a href="/">Home</a><a href="/b/">B</a><a href="/c/">C</a>'
+           '</body></html>',
+    '/b/': '<html><head><title>B</title></head><body><a href="/a/">A</a></body></html>',
+    '/c/': '<html><head><title>C</title></head><body></body></html>',
+}
+
+
+class CrawlEnginesTestCase(TestCase):
+    def setUp(self):
+        self.site = LocalSite(PAGES).__enter__()
+        self.boundary = rf"{re.escape(self.site.url())}.*"
+
+    def tearDown(self):
+        self.site.__exit__()
+
+    @staticmethod
+    def _graph(nodes: list) -> dict:
+        return {node["url"]: (node["title"], node["boundary_record"], node["execution_targets"]) for node in nodes}
+
+    def test_async_crawl(self):
+        url = self.site.url
+        rs = Inspector.crawl_url(url(), self.boundary, engine="async", concurrency=4)
+
+        self.assertEqual({
+            url('/'): ("Home", False, sorted([url('/a/'), url('/b/'), "http://external.example/x"])),
+            url('/a/'): ("A", False, sorted([url('/'), url('/b/'), url('/c/')])),
+            url('/b/'): ("B", False, [url('/a/')]),
+            url('/c/'): ("C", False, []),
+            "http://external.example/x": ("external.example", True, []),
+        }, self._graph(rs))
+        self.assertEqual(sorted(node["url"] for node in rs), [node["url"] for node in rs])
+
+    def test_engines_crawl_same_graph(self):
+        sync_rs = Inspector.crawl_url(self.site.url(), self.boundary)
+        async_rs = Inspector.crawl_url(self.site.url(), self.boundary, engine="async")
+
+        self.assertEqual(self._graph(sync_rs), self._graph(async_rs))
+
+    def test_host_limits_crawl_same_graph(self):
+        rs = Inspector.crawl_url(self.site.url(), self.boundary)
+        limited_rs = Inspector.crawl_url(self.site.url(), self.boundary, engine="async", rate_limit=100.0,
+                                         max_in_flight=1)
+
+        self.assertEqual(self._graph(rs), self._graph(limited_rs))
+
+    def test_parser_processes_crawl_same_graph(self):
+        rs = Inspector.crawl_url(self.site.url(), self.boundary)
+        parsed_rs = Inspector.crawl_url(self.site.url(), self.boundary, engine="async", parse_processes=2)
+
+        self.assertEqual(self._graph(rs), self._graph(parsed_rs))
+
+    def test_metrics(self):
+        for engine in ("sync", "async"):
+            with LocalSite(dict(PAGES, **{'/c/': '<a href="http://127.0.0.1:1/">Unreachable</a>'})) as site:
+                metrics = CrawlMetrics()
+                Inspector.crawl_url(site.url(), r"http://127\.0\.0\.1.*", engine=engine, metrics=metrics)
+                result = metrics.as_dict()
+
+                self.assertEqual(4, result["counters"]["pages"], engine)
+                self.assertEqual(sum(len(page.encode()) for page in site.pages.values()), result["counters"]["bytes"],
+                                 engine)
+                self.assertEqual({"ConnectionError": 1}, result["errors"], engine)
+                self.assertEqual(4, result["phases"]["parse"]["operations"], engine)
+                self.assertEqual(4, result["phases"]["fetch"]["operations"], engine)
+                self.assertLessEqual({"frontier", "fetch", "parse", "extract"}, set(result["phases"]), engine)
+
+    def test_adaptive_concurrency(self):
+        rs = Inspector.crawl_url(self.site.url(), self.boundary)
+        metrics = CrawlMetrics()
+        adaptive_rs = Inspector.crawl_url(self.site.url(), self.boundary, engine="async", max_in_flight=4,
+                                          metrics=metrics, adaptive_concurrency=True)
+
+        self.assertEqual(self._graph(rs), self._graph(adaptive_rs))
+        self.assertIn(urlsplit(self.site.url()).netloc, metrics.as_dict()["gauges"]["concurrency_limit"])
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            Inspector.crawl_url(self.site.url(), self.boundary, engine="unknown")
+
+    def test_concurrent_crawls(self):
+        other_pages = {'/': '<html><head><title>Other</title></head><body><a href="/b/">B</a></body></html>',
+                       '/b/': PAGES['/b/'], '/a/': PAGES['/c/']}
+
+        with LocalSite(other_pages) as other_site:
+            crawls = [(site.url(), rf"{re.escape(site.url())}.*", engine)
+                      for site in (self.site, other_site) for engine in ("sync", "async")] * 3
+            expected = [self._graph(Inspector.crawl_url(url, boundary, engine=engine))
+                        for url, boundary, engine in crawls]
+
+            # Crawls running at once in the threads of a process do not share their boundaries and frontiers
+            with ThreadPoolExecutor(max_workers=len(crawls)) as executor:
+                graphs = list(executor.map(lambda crawl: self._graph(Inspector(crawl[0], crawl[1],
+                                                                               engine=crawl[2]).crawl()), crawls))
+
+        self.assertEqual(expected, graphs)
+        self.assertNotEqual(expected[0], expected[2])
+
+    def test_gevent_sync_fallback(self):
+        rs = Inspector.crawl_url(self.site.url(), self.boundary)
+        monkey = SimpleNamespace(is_module_patched=lambda module: True)
+
+        with mock.patch.dict(sys.modules, {"gevent.monkey": monkey}), \
+                mock.patch.object(Inspector, "iter_nodes_async", side_effect=AssertionError):
+            gevent_rs = Inspector.crawl_url(self.site.url(), self.boundary, engine="async")
+
+        self.assertEqual(self._graph(rs), self._graph(gevent_rs))
+
+    def test_single_crawl(self):
+        inspector = Inspector(self.site.url(), self.boundary)
+        nodes = list(inspector.iter_nodes())
+
+        self.assertEqual(self._graph(Inspector.crawl_url(self.site.url(), self.boundary)), self._graph(nodes))
+
+        with self.assertRaises(RuntimeError):
+            inspector.crawl()
+
+
+class CrawlBudgetTestCase(TestCase):
+    @staticmethod
+    def _crawl(pages: dict, engine: str, budget: CrawlBudget, **options) -> (Inspector, dict, dict):
+        """
+        Crawls the pages within the budget, returns the inspector, the graph by the paths and the metric counters.
+        """
+        metrics = CrawlMetrics()
+
+        with LocalSite(pages) as site:
+            inspector = Inspector(site.url(), rf"{re.escape(site.url())}.*", engine=engine, budget=budget,
+                                  metrics=metrics, **options)
+            graph = CrawlEnginesTestCase._graph(inspector.crawl())
+
+            return inspector, {url.replace(site.url(), '/'): value for url, value in graph.items()}, \
+                metrics.as_dict()["counters"]
+
+    def _assert_top_page_only(self, pages: dict, create_budget: callable, name: str) -> None:
+        for engine in ("sync", "async"):
+            inspector, graph, counters = self._crawl(pages, engine, create_budget())
+
+            # Pages left in the frontier become leaf nodes, the links to them are kept
+            self.assertEqual({"/": False, "/a/": True, "/b/": True, "http://external.example/x": True},
+                             {url: boundary_record for url, (_, boundary_record, _) in graph.items()}, engine)
+            self.assertEqual(3, len(graph["/"][2]), engine)
+            self.assertEqual(name, inspector.exhausted_budget, engine)
+            self.assertEqual((1, 2), (counters[f"budget_{name}"], counters["unvisited"]), engine)
+
+    def test_depth_budget(self):
+        for engine in ("sync", "async"):
+            inspector, graph, counters = self._crawl(PAGES, engine, CrawlBudget(max_depth=1))
+
+            self.assertEqual({"/": False, "/a/": False, "/b/": False, "/c/": True, "http://external.example/x": True},
+                             {url: boundary_record for url, (_, boundary_record, _) in graph.items()}, engine)
+            self.assertEqual(3, len(graph["/a/"][2]), engine)
+            self.assertIsNone(inspector.exhausted_budget, engine)
+
+    def test_depth_budget_shortest_path(self):
+        pages = {'/': '<a href="/a/">A</a><a href="/b/">B</a>', '/a/': '<a href="/a/a/">AA</a>',
+                 '/a/a/': '<a href="/x/">X</a>', '/b/': '<a href="/x/">X</a>', '/x/': '<title>X</title>'}
+
+        for engine in ("sync", "async"):
+            # Depth-first order finds /x/ beyond the depth budget before it finds it within
+            inspector, graph, counters = self._crawl(pages, engine, CrawlBudget(max_depth=2), concurrency=1,
+                                                     scorer=lambda url, depth: -depth)
+
+            self.assertEqual({"/": False, "/a/": False, "/b/": False, "/a/a/": False, "/x/": False},
+                             {url: boundary_record for url, (_, boundary_record, _) in graph.items()}, engine)
+            self.assertEqual(0, counters.get("leaves", 0), engine)
+
+    def test_page_budget(self):
+        self._assert_top_page_only(PAGES, lambda: CrawlBudget(max_pages=1), "pages")
+
+    def test_concurrent_page_budget(self):
+        pages = {'/': "".join(f'<a href="/{page}/">{page}</a>' for page in range(20))}
+        pages.update({f'/{page}/': f'<title>{page}</title>' for page in range(20)})
+
+        for engine in ("sync", "async"):
+            inspector, graph, counters = self._crawl(pages, engine, CrawlBudget(max_pages=5), concurrency=8)
+
+            # The downloads in progress count to the budget
+            self.assertEqual(5, len([url for url, (_, boundary_record, _) in graph.items() if not boundary_record]),
+                             engine)
+            self.assertEqual(5, counters["pages"], engine)
+            self.assertEqual(16, counters["unvisited"], engine)
+
+    def test_byte_budget(self):
+        self._assert_top_page_only(PAGES, lambda: CrawlBudget(max_bytes=len(PAGES['/'])), "bytes")
+
+    def test_time_budget(self):
+        now = [0]
+
+        def home():
+            now[0] += 60
+            return PAGES['/']
+
+        self._assert_top_page_only(dict(PAGES, **{'/': home}), lambda: CrawlBudget(max_seconds=30,
+                                                                                    clock=lambda: now[0]), "seconds")
+
+    def test_negative_budget(self):
+        with self.assertRaises(ValueError):
+            CrawlBudget(max_pages=-1)
+
+
+class ConditionalRecrawlTestCase(TestCase):
+    @staticmethod
+    def _validators(nodes: list) -> dict:
+        return {node["url"]: node for node in nodes if "content_hash" in node}
+
+    def _recrawl(self, site: LocalSite, engine: str = "sync") -> (list, list):
+        boundary = rf"{re.escape(site.url())}.*"
+        rs = Inspector.crawl_url(site.url(), boundary, engine=engine)
+        site.requests.clear()
+
+        return rs, Inspector.crawl_url(site.url(), boundary, engine=engine, validators=self._validators(rs))
+
+    def test_not_modified(self):
+        with LocalSite(PAGES) as site:
+            rs, recrawl_rs = self._recrawl(site, engine="async")
+
+            self.assertEqual({304}, {status for _, status in site.requests})
+
+        self.assertEqual(CrawlEnginesTestCase._graph(rs), CrawlEnginesTestCase._graph(recrawl_rs))
+        self.assertTrue(all(node["unchanged"] for node in self._validators(recrawl_rs).values()))
+
+    def test_matching_content_hash(self):
+        with LocalSite(PAGES, etags=False) as site:
+            rs, recrawl_rs = self._recrawl(site)
+
+            self.assertEqual({200}, {status for _, status in site.requests})
+
+        self.assertEqual(CrawlEnginesTestCase._graph(rs), CrawlEnginesTestCase._graph(recrawl_rs))
+        self.assertTrue(all(node["unchanged"] for node in self._validators(recrawl_rs).values()))
+
+    def test_changed_page(self):
+        with LocalSite(dict(PAGES)) as site:
+            boundary = rf"{re.escape(site.url())}.*"
+            validators = self._validators(Inspector.crawl_url(site.url(), boundary))
+
+            site.pages['/b/'] = '<html><head><title>New B</title></head><body><a href="/c/">C</a></body></html>'
+            rs = self._validators(Inspector.crawl_url(site.url(), boundary, validators=validators))
+
+        self.assertEqual(("New B", [site.url('/c/')], False),
+                         (rs[site.url('/b/')]["title"], rs[site.url('/b/')]["execution_targets"],
+                          rs[site.url('/b/')]["unchanged"]))
+        self.assertTrue(rs[site.url('/a/')]["unchanged"])
@@ -0,0 +1,65 @@
+from django.test import SimpleTestCase
+
+from core.inspector.extractor import EXTRACTORS, declared_charset, get_extractor
+from core.inspector.parser_pool import get_parser_pool
+
+PAGE = '''<!DOCTYPE html>
+<html>
+<head><meta charset="iso-8859-2"><title>Příliš žluťoučký kůň</title></head>
+<body>
+<a href="/a/">A</a>
+<A HREF="b.html">B</A>
+<a name="no-href">No href</a>
+<div><a href="https://example.com/ž">Ž</a></div>
+<svg><title>Not the page title</title></svg>
+</body>
+</html>
+'''.encode("iso-8859-2")
+
+
+class LinkExtractorTestCase(SimpleTestCase):
+    def test_extractors_agree(self):
+        for name in EXTRACTORS:
+            title, links = get_extractor(name).extract(PAGE)
+
+            self.assertEqual("Příliš žluťoučký kůň", title, name)
+            self.assertEqual(["/a/", "b.html", "https://example.com/ž"], links, name)
+
+    def test_declared_encoding(self):
+        content = '<title>Kůň</title><a href="/ů/">Ů</a>'.encode("cp1250")
+
+        for name in EXTRACTORS:
+            self.assertEqual(("Kůň", ["/ů/"]), get_extractor(name).extract(content, "cp1250"), name)
+
+    def test_no_title(self):
+        for name in EXTRACTORS:
+            self.assertEqual((None, []), get_extractor(name).extract(b"<p>Plain</p>"), name)
+            self.assertEqual((None, []), get_extractor(name).extract(b""), name)
+
+    def test_parser_pool(self):
+        pool = get_parser_pool(2)
+
+        for name in EXTRACTORS:
+            self.assertEqual(get_extractor(name).extract(PAGE), pool.submit(get_extractor(name), PAGE).result(), name)
+
+        self.assertIs(pool, get_parser_pool(2))
+
+    def test_parser_pools(self):
+        pool = get_parser_pool(2)
+
+        # A crawl asking for a different number of the processes does not stop the pool of the running crawls
+        self.assertIsNot(pool, get_parser_pool(1))
+        self.assertEqual(get_extractor("lxml").extract(PAGE), pool.submit(get_extractor("lxml"), PAGE).result())
+        self.assertIs(pool, get_parser_pool(2))
+
+    def test_unknown_extractor(self):
+        with self.assertRaises(ValueError):
+            get_extractor("regex")
+
+    def test_declared_charset(self):
+        self.assertEqual("utf-8", declared_charset("text/html; charset=UTF-8"))
+        self.assertEqual("windows-1250", declared_charset('text/html; charset="windows-1250"'))
+        self.assertEqual("iso-2022-jp", declared_charset("text/html; charset=ISO-2022-JP"))
+        self.assertIsNone(declared_charset("text/html"))
+        self.assertIsNone(declared_charset("text/html; charset=unknown-charset"))
+        self.assertIsNone(declared_charset(None))
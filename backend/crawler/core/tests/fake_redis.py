@@ -0,0 +1,40 @@
+class FakeRedis(object):
+    """
+    Keeps the values and the lists in memory, implements the Redis commands used by the crawl checkpoint and the
+    robots.txt cache. Pipelined commands are executed immediately.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+        self.expires = {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self) -> None:
+        pass
+
+    def get(self, key: str) -> bytes:
+        return self.values.get(key)
+
+    def ttl(self, key: str) -> int:
+        return self.expires.get(key, -1) if key in self.values or key in self.lists else -2
+
+    def setex(self, key: str, ttl: int, value: str) -> None:
+        self.values[key] = value.encode()
+        self.expires[key] = ttl
+
+    def rpush(self, key: str, *values) -> None:
+        self.lists.setdefault(key, []).extend(value.encode() for value in values)
+
+    def expire(self, key: str, ttl: int) -> None:
+        self.expires[key] = ttl
+
+    def lrange(self, key: str, start: int, end: int) -> list:
+        return self.lists.get(key, [])[start:None if end == -1 else end + 1]
+
+    def delete(self, key: str) -> None:
+        self.values.pop(key, None)
+        self.lists.pop(key, None)
+        self.expires.pop(key, None)
@@ -0,0 +1,131 @@
+import codecs
+import re
+
+from django.test import SimpleTestCase
+import requests.exceptions
+
+from core.inspector.extractor import get_extractor
+from core.inspector.fetcher import fetch, is_html, sniff_charset
+from core.inspector.inspector import Inspector
+from core.inspector.metrics import CrawlMetrics
+from core.inspector.session import SessionPool
+from core.tests.site import LocalSite
+
+LATIN2_PAGE = '<html><head><meta charset="iso-8859-2"><title>Žluťoučký kůň</title></head></html>'.encode("iso-8859-2")
+
+PAGES = {
+    '/': '<html><head><title>Home</title></head><body><a href="/doc.pdf">PDF</a><a href="/big/">Big</a></body></html>',
+    '/doc.pdf': ("application/pdf", b"%PDF-1.4" + b"\0" * 100000),
+    '/big/': "<html><head><title>Big</title></head><body>" + "<p>Text</p>" * 10000 + "</body></html>",
+    '/latin2/': ("text/html", LATIN2_PAGE),
+}
+
+
+class FetcherTestCase(SimpleTestCase):
+    def setUp(self):
+        self.pool = SessionPool()
+        self.site = LocalSite(PAGES).__enter__()
+
+    def tearDown(self):
+        self.site.__exit__()
+        self.pool.close()
+
+    def test_sniff_charset(self):
+        self.assertEqual("utf-8", sniff_charset(codecs.BOM_UTF8 + b"<html>"))
+        self.assertEqual("iso-8859-2", sniff_charset(b'<html><meta http-equiv="Content-Type" '
+                                                     b'content="text/html; charset=ISO-8859-2">'))
+        self.assertEqual("iso-2022-jp", sniff_charset(b'<html><meta charset="ISO-2022-JP">'))
+        self.assertIsNone(sniff_charset(b'<html><meta charset="unknown-charset">'))
+        self.assertIsNone(sniff_charset(b'<html></html>'))
+
+    def test_is_html(self):
+        self.assertTrue(is_html("text/html; charset=utf-8"))
+        self.assertTrue(is_html("application/xhtml+xml"))
+        self.assertTrue(is_html(None))
+        self.assertFalse(is_html("application/pdf"))
+
+    def test_non_html(self):
+        page = fetch(self.pool.session, self.site.url('/doc.pdf'))
+
+        self.assertEqual((200, True, b''), (page.status_code, page.skipped, page.content))
+
+    def test_byte_cap(self):
+        page = fetch(self.pool.session, self.site.url('/big/'), max_bytes=1000)
+
+        self.assertEqual((1000, True), (len(page.content), page.truncated))
+        self.assertEqual("utf-8", page.encoding)
+        self.assertFalse(fetch(self.pool.session, self.site.url('/'), max_bytes=1000).truncated)
+
+    def test_deadline(self):
+        # The deadline is checked between the reads of the content
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            fetch(self.pool.session, self.site.url('/big/'), deadline=1e-9)
+
+        self.assertFalse(fetch(self.pool.session, self.site.url('/big/'), deadline=10.0).truncated)
+
+    def test_sniffed_charset(self):
+        page = fetch(self.pool.session, self.site.url('/latin2/'))
+
+        self.assertEqual("iso-8859-2", page.encoding)
+        self.assertEqual("Žluťoučký kůň", get_extractor("lxml").extract(page.content, page.encoding)[0])
+
+    def test_crawl(self):
+        rs = {node["url"]: node for node in Inspector.crawl_url(self.site.url(), rf"{re.escape(self.site.url())}.*",
+                                                                max_page_bytes=1000)}
+
+        self.assertEqual((None, []), (rs[self.site.url('/doc.pdf')]["title"],
+                                      rs[self.site.url('/doc.pdf')]["execution_targets"]))
+        self.assertEqual("Big", rs[self.site.url('/big/')]["title"])
+
+    def test_declared_charsets(self):
+        titles = {"iso-2022-jp": "日本語", "macintosh": "Café", "cp737": "Καλημέρα", "kz1048": "Қазақ"}
+        pages = {'/': "".join(f'<a href="/{charset}/">{charset}</a>' for charset in titles)}
+        pages.update({f'/{charset}/': (f"text/html; charset={charset}",
+                                       f'<title>{title}</title><a href="/">Home</a>'.encode(charset))
+                      for charset, title in titles.items()})
+
+        with LocalSite(pages) as site:
+            for engine in ("sync", "async"):
+                metrics = CrawlMetrics()
+                rs = {node["url"]: node for node in Inspector.crawl_url(site.url(), rf"{re.escape(site.url())}.*",
+                                                                        engine=engine, metrics=metrics)}
+
+                # Charsets unknown to libxml2 are detected by the parser, the links are extracted still
+                self.assertEqual("日本語", rs[site.url('/iso-2022-jp/')]["title"], engine)
+                self.assertEqual("Café", rs[site.url('/macintosh/')]["title"], engine)
+                self.assertTrue(all(node["execution_targets"] == [site.url()] for url, node in rs.items()
+                                    if url != site.url()), engine)
+                self.assertEqual({}, metrics.as_dict()["errors"], engine)
+
+    def test_meta_charsets(self):
+        titles = {"iso-2022-jp": "日本語", "macintosh": "Café", "cp737": "Καλημέρα"}
+        pages = {'/': "".join(f'<a href="/{charset}/">{charset}</a>' for charset in titles)}
+        pages.update({f'/{charset}/': ("text/html", f'<meta charset="{charset}"><title>{title}</title>'
+                                                    f'<a href="/">Home</a>'.encode(charset))
+                      for charset, title in titles.items()})
+
+        with LocalSite(pages) as site:
+            metrics = CrawlMetrics()
+            rs = {node["url"]: node for node in Inspector.crawl_url(site.url(), rf"{re.escape(site.url())}.*",
+                                                                    metrics=metrics)}
+
+        # The charsets declared by the markup only are passed to the parser as declared
+        self.assertEqual("日本語", rs[site.url('/iso-2022-jp/')]["title"])
+        self.assertEqual("Café", rs[site.url('/macintosh/')]["title"])
+        self.assertEqual([site.url()], rs[site.url('/cp737/')]["execution_targets"])
+        self.assertEqual({}, metrics.as_dict()["errors"])
+
+    def test_parse_error(self):
+        class FailingExtractor(object):
+            def extract(self, content: bytes, encoding: str = None):
+                raise LookupError(f"unknown encoding: {encoding}")
+
+        metrics = CrawlMetrics()
+        inspector = Inspector(self.site.url(), rf"{re.escape(self.site.url())}.*", metrics=metrics)
+        inspector.extractor = FailingExtractor()
+        rs = inspector.crawl()
+
+        # The website that can't be parsed is a node without a title and links, the crawl goes on
+        self.assertEqual([(self.site.url(), None, [])], [(node["url"], node["title"], node["execution_targets"])
+                                                         for node in rs])
+        self.assertEqual({"LookupError": 1}, metrics.as_dict()["errors"])
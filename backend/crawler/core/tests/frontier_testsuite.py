@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase
+
+from core.inspector.frontier import CrawlFrontier, get_scorer, score_shape
+from core.inspector.scheduler import HostScheduler
+
+
+class CrawlFrontierTestCase(SimpleTestCase):
+    def test_fifo_order(self):
+        frontier = CrawlFrontier(["a", "b"])
+        frontier.add("c")
+
+        self.assertEqual(["a", "b", "c"], [frontier.pop() for _ in range(len(frontier))])
+        self.assertFalse(frontier)
+
+    def test_deduplication(self):
+        frontier = CrawlFrontier(["a"])
+
+        self.assertFalse(frontier.add("a"))
+        self.assertTrue(frontier.add("b"))
+        self.assertEqual(2, len(frontier))
+
+        frontier.pop()
+
+        # Popped URLs stay seen
+        self.assertIn("a", frontier)
+        self.assertFalse(frontier.add("a"))
+        self.assertEqual(2, frontier.seen_count)
+
+    def test_best_first_order(self):
+        frontier = CrawlFrontier(scorer="depth")
+        frontier.add("deep", 2)
+        frontier.add("shallow", 1)
+        frontier.add("other", 1)
+
+        # URLs of the same score keep the order they were found in
+        self.assertEqual(["shallow", "other", "deep"], [frontier.pop() for _ in range(len(frontier))])
+
+    def test_shape_scorer(self):
+        page = score_shape("http://example.com/about/", 1)
+
+        self.assertLess(page, score_shape("http://example.com/calendar/2022/10/17/", 1))
+        self.assertLess(page, score_shape("http://example.com/search/?color=red&size=xl", 1))
+        self.assertLess(page, score_shape("http://example.com/about/", 2))
+
+    def test_unknown_scorer(self):
+        with self.assertRaises(ValueError):
+            get_scorer("unknown")
+
+    def test_depths(self):
+        frontier = CrawlFrontier(["a"], scorer="depth")
+        frontier.add("b", 3)
+        frontier.add("c", 1)
+
+        self.assertEqual("a", frontier.pop())
+        self.assertEqual(0, frontier.pop_depth("a"))
+        self.assertEqual(["c", "b"], frontier.drain())
+        self.assertFalse(frontier)
+        self.assertEqual(0, frontier.pop_depth("b"))
+
+    def test_minimal_depth(self):
+        for frontier in (CrawlFrontier(), HostScheduler()):
+            frontier.add("http://a/x", 3)
+            frontier.add("http://a/x", 1)
+            frontier.add("http://a/x", 2)
+
+            self.assertEqual("http://a/x", frontier.pop())
+            self.assertEqual(1, frontier.pop_depth("http://a/x"))
+            self.assertEqual(["http://a/y"], frontier.unseen(["http://a/x", "http://a/y"]))
@@ -0,0 +1,124 @@
+import random
+import re
+import time
+
+from django.test import SimpleTestCase
+import requests.exceptions
+
+from core.inspector.fetcher import FetchedPage, fetch
+from core.inspector.inspector import Inspector
+from core.inspector.metrics import CrawlMetrics
+from core.inspector.retry import FetchPolicy
+from core.inspector.session import SessionPool
+from core.tests.site import LocalSite
+
+
+class FetchPolicyTestCase(SimpleTestCase):
+    def test_retry_delay(self):
+        policy = FetchPolicy(retries=3, backoff=1.0, max_backoff=3.0, rng=random.Random(0))
+        timeout = requests.exceptions.ReadTimeout()
+
+        for attempt, limit in enumerate((1.0, 2.0, 3.0)):
+            delays = [policy.retry_delay(attempt, error=timeout) for _ in range(50)]
+            self.assertTrue(all(0 <= delay <= limit for delay in delays))
+            # Jittered rather than fixed
+            self.assertGreater(len(set(delays)), 1)
+
+        self.assertIsNone(policy.retry_delay(3, error=timeout))
+
+    def test_transient(self):
+        policy = FetchPolicy(retries=1, max_backoff=5.0)
+
+        self.assertIsNotNone(policy.retry_delay(0, error=requests.exceptions.ConnectionError()))
+        self.assertIsNotNone(policy.retry_delay(0, response=FetchedPage(503, {})))
+        self.assertIsNone(policy.retry_delay(0, error=requests.exceptions.InvalidURL()))
+        self.assertIsNone(policy.retry_delay(0, response=FetchedPage(404, {})))
+        self.assertIsNone(policy.retry_delay(0, response=FetchedPage(200, {})))
+
+        # Retry-After of the host is respected up to the maximal backoff
+        self.assertEqual(4.0, policy.retry_delay(0, response=FetchedPage(429, {"Retry-After": "4"})))
+        self.assertEqual(5.0, policy.retry_delay(0, response=FetchedPage(429, {"Retry-After": "60"})))
+
+    def test_host_failure(self):
+        self.assertTrue(FetchPolicy.is_host_failure(error=requests.exceptions.ConnectTimeout()))
+        self.assertTrue(FetchPolicy.is_host_failure(response=FetchedPage(500, {})))
+        self.assertFalse(FetchPolicy.is_host_failure(error=requests.exceptions.MissingSchema()))
+        self.assertFalse(FetchPolicy.is_host_failure(response=FetchedPage(404, {})))
+
+
+class ResilientCrawlTestCase(SimpleTestCase):
+    @staticmethod
+    def _flaky(page: str, failures: int) -> callable:
+        responses = [503] * failures
+
+        return lambda: responses.pop() if responses else page
+
+    @staticmethod
+    def _slow(page: str, seconds: float) -> callable:
+        def respond():
+            time.sleep(seconds)
+            return page
+
+        return respond
+
+    def test_retries(self):
+        for engine in ("sync", "async"):
+            pages = {'/': '<a href="/flaky/">Flaky</a>', '/flaky/': self._flaky('<title>Recovered</title>', 2)}
+
+            with LocalSite(pages) as site:
+                metrics = CrawlMetrics()
+                rs = Inspector.crawl_url(site.url(), rf"{re.escape(site.url())}.*", engine=engine, metrics=metrics,
+                                         fetch_policy=FetchPolicy(retries=2, backoff=0.01))
+
+                self.assertEqual([200, 503, 503, 200], [status for _, status in site.requests], engine)
+
+            self.assertEqual("Recovered", rs[1]["title"], engine)
+            self.assertEqual(2, metrics.as_dict()["counters"]["retries"], engine)
+
+    def test_timeout(self):
+        for engine in ("sync", "async"):
+            pages = {'/': '<a href="/slow/">Slow</a><a href="/a/">A</a>', '/a/': '<title>A</title>',
+                     '/slow/': self._slow('<title>Slow</title>', 1)}
+
+            with LocalSite(pages) as site:
+                metrics = CrawlMetrics()
+                start = time.monotonic()
+                rs = Inspector.crawl_url(site.url(), rf"{re.escape(site.url())}.*", engine=engine, metrics=metrics,
+                                         fetch_policy=FetchPolicy(read_timeout=0.2, retries=0))
+
+                self.assertLess(time.monotonic() - start, 1.0, engine)
+
+            # The crawl goes on without the website that timed out
+            self.assertEqual([site.url(), site.url('/a/')], [node["url"] for node in rs], engine)
+            self.assertEqual({"ReadTimeout": 1}, metrics.as_dict()["errors"], engine)
+
+    def test_deadline(self):
+        page = '<title>Slow drip</title>' + ' ' * 3000
+
+        with LocalSite({'/': page}, drip=0.0004) as site:
+            # Content trickles in faster than the read timeout, the deadline cuts the download off between the reads
+            start = time.monotonic()
+
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                fetch(SessionPool().session, site.url(), timeout=(1, 1), deadline=0.3)
+
+            self.assertLess(time.monotonic() - start, 1.0)
+
+            # Without the deadline the whole page trickles in
+            self.assertEqual(page.encode(), fetch(SessionPool().session, site.url(), timeout=(1, 1)).content)
+
+    def test_failing_host(self):
+        for engine in ("sync", "async"):
+            pages = {'/': "".join(f'<a href="/{page}/">{page}</a>' for page in range(10))}
+            pages.update({f'/{page}/': 500 for page in range(10)})
+
+            with LocalSite(pages) as site:
+                metrics = CrawlMetrics()
+                Inspector.crawl_url(site.url(), rf"{re.escape(site.url())}.*", engine=engine, concurrency=1,
+                                    metrics=metrics, fetch_policy=FetchPolicy(failure_threshold=3, cooldown=0.0,
+                                                                              max_trips=1))
+
+                # The host is given up after the third server error
+                self.assertEqual(4, len(site.requests), engine)
+
+            self.assertEqual(7, metrics.as_dict()["counters"]["dropped"], engine)
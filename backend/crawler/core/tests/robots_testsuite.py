@@ -0,0 +1,107 @@
+import re
+
+from django.test import SimpleTestCase
+
+from core.inspector.inspector import Inspector
+from core.inspector.robots import RobotsCache, RobotsRules, parse_robots
+from core.tests.core_testsuite import PAGES
+from core.tests.fake_redis import FakeRedis
+from core.tests.site import LocalSite
+
+ROBOTS = """
+# Comment
+User-agent: *
+Disallow: /private/
+Allow: /private/public/
+Disallow: /*.pdf$
+Crawl-delay: 2
+
+User-agent: examplebot
+User-agent: otherbot
+Disallow: /
+Allow: /$
+"""
+
+
+class RobotsRulesTestCase(SimpleTestCase):
+    def test_rules(self):
+        rules = parse_robots(ROBOTS, "Mozilla/5.0 (compatible; crawler)")
+
+        self.assertEqual(2.0, rules.crawl_delay)
+        self.assertTrue(rules.allowed("https://example.com/"))
+        self.assertFalse(rules.allowed("https://example.com/private/data"))
+        self.assertTrue(rules.allowed("https://example.com/private/public/data"))
+        self.assertFalse(rules.allowed("https://example.com/docs/file.pdf"))
+        self.assertTrue(rules.allowed("https://example.com/docs/file.pdf?download=1"))
+
+    def test_user_agent_group(self):
+        rules = parse_robots(ROBOTS, "ExampleBot/1.0")
+
+        self.assertIsNone(rules.crawl_delay)
+        self.assertTrue(rules.allowed("https://example.com/"))
+        self.assertFalse(rules.allowed("https://example.com/page/"))
+
+    def test_longest_match(self):
+        rules = RobotsRules([(False, "/a"), (True, "/a"), (False, "/a/b")])
+
+        self.assertTrue(rules.allowed("https://example.com/a/c"))
+        self.assertFalse(rules.allowed("https://example.com/a/b/c"))
+
+
+class RobotsCacheTestCase(SimpleTestCase):
+    def test_shared_cache(self):
+        redis = FakeRedis()
+
+        with LocalSite({'/robots.txt': ROBOTS}) as site:
+            for _ in range(2):
+                cache = RobotsCache(redis=redis)
+
+                self.assertFalse(cache.allowed(site.url('/private/')))
+                self.assertTrue(cache.allowed(site.url('/')))
+
+            missing = RobotsCache().rules("http://127.0.0.1:1/")
+
+        # Robots.txt is downloaded once and shared by the second cache
+        self.assertEqual([('/robots.txt', 200)], site.requests)
+        self.assertEqual({"memory_hits": 1, "shared_hits": 1, "fetches": 0}, cache.stats())
+        self.assertFalse(missing.allowed("http://127.0.0.1:1/"))
+
+    def test_corrupted_shared_cache(self):
+        redis = FakeRedis()
+
+        with LocalSite({'/robots.txt': ROBOTS}) as site:
+            origin = site.url('/').rstrip('/')
+            redis.setex(f"robots:{origin}", 60, "{not json")
+            cache = RobotsCache(redis=redis)
+
+            # The undecodable value is a miss, it is replaced by the downloaded robots.txt
+            self.assertFalse(cache.allowed(site.url('/private/')))
+            self.assertEqual([('/robots.txt', 200)], site.requests)
+
+            repaired = RobotsCache(redis=redis)
+            self.assertFalse(repaired.allowed(site.url('/private/')))
+
+        self.assertEqual({"memory_hits": 0, "shared_hits": 0, "fetches": 1}, cache.stats())
+        self.assertEqual({"memory_hits": 0, "shared_hits": 1, "fetches": 0}, repaired.stats())
+
+    def test_failed_load(self):
+        cache = RobotsCache()
+        cache._fetch = lambda origin: 1 / 0
+
+        with self.assertRaises(ZeroDivisionError):
+            cache.rules("https://example.com/")
+
+        self.assertEqual({}, cache._loading)
+
+    def test_crawl(self):
+        pages = dict(PAGES, **{'/robots.txt': "User-agent: *\nDisallow: /b/\n"})
+
+        with LocalSite(pages) as site:
+            for engine in ("sync", "async"):
+                rs = {node["url"]: node for node in Inspector.crawl_url(site.url(), rf"{re.escape(site.url())}.*",
+                                                                        engine=engine, robots=RobotsCache())}
+
+                self.assertTrue(rs[site.url('/b/')]["boundary_record"])
+                self.assertFalse(rs[site.url('/c/')]["boundary_record"])
+
+            self.assertNotIn(('/b/', 200), site.requests)
@@ -0,0 +1,217 @@
+from django.test import SimpleTestCase
+
+from core.inspector.scheduler import AdaptiveLimit, CircuitBreaker, HostScheduler, TokenBucket
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    def test_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2.0, clock=clock)
+
+        self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+        self.assertAlmostEqual(0.5, bucket.delay())
+
+        clock.now = 0.5
+        self.assertTrue(bucket.consume())
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+    def test_states(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(2, cooldown=10.0, clock=clock)
+
+        self.assertFalse(breaker.fail())
+        breaker.succeed()
+        self.assertFalse(breaker.fail())
+        self.assertTrue(breaker.fail())
+
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        self.assertFalse(breaker.available())
+        self.assertAlmostEqual(10.0, breaker.delay())
+
+        # A single probe is let through once cooled down
+        clock.now = 10.0
+        self.assertTrue(breaker.available())
+        breaker.dispatch()
+        self.assertFalse(breaker.available())
+        self.assertIsNone(breaker.delay())
+
+        # Failed probe opens the circuit again
+        self.assertTrue(breaker.fail())
+        clock.now = 20.0
+        breaker.dispatch()
+        breaker.succeed()
+
+        self.assertEqual((CircuitBreaker.CLOSED, 2), (breaker.state, breaker.trips))
+        self.assertTrue(breaker.available())
+
+    def test_exhausted(self):
+        breaker = CircuitBreaker(1, cooldown=0.0, max_trips=2, clock=FakeClock())
+
+        breaker.fail()
+        self.assertFalse(breaker.exhausted)
+        breaker.dispatch()
+        breaker.fail()
+        self.assertTrue(breaker.exhausted)
+
+
+class AdaptiveLimitTestCase(SimpleTestCase):
+    def test_additive_increase(self):
+        limit = AdaptiveLimit(initial=2, maximum=4, clock=FakeClock())
+
+        # About one more request per round of requests using the whole limit
+        for _ in range(3):
+            limit.succeed(0.1)
+        self.assertEqual(3, limit.in_flight)
+
+        limit.succeed(0.1, saturated=False)
+        self.assertEqual(3, limit.in_flight)
+
+        for _ in range(10):
+            limit.succeed(0.1)
+        self.assertEqual(4, limit.in_flight)
+
+    def test_multiplicative_decrease(self):
+        clock = FakeClock()
+        limit = AdaptiveLimit(initial=16, maximum=16, clock=clock)
+        limit.succeed(0.1)
+
+        # The requests sent under the old limit report the same congestion
+        limit.fail()
+        limit.fail()
+        self.assertEqual(8, limit.in_flight)
+
+        clock.now = 1.0
+        limit.fail()
+        self.assertEqual(4, limit.in_flight)
+
+        for step in range(2, 6):
+            clock.now = step
+            limit.fail()
+        self.assertEqual(1, limit.in_flight)
+
+    def test_slowdown(self):
+        clock = FakeClock()
+        limit = AdaptiveLimit(initial=8, maximum=16, clock=clock)
+
+        for _ in range(5):
+            limit.succeed(0.1)
+        self.assertGreater(limit.limit, 8)
+
+        for step in range(5):
+            clock.now = step * 10
+            limit.succeed(1.0)
+        self.assertLess(limit.in_flight, 8)
+
+
+class HostSchedulerTestCase(SimpleTestCase):
+    def test_round_robin(self):
+        scheduler = HostScheduler(["http://a/1", "http://a/2", "http://a/3", "http://b/1", "http://b/2"])
+
+        self.assertEqual(["http://a/1", "http://b/1", "http://a/2", "http://b/2", "http://a/3"],
+                         [scheduler.pop() for _ in range(len(scheduler))])
+        self.assertIsNone(scheduler.pop())
+
+    def test_deduplication(self):
+        scheduler = HostScheduler(["http://a/1"])
+        scheduler.release(scheduler.pop())
+
+        self.assertFalse(scheduler.add("http://a/1"))
+        self.assertFalse(scheduler)
+
+    def test_max_in_flight(self):
+        scheduler = HostScheduler(["http://a/1", "http://a/2", "http://b/1"], max_in_flight=1)
+
+        self.assertEqual("http://a/1", scheduler.pop())
+        self.assertEqual("http://b/1", scheduler.pop())
+        self.assertIsNone(scheduler.pop())
+        self.assertIsNone(scheduler.delay())
+
+        scheduler.release("http://a/1")
+        self.assertEqual("http://a/2", scheduler.pop())
+
+    def test_rate_limit(self):
+        clock = FakeClock()
+        scheduler = HostScheduler(["http://a/1", "http://a/2", "http://b/1"], rate_limit=1.0, clock=clock)
+
+        self.assertEqual("http://a/1", scheduler.pop())
+        self.assertEqual("http://b/1", scheduler.pop())
+        self.assertIsNone(scheduler.pop())
+        self.assertAlmostEqual(1.0, scheduler.delay())
+
+        clock.now = 1.0
+        self.assertEqual("http://a/2", scheduler.pop())
+
+    def test_limit_host(self):
+        clock = FakeClock()
+        scheduler = HostScheduler(["http://a/1", "http://a/2", "http://b/1", "http://b/2"], clock=clock)
+
+        self.assertEqual("http://a/1", scheduler.pop())
+        scheduler.limit_host("a", 0.5)
+
+        self.assertEqual("http://b/1", scheduler.pop())
+        self.assertEqual("http://b/2", scheduler.pop())
+        self.assertIsNone(scheduler.pop())
+        self.assertAlmostEqual(2.0, scheduler.delay())
+
+        clock.now = 2.0
+        self.assertEqual("http://a/2", scheduler.pop())
+
+    def test_failing_host(self):
+        clock = FakeClock()
+        scheduler = HostScheduler(["http://a/1", "http://a/2", "http://a/3", "http://a/4", "http://b/1"], clock=clock,
+                                  failure_threshold=1, cooldown=5.0, max_trips=2)
+
+        url = scheduler.pop()
+        self.assertEqual(0, scheduler.record_failure(url))
+        scheduler.release(url)
+
+        # The failing host is skipped while its circuit is open
+        self.assertEqual("http://b/1", scheduler.pop())
+        scheduler.record_success("http://b/1")
+        scheduler.release("http://b/1")
+        self.assertIsNone(scheduler.pop())
+        self.assertAlmostEqual(5.0, scheduler.delay())
+
+        # The host is given up once its probe fails
+        clock.now = 5.0
+        url = scheduler.pop()
+        self.assertEqual(2, scheduler.record_failure(url))
+        scheduler.release(url)
+
+        self.assertEqual(0, len(scheduler))
+        self.assertFalse(scheduler.add("http://a/5"))
+
+    def test_adaptive_limit(self):
+        clock = FakeClock()
+        scheduler = HostScheduler([f"http://a/{page}" for page in range(10)], max_in_flight=8, clock=clock,
+                                  adaptive=True)
+
+        urls = [scheduler.pop(), scheduler.pop()]
+        self.assertIsNone(scheduler.pop())
+
+        # Both requests complete while the host uses its whole limit
+        for url in urls:
+            scheduler.record_success(url, 0.1)
+        for url in urls:
+            scheduler.release(url)
+
+        self.assertAlmostEqual(2.9, scheduler.concurrency_limit("http://a/"))
+
+        urls = [scheduler.pop(), scheduler.pop()]
+        scheduler.record_success(urls[0], 0.1)
+        self.assertIsNotNone(scheduler.pop())
+        self.assertIsNone(scheduler.pop())
+
+        scheduler.record_failure(urls[1])
+        self.assertAlmostEqual(1.62, scheduler.concurrency_limit("http://a/"), places=2)
+        self.assertIsNone(HostScheduler(["http://a/1"]).concurrency_limit("http://a/1"))
@@ -0,0 +1,47 @@
+from django.test import SimpleTestCase
+
+from core.inspector.session import SessionPool
+from core.tests.site import LocalSite
+
+
+class SessionPoolTestCase(SimpleTestCase):
+    def test_connection_reuse(self):
+        pool = SessionPool()
+
+        with LocalSite({'/': '<html></html>', '/a/': '<html></html>'}) as site:
+            for path in ('/', '/a/', '/', '/missing/'):
+                pool.session.get(site.url(path))
+
+        pool.close()
+        stats = pool.stats.as_dict()
+
+        self.assertEqual(4, stats["requests"])
+        self.assertEqual(1, stats["connections"])
+        self.assertEqual(3, stats["reused"])
+        self.assertEqual(0.75, stats["reuse_rate"])
+        self.assertEqual({"127.0.0.1"}, set(stats["hosts"]))
+
+    def test_host_pool_sizes(self):
+        pool = SessionPool(pool_maxsize=4, host_pool_sizes={"example.com": 32})
+
+        self.assertEqual(32, pool.session.get_adapter("https://example.com/page/")._pool_maxsize)
+        self.assertEqual(4, pool.session.get_adapter("https://example.org/page/")._pool_maxsize)
+        self.assertEqual(32, pool.session.get_adapter("http://example.com:8080/page/")._pool_maxsize)
+        self.assertEqual(4, pool.session.get_adapter("https://example.com.evil.org/page/")._pool_maxsize)
+
+    def test_crawl_session(self):
+        pool = SessionPool()
+        first, second = pool.crawl_session(), pool.crawl_session()
+        first.cookies.set("session", "first")
+
+        with LocalSite({'/': '<html></html>'}) as site:
+            for session in (first, second, first):
+                session.get(site.url())
+
+        pool.close()
+        stats = pool.stats.as_dict()
+
+        # Crawl sessions keep their own cookies, but share the connections of the pool
+        self.assertIsNone(second.cookies.get("session"))
+        self.assertEqual(3, stats["requests"])
+        self.assertEqual(1, stats["connections"])
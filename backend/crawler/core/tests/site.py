@@ -0,0 +1,132 @@
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LocalSite(object):
+    """
+    Serves a fixed set of HTML pages from a local HTTP server, so that the crawler can be tested without network access.
+    """
+
+    def __init__(self, pages: dict, etags: bool = True, latency: float = 0.0, drip: float = 0.0):
+        """
+        Constructor method.
+        Args:
+            pages: Mapping of the URL paths (i.e. '/about/') to the HTML content served under them, or to the pairs of
+                   the Content-Type and the raw content, or to the callables returning either of them or the status
+                   code of an error response on every request (i.e. to simulate a failing server).
+            etags: Whether the pages are served with an ETag and conditional requests are answered by 304.
+            latency: Number of seconds every response is delayed by, simulating a distant server.
+            drip: Number of seconds between the bytes of every response including its headers, simulating a server
+                  that never lets the read timeout expire.
+        """
+        self.pages = pages
+        self.etags = etags
+        self.latency = latency
+        self.drip = drip
+
+        # Paths and status codes of the served requests
+        self.requests = []
+        self._server = None
+        self._thread = None
+
+    def url(self, path: str = '/') -> str:
+        """
+        Returns absolute URL of the provided path on the running server.
+        """
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        site = self
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep the connections alive between the requests
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, Nagle's algorithm would delay the body of every response
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if site.latency:
+                    time.sleep(site.latency)
+
+                if site.drip:
+                    self.wfile = _DripWriter(self.wfile, site.drip)
+
+                if self.path not in pages:
+                    self.send_error(404)
+                    return
+
+                page = pages[self.path]
+
+                if callable(page):
+                    page = page()
+
+                if isinstance(page, int):
+                    site.requests.append((self.path, page))
+                    self.send_error(page)
+                    return
+
+                content_type, body = page if isinstance(page, tuple) else ("text/html; charset=utf-8",
+                                                                           page.encode("utf-8"))
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+                if site.etags and self.headers.get("If-None-Match") == etag:
+                    site.requests.append((self.path, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                site.requests.append((self.path, 200))
+                self.send_response(200)
+                if content_type:
+                    self.send_header("Content-Type", content_type)
+                if site.etags:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            def handle_error(self, request, client_address):
+                # Clients may close the connection without reading the whole response
+                pass
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+class _DripWriter(object):
+    """
+    Writes the responses a byte at a time.
+    """
+
+    def __init__(self, wfile, interval: float):
+        self._wfile = wfile
+        self._interval = interval
+
+    def write(self, data: bytes) -> int:
+        for index in range(len(data)):
+            self._wfile.write(data[index:index + 1])
+            self._wfile.flush()
+            time.sleep(self._interval)
+
+        return len(data)
+
+    def flush(self) -> None:
+        self._wfile.flush()
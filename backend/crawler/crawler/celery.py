@@ -1,8 +1,13 @@
 import os
 
+import redis
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 from django.conf import settings
 
+from core.inspector import robots, session
+from tasks import metrics
+
 # Set the default value for environment variable so that the Celery knows where to find Django project
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "crawler.settings")
 # Celery instance creation
@@ -17,6 +22,46 @@ app.conf.update(redbeat_redis_url=redbeat_redis_url, redbeat_lock_key=None)
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
 
+# Pools running the tasks in the threads or greenlets of the worker process (i.e. "threads" and "gevent") do not
+# start child processes, the per-process state is set up once the worker starts then
+@worker_init.connect
+@worker_process_init.connect
+def init_session_pool(**kwargs):
+    """
+    Sets up the HTTP connection pool shared by all the crawls of the worker process.
+    """
+    session.configure(pool_connections=settings.CRAWLER_POOL_CONNECTIONS, pool_maxsize=settings.CRAWLER_POOL_MAXSIZE,
+                      host_pool_sizes=settings.CRAWLER_HOST_POOL_SIZES)
+
+
+@worker_init.connect
+@worker_process_init.connect
+def init_robots_cache(**kwargs):
+    """
+    Sets up the robots.txt cache of the worker process, shared with the other workers through Redis.
+    """
+    robots.configure(user_agent=settings.CRAWLER_ROBOTS_USER_AGENT, ttl=settings.CRAWLER_ROBOTS_TTL,
+                     redis=redis.Redis.from_url(settings.CRAWLER_ROBOTS_REDIS) if settings.CRAWLER_ROBOTS_REDIS
+                     else None)
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """
+    Serves the Prometheus metrics of the crawls run by the worker.
+    """
+    if settings.CRAWLER_METRICS_PORT:
+        metrics.start_server(settings.CRAWLER_METRICS_PORT)
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid: int = None, **kwargs):
+    """
+    Drops the live Prometheus gauges of the exited worker process.
+    """
+    metrics.mark_process_dead(pid or os.getpid())
+
+
 def celery_is_active():
     ERROR_KEY = "ERROR"
     try:
@@ -12,9 +12,11 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Workaround for version issues with Django 4 and Graphene
 import django
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.encoding import force_str
 
 django.utils.encoding.force_text = force_str
@@ -162,3 +164,104 @@ DATABASES = {
 
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER", "redis://127.0.0.1:6379/0")
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_BACKEND", "redis://127.0.0.1:6379/0")
+# Crawls interrupted by a restart of their worker are redelivered after this many seconds. A crawl still running then
+# keeps its redelivered task waiting, see CRAWLER_TASK_LEASE_TTL.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": int(os.environ.get("CELERY_VISIBILITY_TIMEOUT", str(12 * 60 * 60))),
+}
+
+# Crawler
+# Engine used for crawling - "sync" fetches one page at a time, "async" fetches up to CRAWLER_CONCURRENCY pages at once
+CRAWLER_ENGINE = os.environ.get("CRAWLER_ENGINE", "sync")
+CRAWLER_CONCURRENCY = int(os.environ.get("CRAWLER_CONCURRENCY", "16"))
+# Default politeness limits per host, WebsiteRecord may override them (0 means unlimited)
+CRAWLER_HOST_RATE_LIMIT = float(os.environ.get("CRAWLER_HOST_RATE_LIMIT", "0")) or None
+CRAWLER_HOST_MAX_IN_FLIGHT = int(os.environ.get("CRAWLER_HOST_MAX_IN_FLIGHT", "4")) or None
+# Sizes of the HTTP connection pool of every worker process - number of the hosts whose connections are kept alive,
+# number of the kept connections per host and per-host overrides in the format "example.com=32,cdn.example.com=64"
+CRAWLER_POOL_CONNECTIONS = int(os.environ.get("CRAWLER_POOL_CONNECTIONS", "10"))
+CRAWLER_POOL_MAXSIZE = int(os.environ.get("CRAWLER_POOL_MAXSIZE", "16"))
+CRAWLER_HOST_POOL_SIZES = {host.strip(): int(size) for host, size in (
+    item.split("=") for item in os.environ.get("CRAWLER_HOST_POOL_SIZES", "").split(",") if item.strip())}
+# Extractor of the website titles and links - "lxml" (fast, event based) or "soup" (full BeautifulSoup tree)
+CRAWLER_EXTRACTOR = os.environ.get("CRAWLER_EXTRACTOR", "lxml")
+# Number of the crawled nodes persisted at once while the crawl is running
+CRAWLER_PERSIST_BATCH_SIZE = int(os.environ.get("CRAWLER_PERSIST_BATCH_SIZE", "500"))
+# Whether a crawl updates the stored graph of the record in place ("1") or inserts a whole new graph ("0")
+CRAWLER_INCREMENTAL_GRAPH = os.environ.get("CRAWLER_INCREMENTAL_GRAPH", "1") == "1"
+# Query parameters dropped from the crawled URLs (names ending by "*" are prefixes) and the size of the URL cache
+CRAWLER_DROP_PARAMETERS = [name.strip() for name in os.environ.get(
+    "CRAWLER_DROP_PARAMETERS", "utm_*,gclid,dclid,fbclid,msclkid,yclid,mc_cid,mc_eid,_ga,_hsenc,_hsmi").split(",")
+    if name.strip()]
+CRAWLER_URL_CACHE_SIZE = int(os.environ.get("CRAWLER_URL_CACHE_SIZE", "65536"))
+# Whether the crawler obeys robots.txt, the product token matched against its groups and the number of seconds it is
+# cached for in the worker processes and in Redis (shared by all the workers)
+CRAWLER_OBEY_ROBOTS = os.environ.get("CRAWLER_OBEY_ROBOTS", "1") == "1"
+CRAWLER_ROBOTS_USER_AGENT = os.environ.get("CRAWLER_ROBOTS_USER_AGENT", "*")
+CRAWLER_ROBOTS_TTL = int(os.environ.get("CRAWLER_ROBOTS_TTL", str(24 * 60 * 60)))
+CRAWLER_ROBOTS_REDIS = os.environ.get("CRAWLER_ROBOTS_REDIS", CELERY_BROKER_URL)
+# Maximal number of bytes downloaded per crawled website
+CRAWLER_MAX_PAGE_BYTES = int(os.environ.get("CRAWLER_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+# Number of the Celery workers crawling a single record together, records are crawled by a single worker if 1
+CRAWLER_DISTRIBUTED_WORKERS = int(os.environ.get("CRAWLER_DISTRIBUTED_WORKERS", "1"))
+# Redis keeping the shared frontier of the distributed crawls and the number of the URLs taken from it at once
+CRAWLER_DISTRIBUTED_REDIS = os.environ.get("CRAWLER_DISTRIBUTED_REDIS", CELERY_BROKER_URL)
+CRAWLER_DISTRIBUTED_BATCH_SIZE = int(os.environ.get("CRAWLER_DISTRIBUTED_BATCH_SIZE", "32"))
+# Number of the processes parsing the websites downloaded by the "async" engine, the crawling process parses them if 0
+CRAWLER_PARSE_PROCESSES = int(os.environ.get("CRAWLER_PARSE_PROCESSES", "0"))
+# Number of the crawled nodes appended at once to the checkpoint of a crawl, so that a crawl interrupted by a restart
+# of its worker resumes when its task is redelivered. Checkpoints are disabled if 0 or if the graph is not incremental.
+CRAWLER_CHECKPOINT_EVERY = int(os.environ.get("CRAWLER_CHECKPOINT_EVERY", "100"))
+CRAWLER_CHECKPOINT_REDIS = os.environ.get("CRAWLER_CHECKPOINT_REDIS", CELERY_BROKER_URL)
+# Number of seconds the lease of a running crawl lasts unless its worker renews it. A redelivered task of a crawl waits
+# while the lease is renewed and takes the crawl over once the lease expired, leases are not used if 0.
+CRAWLER_TASK_LEASE_TTL = int(os.environ.get("CRAWLER_TASK_LEASE_TTL", "300"))
+# Port the Celery worker serves the Prometheus metrics of the crawls on, the metrics are not served if 0. Prefork
+# workers need PROMETHEUS_MULTIPROC_DIR set to a directory shared by their processes.
+CRAWLER_METRICS_PORT = int(os.environ.get("CRAWLER_METRICS_PORT", "0"))
+# Number of the URLs visited by a crawl inserted at once as the links of its execution, every batch also updates the
+# duration of the execution in progress
+CRAWLER_EXECUTION_LINK_BATCH_SIZE = int(os.environ.get("CRAWLER_EXECUTION_LINK_BATCH_SIZE", "5000"))
+# Timeouts of the website downloads - connecting to the host, every read of the response and the whole download
+# (unlimited if 0), so that a worker never waits for a host forever
+CRAWLER_CONNECT_TIMEOUT = float(os.environ.get("CRAWLER_CONNECT_TIMEOUT", "10"))
+CRAWLER_READ_TIMEOUT = float(os.environ.get("CRAWLER_READ_TIMEOUT", "30"))
+CRAWLER_FETCH_DEADLINE = float(os.environ.get("CRAWLER_FETCH_DEADLINE", "120"))
+# Number of the repeated attempts of a download failing transiently (timeouts, connection errors, 429 and 502-504
+# responses), the base and maximal number of seconds waited before an attempt (exponential backoff with jitter)
+CRAWLER_FETCH_RETRIES = int(os.environ.get("CRAWLER_FETCH_RETRIES", "2"))
+CRAWLER_RETRY_BACKOFF = float(os.environ.get("CRAWLER_RETRY_BACKOFF", "0.5"))
+CRAWLER_MAX_RETRY_BACKOFF = float(os.environ.get("CRAWLER_MAX_RETRY_BACKOFF", "10"))
+# Circuit breaker of the failing hosts - number of the consecutive failures after which a host is not requested for
+# the cooldown seconds (disabled if 0) and the number of such pauses after which the host is given up (never if 0)
+CRAWLER_HOST_FAILURE_THRESHOLD = int(os.environ.get("CRAWLER_HOST_FAILURE_THRESHOLD", "5"))
+CRAWLER_HOST_COOLDOWN = float(os.environ.get("CRAWLER_HOST_COOLDOWN", "30"))
+CRAWLER_HOST_MAX_TRIPS = int(os.environ.get("CRAWLER_HOST_MAX_TRIPS", "3"))
+# Whether the number of the requests in progress adapts to the latency and the errors of every crawled host (additive
+# increase, multiplicative decrease) and the highest number it grows to, unless the record sets its own maximum
+CRAWLER_ADAPTIVE_CONCURRENCY = os.environ.get("CRAWLER_ADAPTIVE_CONCURRENCY", "1") == "1"
+CRAWLER_ADAPTIVE_MAX_IN_FLIGHT = int(os.environ.get("CRAWLER_ADAPTIVE_MAX_IN_FLIGHT", "32"))
+# Scorer of the crawled URLs, the ones with the lowest score are crawled first - "fifo" (in the order they were found),
+# "depth" (shallow pages first) or "shape" (shallow pages with short paths and few query parameters first)
+CRAWLER_URL_SCORER = os.environ.get("CRAWLER_URL_SCORER", "shape")
+# Budgets of a crawl, unless the record sets its own - maximal number of the links from the top level URL to a crawled
+# one (unlimited if empty), of the crawled pages, the downloaded bytes and the seconds new pages are requested for
+# (unlimited if 0)
+CRAWLER_MAX_DEPTH = int(os.environ["CRAWLER_MAX_DEPTH"]) if os.environ.get("CRAWLER_MAX_DEPTH") else None
+CRAWLER_MAX_PAGES = int(os.environ.get("CRAWLER_MAX_PAGES", "0")) or None
+CRAWLER_MAX_BYTES = int(os.environ.get("CRAWLER_MAX_BYTES", "0")) or None
+CRAWLER_MAX_DURATION = float(os.environ.get("CRAWLER_MAX_DURATION", "0")) or None
+# Cache of the graphs returned by the API - Redis URL of the cache shared by the API processes - and the number of
+# seconds a graph is cached for. Graphs are cached by the versions stored by their records, so the persisted graphs
+# invalidate them. "locmem://" keeps the graphs in the memory of every process, it is meant for the development and the
+# tests running in a single process only, so it is rejected unless DEBUG is on. The tests always use it, so that they
+# do not share the graphs of their databases with the other processes.
+CRAWLER_GRAPH_CACHE = "locmem://" if 'test' in sys.argv else os.environ.get("CRAWLER_GRAPH_CACHE", CELERY_BROKER_URL)
+CRAWLER_GRAPH_CACHE_TTL = int(os.environ.get("CRAWLER_GRAPH_CACHE_TTL", str(24 * 60 * 60)))
+if CRAWLER_GRAPH_CACHE.startswith("locmem") and not DEBUG and 'test' not in sys.argv:
+    raise ImproperlyConfigured("CRAWLER_GRAPH_CACHE=locmem:// is meant for a single process, use a Redis URL")
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "graphs": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"} if CRAWLER_GRAPH_CACHE.startswith("locmem")
+    else {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CRAWLER_GRAPH_CACHE},
+}
@@ -1,24 +1,115 @@
 import sys
+import time
 
 import celery.schedules
+from celery.utils.log import get_task_logger
 from core.inspector.inspector import Inspector
-from django.db import transaction
+from core.inspector.metrics import CrawlMetrics
+from core.inspector.robots import get_robots_cache
+from core.inspector.session import get_session_pool
+from django.conf import settings
 from redbeat import RedBeatSchedulerEntry
 from api.models import WebsiteRecord, Execution
 
-from .transformer import transform_graph, persist_graph
+from .distributed import start_distributed_crawl
+from .execution import ExecutionRecorder
+from .metrics import CRAWL_DURATION, MetricsExporter, record_canonicalization
+from .options import crawl_options, create_checkpoint, create_graph_writer, create_lease
+from .transformer import IncrementalGraphWriter
 from crawler.celery import app
 
+LOGGER = get_task_logger(__name__)
 
-@app.task(bind=True)
-def run_crawler_task(self, url: str, regex: str, record_id: int, title: str) -> None:
-    nodes = Inspector.crawl_url(url, regex)
-    # TODO: Create Execution and Execution link
-    persist_graph(*transform_graph(nodes, record_id))
-    # with transaction.atomic():
-    #     execution = Execution(title=title, url=url, crawl_duration=self.runtime,
-    #                           website_record=WebsiteRecord.objects.get(record_id), status=self.status)
-    #     execution.save()
+
+@app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def run_crawler_task(self, url: str, regex: str, record_id: int) -> None:
+    # The task redelivered while the crawl still runs waits for it
+    lease = create_lease(self.request.id)
+
+    if lease is not None and not lease.acquire():
+        LOGGER.info("Crawl of the record %d by the task %s has already finished", record_id, self.request.id)
+        return
+
+    try:
+        _run_crawler_task(self.request.id, url, regex, record_id)
+    except Exception:
+        if lease is not None:
+            lease.release(finished=False)
+        raise
+
+    if lease is not None:
+        lease.release()
+
+
+def _run_crawler_task(task_id: str, url: str, regex: str, record_id: int) -> None:
+    if settings.CRAWLER_DISTRIBUTED_WORKERS > 1:
+        start_distributed_crawl(url, regex, record_id, settings.CRAWLER_DISTRIBUTED_WORKERS, task_id)
+        return
+
+    started = time.monotonic()
+    record = WebsiteRecord.objects.get(pk=record_id)
+    options = crawl_options(record)
+    canonicalizer = options["canonicalizer"]
+
+    # Wall time of the crawl phases, exported to Prometheus while crawling and stored on the execution
+    metrics = CrawlMetrics()
+    exporter = MetricsExporter(metrics)
+
+    # The execution is visible in progress during the crawl, visited URLs are stored as its links
+    execution = ExecutionRecorder.start(record, url, task_id, settings.CRAWLER_EXECUTION_LINK_BATCH_SIZE, metrics)
+
+    try:
+        _crawl(task_id, url, regex, record_id, options, metrics, exporter, execution)
+    except Exception:
+        execution.finish(Execution.UNKNOWN)
+        raise
+
+    # The dedupe rate of the URLs is stored on the execution with the other metrics
+    record_canonicalization(metrics, canonicalizer.stats())
+
+    duration = time.monotonic() - started
+    exporter.close()
+    CRAWL_DURATION.observe(duration)
+    execution.finish()
+
+    LOGGER.info("Robots.txt cache of the worker process: %s", get_robots_cache().stats())
+    LOGGER.info("Connection reuse of the worker process: %s", get_session_pool().stats.as_dict())
+
+
+def _crawl(task_id: str, url: str, regex: str, record_id: int, options: dict, metrics: CrawlMetrics,
+           exporter: MetricsExporter, execution: ExecutionRecorder) -> None:
+    """
+    Crawls the record and persists its graph and execution links while crawling.
+    """
+    # Continue the crawl interrupted by a restart of the worker, the task is redelivered then
+    checkpoint = create_checkpoint(task_id)
+    resumed = checkpoint.load() if checkpoint else []
+
+    if resumed:
+        LOGGER.info("Resuming the crawl of the record %d after %d nodes", record_id, len(resumed))
+
+    nodes = Inspector(url, regex, resume=resumed, metrics=metrics, **options).iter_nodes()
+
+    # Persist the graph incrementally while crawling
+    writer = create_graph_writer(record_id, metrics)
+
+    for node in resumed:
+        writer.write(node)
+        execution.add(node)
+
+    for node in nodes:
+        if checkpoint:
+            checkpoint.append(node)
+        writer.write(node)
+        execution.add(node)
+        exporter.export()
+    writer.close()
+
+    if checkpoint:
+        checkpoint.clear()
+
+    if isinstance(writer, IncrementalGraphWriter):
+        LOGGER.info("Graph changes of the record %d: %s", record_id, writer.changes)
 
 
 def schedule_periodic_crawler_task(url: str, regex: str, record_id: int, interval: int) -> RedBeatSchedulerEntry:
@@ -0,0 +1,177 @@
+import json
+import uuid
+
+import redis
+from celery import chord
+from celery.utils.log import get_task_logger
+from core.inspector.canonicalizer import UrlCanonicalizer
+from core.inspector.inspector import Inspector
+from core.inspector.metrics import CrawlMetrics
+from core.inspector.redis_frontier import RedisFrontier, SharedCrawlBudget, crawl_keys
+from django.conf import settings
+from api.models import Execution, WebsiteRecord
+
+from .execution import ExecutionRecorder
+from .metrics import MetricsExporter, record_canonicalization
+from .options import crawl_options, create_graph_writer
+from crawler.celery import app
+
+LOGGER = get_task_logger(__name__)
+
+
+def _redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.CRAWLER_DISTRIBUTED_REDIS)
+
+
+def start_distributed_crawl(url: str, regex: str, record_id: int, workers: int, task_id: str = None) -> str:
+    """
+    Starts the crawl of the record by several Celery workers sharing its frontier in Redis. The execution of the crawl
+    is created in progress, the graph and the execution links are persisted by `finalize_crawl_task` once all the
+    workers finished.
+    Args:
+        url: URL the crawl starts from.
+        regex: Boundary of the crawled URLs/domains.
+        record_id: Actual WebsiteRecord ID
+        workers: Number of the worker tasks.
+        task_id: ID of the Celery task starting the crawl or None.
+
+    Returns:
+        Identifier of the crawl.
+    """
+    crawl_id = uuid.uuid4().hex
+    start_url = UrlCanonicalizer(drop_parameters=settings.CRAWLER_DROP_PARAMETERS).canonicalize(url) or url
+    execution = ExecutionRecorder.start(WebsiteRecord.objects.get(pk=record_id), url, task_id).execution
+
+    RedisFrontier.start(_redis(), crawl_id, [start_url])
+
+    chord(crawl_worker_task.s(crawl_id, url, regex, record_id) for _ in range(workers))(
+        finalize_crawl_task.s(crawl_id, record_id, execution.pk))
+
+    return crawl_id
+
+
+def crawl_worker(crawl_id: str, url: str, regex: str, record_id: int) -> dict:
+    """
+    Crawls the URLs of the shared frontier until the crawl is finished and pushes the crawled nodes to Redis.
+    Args:
+        crawl_id: Identifier of the crawl.
+        url: URL the crawl started from.
+        regex: Boundary of the crawled URLs/domains.
+        record_id: Actual WebsiteRecord ID
+
+    Returns:
+        Metrics of the part of the crawl done by this worker, see `CrawlMetrics.as_dict`.
+    """
+    client = _redis()
+    options = crawl_options(WebsiteRecord.objects.get(pk=record_id))
+    batch_size = settings.CRAWLER_DISTRIBUTED_BATCH_SIZE
+
+    policy = options["fetch_policy"]
+    frontier = RedisFrontier(client, crawl_id, batch_size, options["rate_limit"], options["max_in_flight"],
+                             failure_threshold=policy.failure_threshold, cooldown=policy.cooldown,
+                             max_trips=policy.max_trips, adaptive=options["adaptive_concurrency"],
+                             scorer=options["scorer"])
+
+    # Pages and bytes are counted by all the workers together
+    budget = options["budget"]
+    options["budget"] = SharedCrawlBudget(client, crawl_id, budget.max_depth, budget.max_pages, budget.max_bytes,
+                                          budget.max_seconds, frontier.ttl)
+    nodes_key = crawl_keys(crawl_id)["nodes"]
+
+    metrics = CrawlMetrics()
+    exporter = MetricsExporter(metrics)
+
+    crawled = 0
+    batch = []
+
+    for node in Inspector(url, regex, frontier=frontier, metrics=metrics, **options).iter_nodes():
+        batch.append(json.dumps(node, default=str))
+
+        if len(batch) >= batch_size:
+            client.rpush(nodes_key, *batch)
+            crawled += len(batch)
+            batch = []
+
+        exporter.export()
+
+    if batch:
+        client.rpush(nodes_key, *batch)
+        crawled += len(batch)
+
+    client.expire(nodes_key, frontier.ttl)
+    record_canonicalization(metrics, options["canonicalizer"].stats())
+    exporter.close()
+
+    LOGGER.info("Worker of the crawl %s crawled %d nodes", crawl_id, crawled)
+
+    return metrics.as_dict()
+
+
+def finalize_crawl(crawl_id: str, record_id: int, worker_metrics: list = (), execution_id: int = None) -> CrawlMetrics:
+    """
+    Persists the nodes crawled by all the workers and removes the shared state of the crawl.
+    Args:
+        crawl_id: Identifier of the crawl.
+        record_id: Actual WebsiteRecord ID
+        worker_metrics: Metrics of the workers of the crawl.
+        execution_id: ID of the execution of the crawl finished with the persisted nodes as its links or None.
+
+    Returns:
+        Metrics of the whole crawl, including its persistence.
+    """
+    client = _redis()
+    keys = crawl_keys(crawl_id)
+    batch_size = settings.CRAWLER_PERSIST_BATCH_SIZE
+
+    metrics = CrawlMetrics()
+    for crawled_metrics in worker_metrics:
+        metrics.merge(crawled_metrics)
+    # Dedupe rate of the links of all the workers
+    record_canonicalization(metrics)
+
+    # Workers exported their metrics already, only the persistence is exported here
+    exporter = MetricsExporter(CrawlMetrics())
+    writer = create_graph_writer(record_id, exporter.metrics)
+    execution = None
+
+    if execution_id is not None:
+        execution = ExecutionRecorder(Execution.objects.get(pk=execution_id),
+                                      settings.CRAWLER_EXECUTION_LINK_BATCH_SIZE, metrics)
+
+    # Leaf nodes may be found by several workers
+    persisted = set()
+
+    for start in range(0, client.llen(keys["nodes"]), batch_size):
+        for raw_node in client.lrange(keys["nodes"], start, start + batch_size - 1):
+            node = json.loads(raw_node)
+
+            if node["url"] not in persisted:
+                persisted.add(node["url"])
+                writer.write(node)
+
+                if execution:
+                    execution.add(node)
+
+    writer.close()
+    client.delete(*keys.values())
+
+    exporter.close()
+    metrics.merge(exporter.metrics.as_dict())
+
+    if execution:
+        execution.finish()
+
+    LOGGER.info("Crawl %s of the record %d persisted %d nodes, metrics: %s", crawl_id, record_id, len(persisted),
+                metrics.as_dict())
+
+    return metrics
+
+
+@app.task
+def crawl_worker_task(crawl_id: str, url: str, regex: str, record_id: int) -> dict:
+    return crawl_worker(crawl_id, url, regex, record_id)
+
+
+@app.task
+def finalize_crawl_task(worker_metrics: list, crawl_id: str, record_id: int, execution_id: int = None) -> None:
+    finalize_crawl(crawl_id, record_id, worker_metrics, execution_id)
@@ -0,0 +1,75 @@
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from api.models import WebsiteRecord
+
+LOGGER = logging.getLogger(__name__)
+
+# Alias of the Django cache of the graphs, see CACHES of the settings
+CACHE_ALIAS = "graphs"
+
+
+def bump_graph_version(record_id: int) -> None:
+    """
+    Gives the graph of the record a new version once it changed, so that the graphs cached before are not read again.
+    The version is stored by the record, so it changes together with the graph even if the cache is not available.
+    Args:
+        record_id: Actual WebsiteRecord ID
+    """
+    WebsiteRecord.objects.filter(pk=record_id).update(graph_version=F('graph_version') + 1)
+
+
+def graph_etag(record_ids: list, mode: str) -> str:
+    """
+    Builds the ETag of the graph of the records out of their current versions by a single query of the records, the
+    nodes of their graphs are not queried at all. Deleted records have no version, so their graphs get a new ETag too.
+    Args:
+        record_ids: IDs of the WebsiteRecords, in any order.
+        mode: Mode of the graph, i.e. "website" or "domain".
+
+    Returns:
+        The strong ETag of the graph.
+    """
+    record_ids = sorted(set(record_ids))
+    versions = dict(WebsiteRecord.objects.filter(pk__in=record_ids).values_list('id', 'graph_version'))
+    versions = ','.join(f'{record_id}={versions.get(record_id)}' for record_id in record_ids)
+    digest = hashlib.sha1(f"{mode}:{versions}".encode()).hexdigest()
+
+    return f'"{digest}"'
+
+
+def cached_graph(etag: str, build: callable) -> dict:
+    """
+    Returns the graph of the ETag out of the cache, the graph is built and cached if it is not cached yet.
+    Args:
+        etag: ETag of the graph (see `graph_etag`) or None if the graph is not cached.
+        build: Function building the graph.
+
+    Returns:
+        The graph.
+    """
+    if etag is None:
+        return build()
+
+    cache = caches[CACHE_ALIAS]
+    key = "graph:" + etag.strip('"')
+
+    try:
+        graph = cache.get(key)
+    except Exception as error:
+        LOGGER.log(logging.WARNING, "Failed to read the graph from the cache: %s" % error)
+        return build()
+
+    if graph is None:
+        graph = build()
+
+        try:
+            cache.set(key, graph, timeout=settings.CRAWLER_GRAPH_CACHE_TTL)
+        except Exception as error:
+            LOGGER.log(logging.WARNING, "Failed to cache the graph: %s" % error)
+
+    return graph
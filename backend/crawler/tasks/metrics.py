@@ -0,0 +1,137 @@
+import os
+import time
+
+from core.inspector.metrics import CrawlMetrics
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess, \
+    start_http_server
+
+# Minimal number of seconds between two exports of the metrics of a running crawl
+EXPORT_INTERVAL = 5.0
+
+PHASE_SECONDS = Counter("crawler_phase_seconds", "Wall time spent in the phases of the crawls.", ["phase"])
+PHASE_OPERATIONS = Counter("crawler_phase_operations", "Operations done in the phases of the crawls.", ["phase"])
+EVENTS = Counter("crawler_events", "Events of the crawls, i.e. crawled pages and downloaded bytes.", ["event"])
+ERRORS = Counter("crawler_errors", "Errors of the crawls by their type.", ["type"])
+CRAWL_DURATION = Histogram("crawler_crawl_duration_seconds", "Duration of the finished crawls.",
+                           buckets=(1, 5, 15, 60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600))
+# Value of every live process of a prefork worker (labeled by its pid), the values of the dead processes are dropped
+HOST_CONCURRENCY_LIMIT = Gauge("crawler_host_concurrency_limit", "Adaptive limit of the requests in progress per host.",
+                               ["host"], multiprocess_mode="liveall")
+
+# Prometheus gauges of the gauges of the crawl metrics, labeled by their keys
+GAUGES = {"concurrency_limit": HOST_CONCURRENCY_LIMIT}
+
+# Statistics of the URL canonicalizer counted by the crawl metrics, see `UrlCanonicalizer.stats`
+CANONICALIZATION_COUNTERS = ("links", "spellings", "urls", "cache_hits", "cache_misses")
+
+
+def record_canonicalization(metrics: CrawlMetrics, stats: dict = None) -> None:
+    """
+    Adds the statistics of the URL canonicalization to the metrics of the crawl as the "canonical_*" counters and sets
+    the dedupe rate of the crawl out of the counters, so that the rate of the crawls of several workers is computed
+    out of all of their links once their metrics are merged.
+    Args:
+        metrics: Metrics of the crawl.
+        stats: Statistics of the URL canonicalizer of the crawl or None if they were merged to the metrics already.
+    """
+    if stats is not None:
+        for counter in CANONICALIZATION_COUNTERS:
+            metrics.increment(f"canonical_{counter}", stats[counter])
+
+    counters = metrics.as_dict()["counters"]
+    spellings = counters.get("canonical_spellings", 0)
+    dedupe_rate = 1 - counters.get("canonical_urls", 0) / spellings if spellings else 0.0
+    metrics.gauge("canonicalization", "dedupe_rate", dedupe_rate)
+
+
+class MetricsExporter(object):
+    """
+    Exports the metrics of a running crawl as Prometheus counters and gauges. Only the changes since the previous
+    export are added to the counters, so a long crawl is visible while running and is not counted twice. The gauges of
+    the crawl are removed once it finished, see `close`.
+    """
+
+    def __init__(self, metrics: CrawlMetrics, interval: float = EXPORT_INTERVAL, clock: callable = time.monotonic):
+        """
+        Constructor method.
+        Args:
+            metrics: Metrics of the crawl.
+            interval: Minimal number of seconds between two exports.
+            clock: Monotonic clock returning the current time in seconds.
+        """
+        self.metrics = metrics
+        self.interval = interval
+        self._clock = clock
+        self._exported = CrawlMetrics().as_dict()
+        self._last_export = clock()
+
+    def export(self, force: bool = False) -> None:
+        """
+        Adds the changes of the metrics to the Prometheus counters, unless they were exported less than `interval`
+        seconds ago.
+        Args:
+            force: Whether to export regardless of the interval, i.e. when the crawl finished.
+        """
+        if not force and self._clock() - self._last_export < self.interval:
+            return
+
+        current = self.metrics.as_dict()
+        exported = self._exported
+
+        for phase, values in current["phases"].items():
+            previous = exported["phases"].get(phase, {"seconds": 0.0, "operations": 0})
+            PHASE_SECONDS.labels(phase).inc(values["seconds"] - previous["seconds"])
+            PHASE_OPERATIONS.labels(phase).inc(values["operations"] - previous["operations"])
+
+        for event, value in current["counters"].items():
+            EVENTS.labels(event).inc(value - exported["counters"].get(event, 0))
+
+        for error, count in current["errors"].items():
+            ERRORS.labels(error).inc(count - exported["errors"].get(error, 0))
+
+        for gauge, values in current["gauges"].items():
+            if gauge in GAUGES:
+                for key, value in values.items():
+                    GAUGES[gauge].labels(key).set(value)
+
+        self._exported = current
+        self._last_export = self._clock()
+
+    def close(self) -> None:
+        """
+        Exports the final metrics of the finished crawl and removes its gauges, so that the hosts it crawled do not
+        stay exported.
+        """
+        self.export(force=True)
+
+        for gauge, values in self._exported["gauges"].items():
+            if gauge in GAUGES:
+                for key in values:
+                    try:
+                        GAUGES[gauge].remove(key)
+                    except KeyError:
+                        # Removed by another crawl of the same host
+                        pass
+
+
+def start_server(port: int) -> None:
+    """
+    Serves the metrics of the worker over HTTP. The metrics of all the processes of a prefork worker are collected if
+    the PROMETHEUS_MULTIPROC_DIR environment variable points to a directory shared by them, otherwise only the metrics
+    of the current process are served.
+    """
+    registry = REGISTRY
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    start_http_server(port, registry=registry)
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Drops the live gauges of the exited process of a prefork worker, if the metrics of the processes are collected.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
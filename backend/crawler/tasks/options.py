@@ -0,0 +1,102 @@
+import redis
+from core.inspector.budget import CrawlBudget
+from core.inspector.canonicalizer import UrlCanonicalizer
+from core.inspector.checkpoint import CrawlCheckpoint, CrawlLease
+from core.inspector.metrics import CrawlMetrics
+from core.inspector.retry import FetchPolicy
+from core.inspector.robots import get_robots_cache
+from django.conf import settings
+
+from api.models import WebsiteRecord
+from .transformer import GraphWriter, IncrementalGraphWriter, load_pages
+
+
+def _limit(value, default):
+    """
+    Returns the record's own limit, the crawler default if the record does not set it.
+    """
+    return default if value is None else value
+
+
+def crawl_options(record: WebsiteRecord) -> dict:
+    """
+    Builds the options of the Inspector class crawling the record out of the record's limits and the crawler settings.
+    Args:
+        record: Crawled WebsiteRecord.
+
+    Returns:
+        Keyword arguments of the `Inspector`.
+    """
+    return {
+        "engine": settings.CRAWLER_ENGINE,
+        "concurrency": settings.CRAWLER_CONCURRENCY,
+        "rate_limit": _limit(record.host_rate_limit, settings.CRAWLER_HOST_RATE_LIMIT),
+        # Adaptive limits start low and grow up to their own maximum, unless the record limits the hosts
+        "max_in_flight": _limit(record.host_max_in_flight, settings.CRAWLER_ADAPTIVE_MAX_IN_FLIGHT
+                                if settings.CRAWLER_ADAPTIVE_CONCURRENCY else settings.CRAWLER_HOST_MAX_IN_FLIGHT),
+        "adaptive_concurrency": settings.CRAWLER_ADAPTIVE_CONCURRENCY,
+        "extractor": settings.CRAWLER_EXTRACTOR,
+        "validators": load_pages(record.id),
+        "canonicalizer": UrlCanonicalizer(drop_parameters=settings.CRAWLER_DROP_PARAMETERS,
+                                          cache_size=settings.CRAWLER_URL_CACHE_SIZE),
+        "robots": get_robots_cache() if settings.CRAWLER_OBEY_ROBOTS else None,
+        "max_page_bytes": settings.CRAWLER_MAX_PAGE_BYTES,
+        "scorer": settings.CRAWLER_URL_SCORER,
+        "budget": CrawlBudget(max_depth=_limit(record.max_depth, settings.CRAWLER_MAX_DEPTH),
+                              max_pages=_limit(record.max_pages, settings.CRAWLER_MAX_PAGES),
+                              max_bytes=_limit(record.max_bytes, settings.CRAWLER_MAX_BYTES),
+                              max_seconds=_limit(record.max_duration, settings.CRAWLER_MAX_DURATION)),
+        "parse_processes": settings.CRAWLER_PARSE_PROCESSES,
+        "fetch_policy": FetchPolicy(connect_timeout=settings.CRAWLER_CONNECT_TIMEOUT,
+                                    read_timeout=settings.CRAWLER_READ_TIMEOUT,
+                                    deadline=settings.CRAWLER_FETCH_DEADLINE or None,
+                                    retries=settings.CRAWLER_FETCH_RETRIES,
+                                    backoff=settings.CRAWLER_RETRY_BACKOFF,
+                                    max_backoff=settings.CRAWLER_MAX_RETRY_BACKOFF,
+                                    failure_threshold=settings.CRAWLER_HOST_FAILURE_THRESHOLD or None,
+                                    cooldown=settings.CRAWLER_HOST_COOLDOWN,
+                                    max_trips=settings.CRAWLER_HOST_MAX_TRIPS or None),
+    }
+
+
+def create_graph_writer(record_id: int, metrics: CrawlMetrics = None) -> GraphWriter:
+    """
+    Creates the writer persisting the crawled graph of the record, incremental one unless disabled by the settings.
+    The writer adds the wall time of the persistence to the metrics, if provided.
+    """
+    if settings.CRAWLER_INCREMENTAL_GRAPH:
+        return IncrementalGraphWriter(record_id, settings.CRAWLER_PERSIST_BATCH_SIZE, metrics)
+
+    return GraphWriter(record_id, settings.CRAWLER_PERSIST_BATCH_SIZE, metrics)
+
+
+def create_checkpoint(task_id: str) -> CrawlCheckpoint:
+    """
+    Creates the checkpoint of the crawl run by the task, the redelivered task finds the checkpoint by the same ID.
+    Checkpoints are used together with the incremental graph only, since it stores the resumed nodes again in place.
+
+    Returns:
+        The checkpoint or None if the crawl is not checkpointed.
+    """
+    if not settings.CRAWLER_CHECKPOINT_EVERY or not settings.CRAWLER_INCREMENTAL_GRAPH or not task_id:
+        return None
+
+    return CrawlCheckpoint(redis.Redis.from_url(settings.CRAWLER_CHECKPOINT_REDIS), f"checkpoint:{task_id}",
+                           settings.CRAWLER_CHECKPOINT_EVERY)
+
+
+def create_lease(task_id: str) -> CrawlLease:
+    """
+    Creates the lease of the crawl run by the task, the redelivered task finds the lease by the same ID.
+
+    Returns:
+        The lease or None if the leases are disabled.
+    """
+    if not settings.CRAWLER_TASK_LEASE_TTL or not task_id:
+        return None
+
+    # Finished leases outlive the redelivery of their tasks
+    visibility_timeout = settings.CELERY_BROKER_TRANSPORT_OPTIONS["visibility_timeout"]
+
+    return CrawlLease(redis.Redis.from_url(settings.CRAWLER_CHECKPOINT_REDIS), f"lease:{task_id}",
+                      settings.CRAWLER_TASK_LEASE_TTL, finished_ttl=2 * visibility_timeout)
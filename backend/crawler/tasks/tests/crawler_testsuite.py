@@ -0,0 +1,34 @@
+import re
+
+from django.test import TestCase, override_settings
+
+from api.models import Execution, Node, WebsiteRecord
+from core.tests.site import LocalSite
+from tasks.crawler import _run_crawler_task
+
+SITE = {
+    "/": '<title>Home</title><a href="/a/">A</a><a href="/a/?">A</a><a href="/a/#top">A</a><a href="b/">B</a>',
+    "/a/": '<title>A</title><a href="/">Home</a><a href="../b/">B</a>',
+    "/b/": '<title>B</title><a href="/a/">A</a><a href="http://external.example/">External</a>',
+}
+
+
+@override_settings(CRAWLER_OBEY_ROBOTS=False, CRAWLER_DISTRIBUTED_WORKERS=1)
+class CrawlerTaskTestCase(TestCase):
+    def test_canonicalization_metrics(self):
+        with LocalSite(SITE) as site:
+            record = WebsiteRecord.objects.create(url=site.url(), label="site", interval=0, active=False,
+                                                  regex=rf"{re.escape(site.url())}.*")
+            _run_crawler_task(None, record.url, record.regex, record.id)
+
+        execution = Execution.objects.get(website_record=record)
+        counters = execution.metrics["counters"]
+
+        # The URL canonicalization is stored on the execution with the other metrics
+        self.assertEqual(Execution.FINISHED, execution.status)
+        self.assertEqual(4, Node.objects.filter(owner=record).count())
+        self.assertEqual(8, counters["canonical_links"])
+        self.assertLess(counters["canonical_urls"], counters["canonical_spellings"])
+        self.assertEqual(1 - counters["canonical_urls"] / counters["canonical_spellings"],
+                         execution.metrics["gauges"]["canonicalization"]["dedupe_rate"])
+        self.assertGreater(execution.metrics["gauges"]["canonicalization"]["dedupe_rate"], 0)
@@ -0,0 +1,113 @@
+import os
+import random
+import re
+import threading
+
+import redis
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from api.models import Edge, Execution, Node, WebsiteRecord
+from core.inspector.inspector import Inspector
+from core.inspector.redis_frontier import RedisFrontier, crawl_keys
+from core.tests.site import LocalSite
+from tasks.distributed import crawl_worker, finalize_crawl
+from tasks.execution import ExecutionRecorder
+
+# Redis database used by the test, it is flushed of the test crawl's keys only
+TEST_REDIS = os.environ.get("CRAWLER_TEST_REDIS", "redis://127.0.0.1:6379/15")
+
+
+def synthetic_site(pages: int, fanout: int, seed: int = 0) -> dict:
+    generator = random.Random(seed)
+    site = {}
+
+    for page in range(pages):
+        targets = generator.sample(range(pages), fanout) + [(page + 1) % pages]
+        anchors = "".join(f'<a href="/page/{target}/">{target}</a>' for target in targets)
+        site[f"/page/{page}/"] = f"<html><head><title>Page {page}</title></head><body>{anchors}" \
+                                 f'<a href="http://external.example/{page % 3}">External</a></body></html>'
+
+    return site
+
+
+@override_settings(CRAWLER_DISTRIBUTED_REDIS=TEST_REDIS, CRAWLER_DISTRIBUTED_BATCH_SIZE=4,
+                   CRAWLER_OBEY_ROBOTS=False, CRAWLER_ENGINE="async", CRAWLER_CONCURRENCY=4)
+class DistributedCrawlTestCase(TransactionTestCase):
+    def setUp(self):
+        self.redis = redis.Redis.from_url(TEST_REDIS)
+
+        try:
+            self.redis.ping()
+        except redis.exceptions.ConnectionError:
+            self.skipTest(f"Redis is not available at {TEST_REDIS}")
+
+        self.site = LocalSite(synthetic_site(60, 3)).__enter__()
+        self.record = WebsiteRecord.objects.create(url=self.site.url('/page/0/'), label="synthetic", interval=0,
+                                                   active=False, regex=rf"{re.escape(self.site.url())}.*")
+
+    def tearDown(self):
+        self.site.__exit__()
+
+    def _run_workers(self, crawl_id: str, workers: int) -> list:
+        crawled = []
+
+        def work():
+            try:
+                crawled.append(crawl_worker(crawl_id, self.record.url, self.record.regex, self.record.id))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return crawled
+
+    def test_distributed_crawl(self):
+        crawl_id = "test-distributed-crawl"
+        RedisFrontier.start(self.redis, crawl_id, [self.record.url])
+
+        worker_metrics = self._run_workers(crawl_id, 3)
+        execution = ExecutionRecorder.start(self.record, self.record.url).execution
+        metrics = finalize_crawl(crawl_id, self.record.id, worker_metrics, execution.pk)
+
+        expected = Inspector.crawl_url(self.record.url, self.record.regex)
+
+        # Every page is crawled by exactly one worker
+        self.assertEqual(3, len(worker_metrics))
+        self.assertEqual(sum(1 for node in expected if not node["boundary_record"]),
+                         metrics.as_dict()["counters"]["pages"])
+        self.assertEqual(sum(worker["counters"]["canonical_links"] for worker in worker_metrics),
+                         metrics.as_dict()["counters"]["canonical_links"])
+        self.assertIn("dedupe_rate", metrics.as_dict()["gauges"]["canonicalization"])
+        self.assertEqual({node["url"] for node in expected},
+                         set(Node.objects.filter(owner=self.record).values_list('url', flat=True)))
+        self.assertEqual({(node["url"], target) for node in expected for target in node["execution_targets"]},
+                         {(edge.source.url, edge.target.url) for edge in Edge.objects.select_related('source',
+                                                                                                    'target')})
+        self.assertFalse(any(self.redis.exists(key) for key in crawl_keys(crawl_id).values()))
+
+        execution.refresh_from_db()
+        self.assertEqual(Execution.FINISHED, execution.status)
+        self.assertEqual(metrics.as_dict(), execution.metrics)
+        self.assertEqual({node["url"] for node in expected if not node["boundary_record"]},
+                         set(execution.executionlink_set.values_list('url', flat=True)))
+
+    def test_distributed_budget(self):
+        crawl_id = "test-distributed-budget"
+        self.record.max_pages = 12
+        self.record.save()
+        RedisFrontier.start(self.redis, crawl_id, [self.record.url])
+
+        worker_metrics = self._run_workers(crawl_id, 3)
+        metrics = finalize_crawl(crawl_id, self.record.id, worker_metrics).as_dict()
+
+        # Workers count the pages together, the downloads in progress when the crawl stopped finish
+        self.assertLessEqual(12, metrics["counters"]["pages"])
+        self.assertGreater(12 + 3 * 4, metrics["counters"]["pages"])
+        self.assertLessEqual(1, metrics["counters"]["budget_pages"])
+        self.assertLess(metrics["counters"]["pages"], Node.objects.filter(owner=self.record).count())
+        self.assertFalse(any(self.redis.exists(key) for key in crawl_keys(crawl_id).values()))
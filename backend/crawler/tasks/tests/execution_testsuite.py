@@ -0,0 +1,58 @@
+from django.test import TestCase
+
+from api.models import Execution, ExecutionLink, WebsiteRecord
+from core.inspector.metrics import CrawlMetrics
+from tasks.execution import ExecutionRecorder
+
+
+def raw_node(url: str, boundary_record: bool = False) -> dict:
+    return {"url": url, "title": url, "execution_targets": [], "boundary_record": boundary_record}
+
+
+class ExecutionRecorderTestCase(TestCase):
+    def setUp(self):
+        self.record = WebsiteRecord.objects.create(url="http://example.com/", label="example", interval=0,
+                                                   active=False, regex=".*")
+
+    def _links(self, execution: Execution) -> list:
+        return list(ExecutionLink.objects.filter(execution=execution).order_by('id').values_list('url', flat=True))
+
+    def test_batches(self):
+        metrics = CrawlMetrics()
+        recorder = ExecutionRecorder.start(self.record, self.record.url, batch_size=2, metrics=metrics)
+        execution = Execution.objects.get(pk=recorder.execution.pk)
+
+        self.assertEqual((Execution.IN_PROGRESS, "example"), (execution.status, execution.title))
+        self.assertIsNotNone(execution.last_crawl)
+
+        recorder.add(raw_node("http://example.com/"))
+        recorder.add(raw_node("http://other.com/", boundary_record=True))
+        self.assertEqual([], self._links(execution))
+
+        # The first batch is visible while the crawl still runs
+        metrics.increment("pages", 2)
+        recorder.add(raw_node("http://example.com/a/"))
+        self.assertEqual(["http://example.com/", "http://example.com/a/"], self._links(execution))
+
+        recorder.add(raw_node("http://example.com/b/"))
+        recorder.finish()
+        execution.refresh_from_db()
+
+        self.assertEqual(Execution.FINISHED, execution.status)
+        self.assertEqual({"pages": 2}, execution.metrics["counters"])
+        self.assertEqual(["http://example.com/", "http://example.com/a/", "http://example.com/b/"],
+                         self._links(execution))
+
+    def test_redelivered_task(self):
+        recorder = ExecutionRecorder.start(self.record, self.record.url, task_id="task")
+        recorder.add(raw_node("http://example.com/"))
+        recorder.flush()
+
+        # The redelivered task visits the URLs again
+        redelivered = ExecutionRecorder.start(self.record, self.record.url, task_id="task")
+        redelivered.finish(Execution.UNKNOWN)
+
+        self.assertEqual(recorder.execution.pk, redelivered.execution.pk)
+        self.assertEqual(1, Execution.objects.filter(website_record=self.record).count())
+        self.assertEqual([], self._links(redelivered.execution))
+        self.assertEqual(Execution.UNKNOWN, Execution.objects.get(pk=recorder.execution.pk).status)
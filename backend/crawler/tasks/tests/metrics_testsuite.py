@@ -0,0 +1,62 @@
+from django.test import SimpleTestCase
+from prometheus_client import REGISTRY
+
+from core.inspector.metrics import CrawlMetrics
+from tasks.metrics import MetricsExporter
+
+
+class MetricsExporterTestCase(SimpleTestCase):
+    @staticmethod
+    def _sample(name: str, **labels) -> float:
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_export_changes(self):
+        now = [0.0]
+        metrics = CrawlMetrics()
+        exporter = MetricsExporter(metrics, interval=5, clock=lambda: now[0])
+
+        pages = self._sample("crawler_events_total", event="pages")
+        fetch = self._sample("crawler_phase_seconds_total", phase="fetch")
+        errors = self._sample("crawler_errors_total", type="ConnectionError")
+
+        metrics.increment("pages", 2)
+        metrics.observe("fetch", 0.5)
+        metrics.error(ConnectionError())
+        exporter.export()
+
+        # Exported at most once per interval
+        self.assertEqual(pages, self._sample("crawler_events_total", event="pages"))
+
+        now[0] = 5
+        exporter.export()
+        metrics.increment("pages")
+        metrics.observe("fetch", 0.25)
+        exporter.export(force=True)
+
+        self.assertEqual(pages + 3, self._sample("crawler_events_total", event="pages"))
+        self.assertAlmostEqual(fetch + 0.75, self._sample("crawler_phase_seconds_total", phase="fetch"))
+        self.assertEqual(errors + 1, self._sample("crawler_errors_total", type="ConnectionError"))
+
+    def test_gauges(self):
+        metrics = CrawlMetrics()
+        exporter = MetricsExporter(metrics)
+        metrics.gauge("concurrency_limit", "example.com", 4.5)
+        exporter.export(force=True)
+
+        self.assertEqual(4.5, REGISTRY.get_sample_value("crawler_host_concurrency_limit", {"host": "example.com"}))
+
+        # Hosts of the finished crawl are not exported anymore
+        exporter.close()
+        self.assertIsNone(REGISTRY.get_sample_value("crawler_host_concurrency_limit", {"host": "example.com"}))
+
+    def test_merge(self):
+        metrics = CrawlMetrics()
+        metrics.observe("fetch", 1.0)
+        metrics.increment("pages")
+
+        merged = CrawlMetrics()
+        merged.merge(metrics.as_dict())
+        merged.merge(metrics.as_dict())
+
+        self.assertEqual({"phases": {"fetch": {"seconds": 2.0, "operations": 2}}, "counters": {"pages": 2},
+                          "errors": {}, "gauges": {}}, merged.as_dict())
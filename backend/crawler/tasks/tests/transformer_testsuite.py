@@ -0,0 +1,190 @@
+import datetime
+
+from django.test import TestCase
+
+from api.models import CrawledPage, DomainEdge, Edge, Node, WebsiteRecord
+from core.inspector.metrics import CrawlMetrics
+from tasks.transformer import GraphWriter, IncrementalGraphWriter, get_domain_graph, load_pages, persist_graph, \
+    transform_graph
+
+
+def raw_node(url: str, targets: list, boundary_record: bool = False) -> dict:
+    return {"url": url, "domain": "example.com", "execution_targets": targets, "title": url,
+            "crawl_time": datetime.datetime(2022, 7, 18), "boundary_record": boundary_record}
+
+
+NODES = [
+    raw_node("http://example.com/", ["http://example.com/a/", "http://example.com/b/", "http://other.com/"]),
+    raw_node("http://other.com/", [], True),
+    raw_node("http://example.com/a/", ["http://example.com/", "http://example.com/missing/"]),
+    raw_node("http://example.com/b/", ["http://example.com/a/"]),
+]
+
+
+class GraphWriterTestCase(TestCase):
+    def setUp(self):
+        self.record = WebsiteRecord.objects.create(url="http://example.com/", label="example", interval=0,
+                                                   active=False, regex=".*")
+
+    def _edges(self) -> set:
+        return {(edge.source.url, edge.target.url) for edge in Edge.objects.select_related('source', 'target')}
+
+    def test_batches(self):
+        writer = GraphWriter(self.record.id, batch_size=2)
+
+        for node in NODES[:3]:
+            writer.write(node)
+
+        # The first batch is visible while the crawl still runs
+        self.assertEqual(2, Node.objects.filter(owner=self.record).count())
+        self.assertEqual({("http://example.com/", "http://other.com/")}, self._edges())
+
+        writer.write(NODES[3])
+        writer.close()
+
+        self.assertEqual({node["url"] for node in NODES}, set(Node.objects.values_list('url', flat=True)))
+        self.assertEqual({
+            ("http://example.com/", "http://example.com/a/"),
+            ("http://example.com/", "http://example.com/b/"),
+            ("http://example.com/", "http://other.com/"),
+            ("http://example.com/a/", "http://example.com/"),
+            ("http://example.com/b/", "http://example.com/a/"),
+        }, self._edges())
+
+    def test_metrics(self):
+        metrics = CrawlMetrics()
+        writer = GraphWriter(self.record.id, batch_size=3, metrics=metrics)
+
+        for node in NODES:
+            writer.write(node)
+        writer.close()
+
+        phases = metrics.as_dict()["phases"]
+
+        self.assertEqual({"transform", "persist"}, set(phases))
+        self.assertEqual((len(NODES), 2), (phases["persist"]["operations"], phases["transform"]["operations"] // 2))
+
+    def test_persist_graph(self):
+        persist_graph(*transform_graph(NODES, self.record.id), batch_size=3)
+
+        self.assertEqual(len(NODES), Node.objects.filter(owner=self.record).count())
+        self.assertEqual(5, len(self._edges()))
+        self.assertIn(("http://example.com/b/", "http://example.com/a/"), self._edges())
+
+    def test_pages(self):
+        def crawled_node(etag: str, links: list) -> dict:
+            node = raw_node("http://example.com/", links)
+            node.update({"etag": etag, "last_modified": None, "content_hash": etag * 2, "links": links})
+            return node
+
+        for etag in ("a", "b"):
+            writer = GraphWriter(self.record.id)
+            writer.write(crawled_node(etag, ["http://other.com/"]))
+            writer.write(NODES[1])
+            writer.close()
+
+        # Leaf nodes are not stored and the page of the second crawl replaces the first one
+        self.assertEqual(1, CrawledPage.objects.count())
+        self.assertEqual({"url": "http://example.com/", "etag": "b", "last_modified": None, "content_hash": "bb",
+                          "title": "http://example.com/", "links": ["http://other.com/"]},
+                         load_pages(self.record.id)["http://example.com/"])
+
+    def test_oversized_validators(self):
+        node = raw_node("http://example.com/", [])
+        node.update({"etag": '"' + "e" * 300 + '"', "last_modified": "Mon, 18 Jul 2022 00:00:00 GMT",
+                     "content_hash": "hash", "links": []})
+
+        writer = GraphWriter(self.record.id)
+        writer.write(node)
+        writer.close()
+
+        page = load_pages(self.record.id)["http://example.com/"]
+        self.assertEqual((None, "Mon, 18 Jul 2022 00:00:00 GMT"), (page["etag"], page["last_modified"]))
+
+
+class IncrementalGraphWriterTestCase(TestCase):
+    def setUp(self):
+        self.record = WebsiteRecord.objects.create(url="http://example.com/", label="example", interval=0,
+                                                   active=False, regex=".*")
+
+    def _write(self, nodes: list) -> dict:
+        writer = IncrementalGraphWriter(self.record.id, batch_size=2)
+
+        for node in nodes:
+            writer.write(node)
+        writer.close()
+
+        return writer.changes
+
+    def _graph(self) -> (dict, set):
+        nodes = {node.url: (node.id, node.title) for node in Node.objects.filter(owner=self.record)}
+        edges = {(edge.source.url, edge.target.url) for edge in Edge.objects.select_related('source', 'target')}
+
+        return nodes, edges
+
+    def test_stable_graph(self):
+        self._write(NODES)
+        nodes, edges = self._graph()
+
+        changes = self._write(NODES)
+
+        self.assertEqual({"inserted_nodes": 0, "updated_nodes": 0, "deleted_nodes": 0, "inserted_edges": 0,
+                          "deleted_edges": 0}, changes)
+        self.assertEqual((nodes, edges), self._graph())
+        self.assertEqual(5, len(edges))
+
+    def _domain_edges(self) -> dict:
+        return {(edge.source.domain, edge.target.domain): edge.count
+                for edge in DomainEdge.objects.filter(owner=self.record).select_related('source', 'target')}
+
+    def test_domain_graph(self):
+        self._write(NODES)
+
+        self.assertEqual({("example.com", "example.com"): 4, ("example.com", "other.com"): 1}, self._domain_edges())
+
+        # The domain graph follows the changes of the graph
+        self._write([raw_node("http://example.com/", ["http://example.com/a/"]),
+                     raw_node("http://example.com/a/", [])])
+
+        self.assertEqual({("example.com", "example.com"): 1}, self._domain_edges())
+        self.assertEqual({"nodes": [{"model": "api.node", "pk": 1,
+                                     "fields": {"url": "example.com", "crawl_time": "2022-07-18 00:00:00",
+                                                "owner": self.record.id}}],
+                          "edges": [{"model": "api.edge", "pk": 0, "fields": {"source": 1, "target": 1, "count": 1}}]},
+                         get_domain_graph([self.record.id]))
+
+    def test_changed_graph(self):
+        self._write(NODES)
+        nodes, _ = self._graph()
+
+        changed = [
+            raw_node("http://example.com/", ["http://example.com/a/", "http://example.com/c/"]),
+            raw_node("http://example.com/a/", ["http://example.com/"]),
+            raw_node("http://example.com/c/", []),
+        ]
+        changed[1]["title"] = "A"
+
+        changes = self._write(changed)
+        new_nodes, edges = self._graph()
+
+        self.assertEqual({"inserted_nodes": 1, "updated_nodes": 1, "deleted_nodes": 2, "inserted_edges": 1,
+                          "deleted_edges": 2}, changes)
+        self.assertEqual({"http://example.com/", "http://example.com/a/", "http://example.com/c/"}, set(new_nodes))
+        self.assertEqual(nodes["http://example.com/a/"][0], new_nodes["http://example.com/a/"][0])
+        self.assertEqual("A", new_nodes["http://example.com/a/"][1])
+        self.assertEqual({
+            ("http://example.com/", "http://example.com/a/"),
+            ("http://example.com/", "http://example.com/c/"),
+            ("http://example.com/a/", "http://example.com/"),
+        }, edges)
+
+    def test_duplicate_graphs(self):
+        for _ in range(2):
+            persist_graph(*transform_graph(NODES, self.record.id))
+
+        self._write(NODES)
+        nodes, edges = self._graph()
+
+        self.assertEqual(len(NODES), Node.objects.filter(owner=self.record).count())
+        self.assertEqual(5, len(edges))
+        self.assertEqual(5, Edge.objects.count())
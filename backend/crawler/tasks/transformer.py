@@ -1,100 +1,126 @@
 import json
+import logging
+import time
+from collections import Counter, defaultdict
 
+from core.inspector.metrics import CrawlMetrics
 from django.core import serializers
 
-from api.models import Edge, Node, WebsiteRecord
-from django.db import transaction
+from api.models import CrawledPage, DomainEdge, DomainNode, Edge, Node, WebsiteRecord
+from django.db import connection, transaction
 from urllib.parse import urlsplit
 
+from .graph_cache import bump_graph_version
 
-def get_graph(raw_edges: list, raw_nodes: list, domain: bool = True):
+LOGGER = logging.getLogger(__name__)
+
+# Default number of the crawled nodes persisted at once
+DEFAULT_BATCH_SIZE = 500
+
+# Fields of the crawled pages stored for the conditional re-crawls
+PAGE_FIELDS = ('etag', 'last_modified', 'content_hash', 'title', 'links')
+
+# HTTP validators of the crawled pages, see `_page_values`
+VALIDATOR_FIELDS = ('etag', 'last_modified')
+
+
+def get_graph(raw_edges: list, raw_nodes: list):
     json_serializer = serializers.get_serializer("json")
     serializer = json_serializer()
 
-    if domain:
-        edges_preprocessed = []
-
-        for edge in raw_edges:
-            edges_preprocessed.append({
-                "model": 'api.edge',
-                'source': {
-                    "url": f"{urlsplit(edge.source.url).netloc}",
-                    "crawl_time": edge.source.crawl_time,
-                    "owner": edge.source.owner.id
-                },
-                'target': {
-                    "url": f"{urlsplit(edge.target.url).netloc}",
-                    "crawl_time": edge.target.crawl_time,
-                    "owner": edge.target.owner.id
-                },
-            })
-
-        seen = set()
-        edges = []
-
-        url_to_id_mapper = dict()
-        id_mapper = 1
-
-        # Make nodes and edges unique
-        for edge in edges_preprocessed:
-            if (edge['source']['url'], edge['target']['url']) not in seen:
-                seen.add((edge['source']['url'], edge['target']['url']))
-                edges.append(edge)
-                # create map of url -> ID from 1
-                if edge['source']['url'] not in url_to_id_mapper:
-                    url_to_id_mapper[edge['source']['url']] = id_mapper
-                    id_mapper += 1
-                if edge['target']['url'] not in url_to_id_mapper:
-                    url_to_id_mapper[edge['target']['url']] = id_mapper
-                    id_mapper += 1
-
-        serialized_nodes = []
-        serialized_edges = []
-
-        added_nodes = set()
-        for i in range(len(edges)):
-            source_id = url_to_id_mapper[edges[i]['source']['url']]
-            target_id = url_to_id_mapper[edges[i]['target']['url']]
-            # add every node EXACTLY once
-            if source_id not in added_nodes:
-                serialized_nodes.append(
-                    {
-                        'model': 'api.node',
-                        'pk': source_id,
-                        'fields': edges[i]['source']
-                    }
-                )
-                added_nodes.add(source_id)
-            if target_id not in added_nodes:
-                serialized_nodes.append(
-                    {
-                        'model': 'api.node',
-                        'pk': target_id,
-                        'fields': edges[i]['target']
-                    }
-                )
-                added_nodes.add(target_id)
-            serialized_edges.append(
-                {
-                    'model': 'api.edge',
-                    'pk': i,
-                    'fields': {
-                        'source': source_id,
-                        'target': target_id
-                    }
-                }
-            )
-
-    else:
-        nodes_filtered = raw_nodes
-        edges_filtered = raw_edges
-
-        serialized_edges = json.loads(serializer.serialize(edges_filtered))
-        serialized_nodes = json.loads(serializer.serialize(nodes_filtered))
+    serialized_edges = json.loads(serializer.serialize(raw_edges))
+    serialized_nodes = json.loads(serializer.serialize(raw_nodes))
 
     return {"nodes": serialized_nodes, "edges": serialized_edges}
 
 
+def get_domain_graph(record_ids: list) -> dict:
+    """
+    Reads the domain graph of the records materialized when their graphs were persisted (see
+    `materialize_domain_graph`), the graphs persisted before are materialized on the first read.
+    Args:
+        record_ids: IDs of the WebsiteRecords.
+
+    Returns:
+        Serialized domains with an edge and the edges between them. Domains shared by the records are merged and the
+        counts of their edges summed up.
+    """
+    materialized = set(DomainNode.objects.filter(owner__in=record_ids).values_list('owner_id', flat=True).distinct())
+
+    for record_id in set(record_ids) - materialized:
+        if Node.objects.filter(owner_id=record_id).exists():
+            materialize_domain_graph(record_id)
+
+    rows = DomainEdge.objects.filter(owner__in=record_ids).order_by('id').values_list(
+        'source__domain', 'source__crawl_time', 'source__owner_id', 'target__domain', 'target__crawl_time',
+        'target__owner_id', 'count')
+
+    # Map of the domains to their serialized nodes and of the pairs of the domains to their serialized edges
+    nodes = dict()
+    edges = dict()
+
+    for source, source_time, source_owner, target, target_time, target_owner, count in rows:
+        for domain, crawl_time, owner in ((source, source_time, source_owner), (target, target_time, target_owner)):
+            if domain not in nodes:
+                nodes[domain] = {'model': 'api.node', 'pk': len(nodes) + 1,
+                                 'fields': {'url': domain, 'crawl_time': crawl_time, 'owner': owner}}
+
+        edge = edges.get((source, target))
+
+        if edge is None:
+            edges[(source, target)] = {'model': 'api.edge', 'pk': len(edges),
+                                       'fields': {'source': nodes[source]['pk'], 'target': nodes[target]['pk'],
+                                                  'count': count}}
+        else:
+            edge['fields']['count'] += count
+
+    return {"nodes": list(nodes.values()), "edges": list(edges.values())}
+
+
+def materialize_domain_graph(record_id: int) -> None:
+    """
+    Replaces the domain graph of the record by the one aggregated out of its current nodes and edges, so that the
+    domain view of the graph does not collapse the edges of the pages on every read. The record is locked meanwhile, so
+    that the graph persisted by a crawl and the graph read for the first time are not materialized at once.
+    Args:
+        record_id: Actual WebsiteRecord ID
+    """
+    with transaction.atomic():
+        if not WebsiteRecord.objects.select_for_update().filter(pk=record_id).exists():
+            return
+
+        # Map of the node IDs to their domains and of the domains to the latest crawl time of their nodes
+        domains = dict()
+        crawl_times = dict()
+
+        for node_id, url, crawl_time in Node.objects.filter(owner_id=record_id) \
+                .values_list('id', 'url', 'crawl_time').iterator():
+            domain = urlsplit(url).netloc
+            domains[node_id] = domain
+            crawl_times[domain] = max(crawl_times.get(domain, crawl_time), crawl_time)
+
+        # Number of the edges between the nodes of every pair of the domains
+        counts = Counter((domains[source_id], domains[target_id])
+                         for source_id, target_id in Edge.objects.filter(source__owner_id=record_id)
+                         .values_list('source_id', 'target_id').iterator()
+                         if target_id in domains)
+
+        DomainNode.objects.filter(owner_id=record_id).delete()
+        domain_nodes = DomainNode.objects.bulk_create([DomainNode(owner_id=record_id, domain=domain,
+                                                                  crawl_time=crawl_time)
+                                                       for domain, crawl_time in crawl_times.items()])
+
+        if domain_nodes and domain_nodes[0].pk is None:
+            # The database does not return the IDs of bulk inserted rows
+            domain_ids = dict(DomainNode.objects.filter(owner_id=record_id).values_list('domain', 'id'))
+        else:
+            domain_ids = {domain_node.domain: domain_node.pk for domain_node in domain_nodes}
+
+        insert_rows(DomainEdge, ('source', 'target', 'owner', 'count'),
+                    [(domain_ids[source], domain_ids[target], record_id, count)
+                     for (source, target), count in counts.items()])
+
+
 def transform_graph(raw_nodes: list, record_id: int) -> [list, list]:
     """
     Transforms raw nodes from crawler into the list of nodes and edges that can be persistable into the database.
@@ -108,13 +134,14 @@ def transform_graph(raw_nodes: list, record_id: int) -> [list, list]:
     nodes = []
     edges = []
 
+    owner = WebsiteRecord.objects.filter(id=record_id).first()
+
     for node in raw_nodes:
         nodes.append({
             'title': node['title'],
             'crawl_time': node['crawl_time'],
             'url': node['url'],
-            # This is an expensive operation, but I am not into implement json serializer
-            'owner': WebsiteRecord.objects.filter(id=record_id).first(),
+            'owner': owner,
             'boundary_record': node['boundary_record']
         })
 
@@ -123,29 +150,412 @@ def transform_graph(raw_nodes: list, record_id: int) -> [list, list]:
     return nodes, edges
 
 
-def persist_graph(nodes: list, edges: list) -> None:
+def _batches(items: list, batch_size: int) -> iter:
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def _create_nodes(nodes: list) -> dict:
+    """
+    Inserts the nodes by a single bulk query.
+    Args:
+        nodes: Nodes matching the database model definition (see `transform_graph`).
+
+    Returns:
+        Map of the URLs/domains of the nodes to the IDs of the inserted rows.
+    """
+    db_nodes = Node.objects.bulk_create([Node(**node) for node in nodes])
+
+    if db_nodes and db_nodes[0].pk is None:
+        # The database does not return the IDs of bulk inserted rows, the latest rows of the URLs are the inserted ones
+        owner_ids = {node['owner'].id for node in nodes}
+        rows = Node.objects.filter(owner__in=owner_ids, url__in=[node.url for node in db_nodes]).order_by('id')
+        return dict(rows.values_list('url', 'id'))
+
+    return {db_node.url: db_node.pk for db_node in db_nodes}
+
+
+def insert_rows(model, field_names: tuple, rows: list) -> None:
     """
+    Inserts the rows by multi-row INSERT queries, skipping the model instantiation and the SQL compilation of
+    `bulk_create`. Meant for the tables written in bulk, i.e. the edges of the graph.
+    Args:
+        model: Model of the table.
+        field_names: Names of the inserted fields, foreign keys by the name of the field (i.e. "source").
+        rows: Tuples of the field values (IDs of the foreign keys), in the order of the field names.
+    """
+    quote_name = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in field_names]
+    columns = ", ".join(quote_name(field.column) for field in fields)
+    placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+
+    # Number of the rows fitting into a single query of the database backend
+    batch_size = max(1, connection.ops.bulk_batch_size(fields, rows))
+
+    with connection.cursor() as cursor:
+        for batch in _batches(rows, batch_size):
+            cursor.execute(f"INSERT INTO {quote_name(model._meta.db_table)} ({columns}) VALUES "
+                           + ", ".join([placeholders] * len(batch)), [value for row in batch for value in row])
+
 
+def _create_edges(edges: list) -> None:
+    """
+    Inserts the edges by multi-row INSERT queries, edges are the bulk of every graph.
     Args:
-        nodes:
-        edges:
+        edges: Pairs of the source and target node IDs.
     """
-    db_nodes = [Node.objects.create_node(raw_node) for raw_node in nodes]
+    insert_rows(Edge, ('source', 'target'), edges)
 
-    # Store all nodes securely
-    with transaction.atomic():
-        for db_node in db_nodes:
-            db_node.save()
 
-    # Create list of db_edges
-    db_edges = []
+def load_pages(record_id: int) -> dict:
+    """
+    Loads the validators and links stored by the previous crawls of the record.
+    Args:
+        record_id: Actual WebsiteRecord ID
+
+    Returns:
+        Map of the crawled URLs/domains to their stored title, links and validators, as expected by Inspector class.
+    """
+    return {page['url']: page for page in CrawledPage.objects.filter(owner_id=record_id).values('url', *PAGE_FIELDS)}
 
-    for edge in edges:
-        source_node = next((x for x in db_nodes if x.url == edge['source']), None)
-        target_node = next((x for x in db_nodes if x.url == edge['target']), None)
-        db_edges.append(Edge.objects.create_edge({"source": source_node, "target": target_node}))
 
-    # Store all nodes securely
-    with transaction.atomic():
-        for db_edge in db_edges:
-            db_edge.save()
+def _page_values(node: dict) -> dict:
+    """
+    Returns the values of the crawled page stored for the next crawl. Validators longer than their columns are dropped,
+    since a truncated validator would never match, the page is recognized by its content hash then.
+    """
+    values = {field: node[field] for field in PAGE_FIELDS}
+
+    for field in VALIDATOR_FIELDS:
+        if values[field] is not None and len(values[field]) > CrawledPage._meta.get_field(field).max_length:
+            values[field] = None
+
+    return values
+
+
+def _save_pages(raw_nodes: list, record_id: int) -> None:
+    """
+    Stores the validators and links of the crawled nodes for the next crawl of the record, the pages crawled before
+    are updated.
+    Args:
+        raw_nodes: List of raw nodes crawled by Inspector class. Leaf nodes carry no validators and are skipped.
+        record_id: Actual WebsiteRecord ID
+    """
+    pages = {}
+
+    for node in raw_nodes:
+        if node.get('content_hash') is not None:
+            pages[node['url']] = CrawledPage(owner_id=record_id, url=node['url'], **_page_values(node))
+
+    if not pages:
+        return
+
+    stored = CrawledPage.objects.filter(owner_id=record_id, url__in=list(pages)).values_list('url', 'id')
+
+    for url, page_id in stored:
+        pages[url].pk = page_id
+
+    CrawledPage.objects.bulk_update([page for page in pages.values() if page.pk is not None], PAGE_FIELDS)
+    CrawledPage.objects.bulk_create([page for page in pages.values() if page.pk is None])
+
+
+def persist_graph(nodes: list, edges: list, batch_size: int = DEFAULT_BATCH_SIZE, metrics: CrawlMetrics = None) -> None:
+    """
+    Persists the graph in batches, every batch is inserted by a single bulk query in its own transaction. The domain
+    graphs of the owners of the nodes are materialized and the versions of their graphs bumped then.
+    Args:
+        nodes: Nodes matching the database model definition (see `transform_graph`).
+        edges: Edges between the URLs/domains of the nodes. Edges with a node missing are skipped.
+        batch_size: Number of the rows inserted at once.
+        metrics: Metrics the wall time of the persistence is added to or None.
+    """
+    start = time.perf_counter()
+    node_ids = dict()
+
+    for batch in _batches(nodes, batch_size):
+        with transaction.atomic():
+            node_ids.update(_create_nodes(batch))
+
+    db_edges = [(node_ids[edge['source']], node_ids[edge['target']])
+                for edge in edges if edge['source'] in node_ids and edge['target'] in node_ids]
+
+    for batch in _batches(db_edges, batch_size):
+        with transaction.atomic():
+            _create_edges(batch)
+
+    for record_id in {node['owner'].id for node in nodes}:
+        materialize_domain_graph(record_id)
+        bump_graph_version(record_id)
+
+    if metrics is not None:
+        metrics.observe("persist", time.perf_counter() - start, len(nodes))
+
+
+class GraphWriter(object):
+    """
+    Persists the crawled nodes in fixed-size batches while the crawl is still running, so that the memory needed does
+    not grow with the size of the crawled website and the partial graph is visible during long crawls. Every batch is
+    inserted by bulk queries in its own transaction.
+
+    Edges are persisted as soon as both of their nodes are. Edges whose target was never crawled (i.e. it failed to
+    download) are dropped when the writer is closed. Validators and links of the crawled nodes are stored together with
+    them for the next, conditional crawl of the record. The domain graph of the record is materialized once the writer
+    is closed. The version of the graph of the record is bumped whenever the graph changes, see `bump_graph_version`.
+    """
+
+    def __init__(self, record_id: int, batch_size: int = DEFAULT_BATCH_SIZE, metrics: CrawlMetrics = None):
+        """
+        Constructor method.
+        Args:
+            record_id: Actual WebsiteRecord ID
+            batch_size: Number of the nodes persisted at once.
+            metrics: Metrics the wall time of the transformation and the persistence of the nodes is added to.
+        """
+        self.record_id = record_id
+        self.batch_size = batch_size
+        self.metrics = metrics or CrawlMetrics()
+
+        # Raw nodes waiting to be persisted
+        self._batch = []
+
+        # Map of the persisted URLs/domains to the IDs of their nodes
+        self._node_ids = dict()
+
+        # Map of the not yet persisted URLs/domains to the IDs of the nodes referencing them
+        self._pending_edges = defaultdict(list)
+
+        # Whether the writer changed the stored graph
+        self._changed = False
+
+    def write(self, raw_node: dict) -> None:
+        """
+        Adds the raw node crawled by Inspector class to the graph.
+        """
+        self._batch.append(raw_node)
+
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Persists the nodes of the current batch and every edge whose nodes are already persisted.
+        """
+        if not self._batch:
+            return
+
+        raw_nodes = self._batch
+        nodes, edges = self._transform(raw_nodes)
+        self._batch = []
+        start = time.perf_counter()
+
+        with transaction.atomic():
+            _save_pages(raw_nodes, self.record_id)
+            self._node_ids.update(_create_nodes(nodes))
+
+            db_edges = []
+
+            for edge in edges:
+                target_id = self._node_ids.get(edge['target'])
+
+                if target_id is None:
+                    self._pending_edges[edge['target']].append(self._node_ids[edge['source']])
+                else:
+                    db_edges.append((self._node_ids[edge['source']], target_id))
+
+            # Edges referencing the nodes of this batch from the previous batches
+            for node in nodes:
+                target_id = self._node_ids[node['url']]
+                db_edges += [(source_id, target_id) for source_id in self._pending_edges.pop(node['url'], ())]
+
+            _create_edges(db_edges)
+
+        self._graph_changed()
+        self.metrics.observe("persist", time.perf_counter() - start, len(raw_nodes))
+
+    def _graph_changed(self) -> None:
+        """
+        Bumps the version of the graph, so that the partial graph is visible during long crawls.
+        """
+        self._changed = True
+        bump_graph_version(self.record_id)
+
+    def _transform(self, raw_nodes: list) -> (list, list):
+        start = time.perf_counter()
+        nodes, edges = transform_graph(raw_nodes, self.record_id)
+        self.metrics.observe("transform", time.perf_counter() - start, len(raw_nodes))
+
+        return nodes, edges
+
+    def close(self) -> None:
+        """
+        Persists the rest of the graph and materializes the domain graph of the record, if the graph changed.
+        """
+        self._complete()
+
+        if not self._changed:
+            return
+
+        start = time.perf_counter()
+        materialize_domain_graph(self.record_id)
+        bump_graph_version(self.record_id)
+        self.metrics.observe("persist", time.perf_counter() - start, 0)
+
+    def _complete(self) -> None:
+        """
+        Persists the rest of the graph.
+        """
+        self.flush()
+
+        if self._pending_edges:
+            LOGGER.log(logging.WARNING, "Dropped edges to %d URLs that were not crawled" % len(self._pending_edges))
+            self._pending_edges.clear()
+
+
+class IncrementalGraphWriter(GraphWriter):
+    """
+    Updates the current graph of the record in place instead of inserting a new one. Crawled nodes are matched to the
+    stored ones by their URL/domain; only the new nodes are inserted and only the nodes whose title, boundary flag or
+    content changed are updated. Outgoing edges of every crawled node are diffed against the stored ones, so that only
+    the added edges are inserted and only the removed ones deleted. Nodes that were not crawled again are deleted when
+    the writer is closed, together with their edges.
+
+    Crawl time of a node is updated only together with its other fields, so that a stable website is not written at
+    all.
+    """
+
+    def __init__(self, record_id: int, batch_size: int = DEFAULT_BATCH_SIZE, metrics: CrawlMetrics = None):
+        super().__init__(record_id, batch_size, metrics)
+
+        # Stored nodes not crawled yet - map of their URLs/domains to their ID, title and boundary flag
+        self._stored_nodes = dict()
+
+        # IDs of the duplicate stored nodes of the same URL/domain, left behind by the non-incremental crawls
+        self._duplicate_ids = []
+
+        for node_id, url, title, boundary_record in Node.objects.filter(owner_id=record_id).order_by('id') \
+                .values_list('id', 'url', 'title', 'boundary_record'):
+            if url in self._stored_nodes:
+                self._duplicate_ids.append(self._stored_nodes[url][0])
+
+            self._stored_nodes[url] = (node_id, title, boundary_record)
+
+        # Map of the stored source node IDs to the map of their target node IDs to the IDs of the edges
+        self._stored_edges = defaultdict(dict)
+
+        for edge_id, source_id, target_id in Edge.objects.filter(source__owner_id=record_id) \
+                .values_list('id', 'source_id', 'target_id'):
+            self._stored_edges[source_id][target_id] = edge_id
+
+        # Number of the inserted, updated and deleted rows
+        self.changes = {"inserted_nodes": 0, "updated_nodes": 0, "deleted_nodes": 0, "inserted_edges": 0,
+                        "deleted_edges": 0}
+
+    @staticmethod
+    def _is_changed(raw_node: dict, title: str, boundary_record: bool) -> bool:
+        # Only the crawled nodes carry a content hash, leaf nodes change with their title or boundary flag only
+        return raw_node['title'] != title or raw_node['boundary_record'] != boundary_record or \
+            (raw_node.get('content_hash') is not None and not raw_node.get('unchanged'))
+
+    def _node_id(self, url: str) -> int:
+        node_id = self._node_ids.get(url)
+
+        if node_id is None and url in self._stored_nodes:
+            node_id = self._stored_nodes[url][0]
+
+        return node_id
+
+    def flush(self) -> None:
+        """
+        Applies the changes of the nodes of the current batch and of their outgoing edges to the stored graph.
+        """
+        if not self._batch:
+            return
+
+        raw_nodes = self._batch
+        nodes, _ = self._transform(raw_nodes)
+        self._batch = []
+        start = time.perf_counter()
+
+        new_nodes = []
+        changed_nodes = []
+
+        for raw_node, node in zip(raw_nodes, nodes):
+            stored = self._stored_nodes.pop(node['url'], None)
+
+            if stored is None:
+                new_nodes.append(node)
+                continue
+
+            node_id, title, boundary_record = stored
+            self._node_ids[node['url']] = node_id
+
+            if self._is_changed(raw_node, title, boundary_record):
+                changed_nodes.append(Node(id=node_id, title=node['title'], crawl_time=node['crawl_time'],
+                                          boundary_record=node['boundary_record']))
+
+        with transaction.atomic():
+            _save_pages(raw_nodes, self.record_id)
+
+            self._node_ids.update(_create_nodes(new_nodes))
+            Node.objects.bulk_update(changed_nodes, ['title', 'crawl_time', 'boundary_record'])
+
+            db_edges = []
+            deleted_edge_ids = []
+
+            for raw_node in raw_nodes:
+                source_id = self._node_ids[raw_node['url']]
+                stored_targets = self._stored_edges.pop(source_id, {})
+
+                for target in raw_node['execution_targets']:
+                    target_id = self._node_id(target)
+
+                    if target_id is None:
+                        self._pending_edges[target].append(source_id)
+                    elif stored_targets.pop(target_id, None) is None:
+                        db_edges.append((source_id, target_id))
+
+                # Stored edges the node does not reference anymore
+                deleted_edge_ids += stored_targets.values()
+
+            # Edges referencing the new nodes of this batch from the previous batches
+            for node in new_nodes:
+                target_id = self._node_ids[node['url']]
+                db_edges += [(source_id, target_id) for source_id in self._pending_edges.pop(node['url'], ())]
+
+            for batch in _batches(deleted_edge_ids, self.batch_size):
+                Edge.objects.filter(id__in=batch).delete()
+
+            _create_edges(db_edges)
+
+        if new_nodes or changed_nodes or db_edges or deleted_edge_ids:
+            self._graph_changed()
+
+        self.metrics.observe("persist", time.perf_counter() - start, len(raw_nodes))
+
+        self.changes["inserted_nodes"] += len(new_nodes)
+        self.changes["updated_nodes"] += len(changed_nodes)
+        self.changes["inserted_edges"] += len(db_edges)
+        self.changes["deleted_edges"] += len(deleted_edge_ids)
+
+    def _complete(self) -> None:
+        """
+        Applies the rest of the changes and deletes the stored nodes that were not crawled again.
+        """
+        super()._complete()
+
+        start = time.perf_counter()
+        stale_ids = [node_id for node_id, _, _ in self._stored_nodes.values()] + self._duplicate_ids
+
+        with transaction.atomic():
+            for batch in _batches(stale_ids, self.batch_size):
+                Node.objects.filter(id__in=batch).delete()
+
+        if stale_ids:
+            self._graph_changed()
+
+        self.metrics.observe("persist", time.perf_counter() - start, 0)
+
+        self.changes["deleted_nodes"] += len(stale_ids)
+        self._stored_nodes.clear()
+        self._stored_edges.clear()
+        self._duplicate_ids = []